@@ -1,9 +1,15 @@
 # apps/analytics/services.py
-from django.db.models import Sum, Avg, Count, Q
+import uuid
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Sum, Avg, Count, F, Max, Q
+from django.db.models.functions import Trim
 from django.utils import timezone
 from datetime import datetime, timedelta
+from apps.breeding.models import BreedingRecord
 from apps.production.models import MilkProduction, EggProduction
 from apps.livestock.models import Cow, ChickenBatch
+from apps.livestock.services import LifecycleService
 from apps.feeds.models import DailyFeedConsumption, ChickenFeedConsumption
 from apps.financial.models import Transaction
 
@@ -43,6 +49,33 @@ class AnalyticsService:
             'period': f"{start_date} to {end_date}"
         }
     
+    @staticmethod
+    def get_milk_production_by_stage(farm, start_date, end_date):
+        """Milk totals split by the stage each cow was in on the day of milking"""
+        milk_records = MilkProduction.objects.filter(
+            date__range=[start_date, end_date],
+            is_deleted=False
+        )
+        if farm is not None:
+            milk_records = milk_records.filter(cow__farm=farm)
+        
+        by_stage = (
+            milk_records
+            .annotate(stage=LifecycleService.stage_subquery('date', cow_ref='cow_id'))
+            .values('stage')
+            .annotate(
+                total_liters=Sum('quantity_liters'),
+                average_per_milking=Avg('quantity_liters'),
+                milkings=Count('id'),
+                cows=Count('cow', distinct=True)
+            )
+            .order_by('stage')
+        )
+        return {
+            'period': f"{start_date} to {end_date}",
+            'by_stage': list(by_stage),
+        }
+    
     @staticmethod
     def get_egg_production_stats(farm, start_date, end_date):
         """Get egg production statistics for a farm and date range"""
@@ -132,3 +165,342 @@ class AnalyticsService:
             'profit_margin': profit_margin,
             'period': f"{start_date} to {end_date}"
         }
+
+def days_between_sql(later, earlier):
+    """Whole-day difference between two date columns on the active backend"""
+    if connection.vendor == 'postgresql':
+        return f'({later} - {earlier})'
+    return f'(julianday({later}) - julianday({earlier}))'
+
+def date_add_sql(column, days):
+    """A date column shifted by a fixed number of days on the active backend"""
+    if connection.vendor == 'postgresql':
+        return f'({column} + {int(days)})'
+    return f"date({column}, '+{int(days)} days')"
+
+def run_sql(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+class ReproductiveKPIService:
+    """Set-wise reproductive KPIs (calving interval, days open, conception)"""
+    
+    CACHE_TIMEOUT = 60 * 15
+    HEAT_CYCLE_DAYS = 21
+    
+    DIMENSIONS = {
+        'cow': 'cow_id',
+        'breed': 'breed',
+        'technician': 'ai_technician',
+        'farm': 'farm_id',
+    }
+    
+    # Calving interval: LAG over each cow's calving dates
+    CALVING_INTERVAL_SQL = """
+        WITH calvings AS (
+            SELECT br.cow_id, c.farm_id, c.breed, br.ai_technician,
+                   br.actual_calving_date AS event_date,
+                   LAG(br.actual_calving_date) OVER (
+                       PARTITION BY br.cow_id ORDER BY br.actual_calving_date
+                   ) AS previous_date
+            FROM breeding_records br
+            INNER JOIN livestock_cows c ON c.id = br.cow_id
+            WHERE br.is_deleted = %s AND c.is_deleted = %s
+              AND br.actual_calving_date IS NOT NULL {farm_filter}
+        )
+        SELECT {dimension}, AVG({days}), COUNT(*)
+        FROM calvings
+        WHERE previous_date IS NOT NULL AND event_date BETWEEN %s AND %s
+        GROUP BY {dimension}
+    """
+    
+    # Days open: conception date minus the calving of the previous pregnancy
+    DAYS_OPEN_SQL = """
+        WITH conceptions AS (
+            SELECT br.cow_id, c.farm_id, c.breed, br.ai_technician,
+                   br.breeding_date AS event_date,
+                   LAG(br.actual_calving_date) OVER (
+                       PARTITION BY br.cow_id ORDER BY br.breeding_date
+                   ) AS previous_date
+            FROM breeding_records br
+            INNER JOIN livestock_cows c ON c.id = br.cow_id
+            WHERE br.is_deleted = %s AND c.is_deleted = %s
+              AND br.pregnancy_confirmed = %s {farm_filter}
+        )
+        SELECT {dimension}, AVG({days}), COUNT(*)
+        FROM conceptions
+        WHERE previous_date IS NOT NULL AND event_date BETWEEN %s AND %s
+        GROUP BY {dimension}
+    """
+    
+    SERVICES_SQL = """
+        SELECT {dimension}, COUNT(*),
+               SUM(CASE WHEN br.pregnancy_confirmed THEN 1 ELSE 0 END)
+        FROM breeding_records br
+        INNER JOIN livestock_cows c ON c.id = br.cow_id
+        WHERE br.is_deleted = %s AND c.is_deleted = %s {farm_filter}
+          AND br.breeding_date BETWEEN %s AND %s
+        GROUP BY {dimension}
+    """
+    
+    HEATS_SQL = """
+        SELECT {dimension}, COUNT(*)
+        FROM breeding_heat_detections hd
+        INNER JOIN livestock_cows c ON c.id = hd.cow_id
+        WHERE hd.is_deleted = %s AND c.is_deleted = %s {farm_filter}
+          AND hd.heat_date BETWEEN %s AND %s
+        GROUP BY {dimension}
+    """
+    
+    @staticmethod
+    def _farm_filter(farm, alias='c'):
+        if farm is None:
+            return '', []
+        return f'AND {alias}.farm_id = %s', [farm.pk]
+    
+    @staticmethod
+    def _interval_kpi(sql, dimension, farm, start_date, end_date, extra_params=()):
+        farm_filter, farm_params = ReproductiveKPIService._farm_filter(farm)
+        query = sql.format(
+            dimension=dimension,
+            farm_filter=farm_filter,
+            days=days_between_sql('event_date', 'previous_date')
+        )
+        params = [False, False, *extra_params, *farm_params, start_date, end_date]
+        return {
+            key: (round(float(average), 1), count)
+            for key, average, count in run_sql(query, params)
+        }
+    
+    @staticmethod
+    def _qualified(dimension, record_alias):
+        # Non-windowed queries read the dimension straight from the joined tables
+        if dimension in ('cow_id', 'ai_technician'):
+            return f'{record_alias}.{dimension}'
+        return f'c.{dimension}'
+    
+    @staticmethod
+    def _dimension_kpis(dimension, farm, start_date, end_date, period_days):
+        """Compute every KPI grouped by one dimension"""
+        farm_filter, farm_params = ReproductiveKPIService._farm_filter(farm)
+        calving_intervals = ReproductiveKPIService._interval_kpi(
+            ReproductiveKPIService.CALVING_INTERVAL_SQL, dimension, farm, start_date, end_date
+        )
+        days_open = ReproductiveKPIService._interval_kpi(
+            ReproductiveKPIService.DAYS_OPEN_SQL, dimension, farm, start_date, end_date,
+            extra_params=[True]
+        )
+        services = {
+            key: (total, conceptions or 0)
+            for key, total, conceptions in run_sql(
+                ReproductiveKPIService.SERVICES_SQL.format(
+                    dimension=ReproductiveKPIService._qualified(dimension, 'br'),
+                    farm_filter=farm_filter
+                ),
+                [False, False, *farm_params, start_date, end_date]
+            )
+        }
+        
+        heats, eligible = {}, {}
+        if dimension != 'ai_technician':
+            heats = dict(run_sql(
+                ReproductiveKPIService.HEATS_SQL.format(
+                    dimension=ReproductiveKPIService._qualified(dimension, 'hd'),
+                    farm_filter=farm_filter
+                ),
+                [False, False, *farm_params, start_date, end_date]
+            ))
+            # Eligibility uses each cow's stage at the end of the period, not today
+            cows = LifecycleService.cows_with_stage_on(
+                end_date, Cow.objects.filter(is_deleted=False, is_active=True)
+            ).exclude(stage_on_date__in=['calf', 'sold', 'pregnant'])
+            if farm is not None:
+                cows = cows.filter(farm=farm)
+            column = 'id' if dimension == 'cow_id' else dimension
+            eligible = dict(
+                cows.order_by().values(column).annotate(total=Count('id')).values_list(column, 'total')
+            )
+        
+        cycles = max(period_days / ReproductiveKPIService.HEAT_CYCLE_DAYS, 1)
+        keys = set(calving_intervals) | set(days_open) | set(services) | set(heats)
+        results = []
+        for key in sorted(keys, key=lambda value: (value is None, str(value))):
+            interval, calvings = calving_intervals.get(key, (None, 0))
+            open_days, _ = days_open.get(key, (None, 0))
+            total_services, conceptions = services.get(key, (0, 0))
+            row = {
+                dimension: key,
+                'calving_interval_days': interval,
+                'calvings': calvings,
+                'days_open': open_days,
+                'services': total_services,
+                'conceptions': conceptions,
+                'services_per_conception': (
+                    round(total_services / conceptions, 2) if conceptions else None
+                ),
+                'conception_rate': (
+                    round(conceptions / total_services * 100, 1) if total_services else None
+                ),
+            }
+            if dimension != 'ai_technician':
+                detected = heats.get(key, 0)
+                expected = eligible.get(key, 0) * cycles
+                row['heats_detected'] = detected
+                row['heat_detection_rate'] = (
+                    round(min(detected / expected, 1) * 100, 1) if expected else None
+                )
+            results.append(row)
+        return results
+    
+    @staticmethod
+    def _version_key(farm_id):
+        return f"analytics:reproduction:version:{farm_id or 'all'}"
+    
+    @staticmethod
+    def data_version(farm):
+        """Cache generation of a farm's KPIs (or of the all-farm view)"""
+        return cache.get_or_set(
+            ReproductiveKPIService._version_key(farm.pk if farm else None), lambda: uuid.uuid4().hex, None
+        )
+    
+    @staticmethod
+    def invalidate(farm_ids):
+        """Start a new KPI cache generation for these farms (and the all-farm view) on commit
+        
+        Breeding records, heat detections, cow saves, stage transitions and imports
+        call this; writes that bypass them (queryset .update()) wait out CACHE_TIMEOUT.
+        """
+        keys = [ReproductiveKPIService._version_key(farm_id) for farm_id in set(farm_ids) if farm_id]
+        keys.append(ReproductiveKPIService._version_key(None))
+        transaction.on_commit(lambda: cache.delete_many(keys))
+    
+    @staticmethod
+    def get_reproductive_kpis(farm, start_date, end_date):
+        """Reproductive KPIs per cow, breed, technician and farm, cached per farm-period and generation"""
+        cache_key = (
+            f"analytics:reproduction:{farm.pk if farm else 'all'}:"
+            f"{start_date.isoformat()}:{end_date.isoformat()}:{ReproductiveKPIService.data_version(farm)}"
+        )
+        
+        def compute():
+            period_days = (end_date - start_date).days + 1
+            kpis = {'period': f"{start_date} to {end_date}"}
+            for name, dimension in ReproductiveKPIService.DIMENSIONS.items():
+                kpis[f'by_{name}'] = ReproductiveKPIService._dimension_kpis(
+                    dimension, farm, start_date, end_date, period_days
+                )
+            return kpis
+        
+        return cache.get_or_set(cache_key, compute, ReproductiveKPIService.CACHE_TIMEOUT)
+
+class SireEvaluationService:
+    """Rank sires/AI straws by daughter performance and service results"""
+    
+    FIRST_LACTATION_DAYS = 305
+    RANKING_FIELDS = ['first_lactation_yield', 'calving_ease', 'conception_rate']
+    
+    # Daughters come from BreedingRecord.calf_born; their first lactation is
+    # the 305 days after their own earliest recorded calving
+    DAUGHTER_YIELD_SQL = """
+        WITH daughters AS (
+            SELECT DISTINCT br.sire_key AS sire, br.calf_born_id AS daughter_id
+            FROM breeding_records br
+            INNER JOIN livestock_cows c ON c.id = br.calf_born_id
+            WHERE br.is_deleted = %s AND c.is_deleted = %s
+              AND br.sire_key IS NOT NULL {farm_filter}
+        ),
+        first_calvings AS (
+            SELECT cow_id, MIN(actual_calving_date) AS calving_date
+            FROM breeding_records
+            WHERE is_deleted = %s AND actual_calving_date IS NOT NULL
+              AND cow_id IN (SELECT daughter_id FROM daughters)
+            GROUP BY cow_id
+        ),
+        first_lactations AS (
+            SELECT fc.cow_id AS daughter_id, SUM(mp.quantity_liters) AS total_yield
+            FROM first_calvings fc
+            INNER JOIN production_milk mp ON mp.cow_id = fc.cow_id
+            WHERE mp.is_deleted = %s
+              AND mp.date >= fc.calving_date AND mp.date < {lactation_end}
+            GROUP BY fc.cow_id
+        )
+        SELECT d.sire, COUNT(d.daughter_id), COUNT(fl.daughter_id), AVG(fl.total_yield)
+        FROM daughters d
+        LEFT JOIN first_lactations fl ON fl.daughter_id = d.daughter_id
+        GROUP BY d.sire
+    """
+    
+    @staticmethod
+    def _daughter_yields(farm):
+        farm_filter, farm_params = ReproductiveKPIService._farm_filter(farm)
+        query = SireEvaluationService.DAUGHTER_YIELD_SQL.format(
+            farm_filter=farm_filter,
+            lactation_end=date_add_sql('fc.calving_date', SireEvaluationService.FIRST_LACTATION_DAYS)
+        )
+        return {
+            sire: {
+                'daughters': daughters,
+                'daughters_with_lactation': lactations,
+                'first_lactation_yield': round(float(average), 1) if average is not None else None,
+            }
+            for sire, daughters, lactations, average in run_sql(
+                query, [False, False, *farm_params, False, False]
+            )
+        }
+    
+    @staticmethod
+    def _service_results(farm):
+        records = BreedingRecord.objects.filter(
+            is_deleted=False, sire_key__isnull=False
+        )
+        if farm is not None:
+            records = records.filter(cow__farm=farm)
+        
+        calved = Q(actual_calving_date__isnull=False)
+        return {
+            row['sire']: row
+            for row in records.annotate(sire=F('sire_key')).order_by().values('sire').annotate(
+                label=Max(Trim('bull_info')),
+                services=Count('id'),
+                conceptions=Count('id', filter=Q(pregnancy_confirmed=True)),
+                calvings=Count('id', filter=calved),
+                difficult_calvings=Count('id', filter=calved & Q(calving_complications__gt='')),
+            )
+        }
+    
+    @staticmethod
+    def rank_sires(farm=None, order_by='first_lactation_yield', min_daughters=0):
+        """Sire league table from two grouped queries over every farm's history"""
+        yields = SireEvaluationService._daughter_yields(farm)
+        services = SireEvaluationService._service_results(farm)
+        
+        sires = []
+        for sire in set(yields) | set(services):
+            daughter_stats = yields.get(sire, {})
+            service_stats = services.get(sire, {})
+            if daughter_stats.get('daughters', 0) < min_daughters:
+                continue
+            
+            total_services = service_stats.get('services', 0)
+            conceptions = service_stats.get('conceptions', 0)
+            calvings = service_stats.get('calvings', 0)
+            difficult = service_stats.get('difficult_calvings', 0)
+            sires.append({
+                'sire': service_stats.get('label', sire),
+                'daughters': daughter_stats.get('daughters', 0),
+                'daughters_with_lactation': daughter_stats.get('daughters_with_lactation', 0),
+                'first_lactation_yield': daughter_stats.get('first_lactation_yield'),
+                'calvings': calvings,
+                'difficult_calvings': difficult,
+                'calving_ease': round((calvings - difficult) / calvings * 100, 1) if calvings else None,
+                'services': total_services,
+                'conceptions': conceptions,
+                'conception_rate': round(conceptions / total_services * 100, 1) if total_services else None,
+            })
+        
+        # Highest first, sires without data for the ranking metric last
+        sires.sort(key=lambda row: (row[order_by] is None, -(row[order_by] or 0), row['sire']))
+        for rank, row in enumerate(sires, start=1):
+            row['rank'] = rank
+        return sires
@@ -1,3 +1,119 @@
+# apps/analytics/tests.py
+from datetime import timedelta
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.authentication.models import User
+from apps.breeding.models import BreedingRecord
+from apps.common.testing import create_cow
+from apps.farms.models import Farm
+from apps.livestock.models import Cow
+from apps.production.models import MilkProduction
+from .services import ReproductiveKPIService, SireEvaluationService
 
-# Create your tests here.
+class ReproductiveKPITests(TestCase):
+    """Window-function KPIs computed in SQL, cached per farm until its source data changes"""
+    
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.now().date()
+        self.farm = Farm.objects.create(name='Green Acres', location='Nakuru')
+        self.cow = Cow.objects.create(
+            farm=self.farm, name='Daisy', tag_number='T1', breed='friesian',
+            date_acquired=self.today - timedelta(days=2000), acquisition_cost=50000
+        )
+        self.admin = User.objects.create_user(
+            email='admin@example.com', username='admin', password='pass',
+            first_name='Ada', last_name='Admin', role='admin'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+    
+    def create_service(self, days_ago, calved_after=None, confirmed=True):
+        bred = self.today - timedelta(days=days_ago)
+        return BreedingRecord.objects.create(
+            cow=self.cow, breeding_date=bred, heat_detected_date=bred,
+            expected_calving_date=bred + timedelta(days=283), pregnancy_confirmed=confirmed,
+            actual_calving_date=bred + timedelta(days=calved_after) if calved_after else None,
+            ai_technician='Tom'
+        )
+    
+    def kpis(self):
+        start_date = self.today - timedelta(days=1500)
+        return ReproductiveKPIService.get_reproductive_kpis(self.farm, start_date, self.today)
+    
+    def test_calving_interval_and_days_open_from_lag(self):
+        # Calvings 400 days apart; the second conception came 117 days after the first calving
+        self.create_service(900, calved_after=283)
+        self.create_service(500, calved_after=283)
+        self.create_service(420, confirmed=False)
+        
+        by_cow = self.kpis()['by_cow']
+        self.assertEqual(len(by_cow), 1)
+        row = by_cow[0]
+        self.assertEqual(row['calving_interval_days'], 400.0)
+        self.assertEqual(row['calvings'], 1)
+        self.assertEqual(row['days_open'], 117.0)
+        self.assertEqual(row['services'], 3)
+        self.assertEqual(row['conceptions'], 2)
+        self.assertEqual(row['services_per_conception'], 1.5)
+    
+    def test_cache_follows_data_changes(self):
+        self.create_service(900, calved_after=283)
+        self.assertIsNone(self.kpis()['by_cow'][0]['calving_interval_days'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_service(500, calved_after=283)
+        self.assertEqual(self.kpis()['by_cow'][0]['calving_interval_days'], 400.0)
+    
+    def test_other_farms_keep_their_cache(self):
+        self.create_service(900, calved_after=283)
+        version = ReproductiveKPIService.data_version(self.farm)
+        other_farm = Farm.objects.create(name='Hill Top', location='Nyeri')
+        with self.captureOnCommitCallbacks(execute=True):
+            create_cow(other_farm)
+        self.assertEqual(ReproductiveKPIService.data_version(self.farm), version)
+        self.assertNotEqual(ReproductiveKPIService.data_version(other_farm), version)
+    
+    def test_impossible_date_is_a_bad_request(self):
+        response = self.client.get('/api/analytics/reproduction/', {'end_date': '2024-02-30'})
+        self.assertEqual(response.status_code, 400)
+
+class SireEvaluationTests(TestCase):
+    """Sires are ranked under the same identity the pedigree uses"""
+    
+    def setUp(self):
+        self.today = timezone.now().date()
+        self.farm = Farm.objects.create(name='Green Acres', location='Nakuru')
+    
+    def breed(self, cow, sire, days_ago, calf=None, confirmed=True):
+        bred = self.today - timedelta(days=days_ago)
+        return BreedingRecord.objects.create(
+            cow=cow, breeding_date=bred, heat_detected_date=bred, bull_info=sire,
+            pregnancy_confirmed=confirmed, calf_born=calf,
+            actual_calving_date=bred + timedelta(days=283) if calf else None
+        )
+    
+    def test_spelling_variants_rank_as_one_sire(self):
+        daughter = create_cow(self.farm)
+        self.breed(create_cow(self.farm), 'Bull  X', 1200, calf=daughter)
+        self.breed(create_cow(self.farm), ' bull x', 300, confirmed=False)
+        self.breed(create_cow(self.farm), 'Bull Y', 300)
+        # The daughter's own first calving starts her first lactation
+        self.breed(daughter, 'Bull Y', 400, calf=create_cow(self.farm))
+        for days_ago in (100, 101):
+            MilkProduction.objects.create(
+                cow=daughter, date=self.today - timedelta(days=days_ago),
+                session='morning', quantity_liters=10
+            )
+        
+        sires = SireEvaluationService.rank_sires()
+        self.assertEqual([row['rank'] for row in sires], [1, 2])
+        bull_x = sires[0]
+        self.assertEqual(bull_x['sire'].lower().split(), ['bull', 'x'])
+        self.assertEqual(bull_x['services'], 2)
+        self.assertEqual(bull_x['conception_rate'], 50.0)
+        self.assertEqual(bull_x['daughters'], 1)
+        self.assertEqual(bull_x['first_lactation_yield'], 20.0)
+        self.assertEqual(sires[1]['services'], 2)
+        self.assertIsNone(sires[1]['first_lactation_yield'])
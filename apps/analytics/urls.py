@@ -1,7 +1,10 @@
 from django.urls import path
+from . import views
 
 app_name = 'analytics'
 
 urlpatterns = [
-    # URLs will be added later
+    path('reproduction/', views.ReproductiveKPIView.as_view(), name='reproductive-kpis'),
+    path('milk-by-stage/', views.MilkByStageView.as_view(), name='milk-by-stage'),
+    path('sires/', views.SireEvaluationView.as_view(), name='sire-evaluation'),
 ]
@@ -1,3 +1,77 @@
-from django.shortcuts import render
+# apps/analytics/views.py
+from datetime import timedelta
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from apps.common.dates import get_date_param
+from apps.farms.models import Farm
+from .services import AnalyticsService, ReproductiveKPIService, SireEvaluationService
 
-# Create your views here.
+class AnalyticsPeriodMixin:
+    """Shared farm and period resolution for analytics endpoints"""
+    
+    DEFAULT_PERIOD_DAYS = 365
+    
+    def get_period(self):
+        params = self.request.query_params
+        end_date = get_date_param(params, 'end_date', timezone.now().date())
+        start_date = get_date_param(
+            params, 'start_date', end_date - timedelta(days=self.DEFAULT_PERIOD_DAYS)
+        )
+        if start_date > end_date:
+            raise serializers.ValidationError({'start_date': 'Must be on or before end_date.'})
+        return start_date, end_date
+    
+    def get_farm(self):
+        """Farmers are pinned to their farm; admins may pick one or see all farms"""
+        user = self.request.user
+        if not user.is_admin:
+            return get_object_or_404(Farm, pk=user.assigned_farm_id, is_deleted=False)
+        farm_id = self.request.query_params.get('farm')
+        if not farm_id:
+            return None
+        return get_object_or_404(Farm, pk=farm_id, is_deleted=False)
+
+class ReproductiveKPIView(AnalyticsPeriodMixin, APIView):
+    """Calving interval, days open, conception and heat detection KPIs"""
+    
+    def get(self, request):
+        start_date, end_date = self.get_period()
+        farm = self.get_farm()
+        kpis = ReproductiveKPIService.get_reproductive_kpis(farm, start_date, end_date)
+        return Response({'farm': farm.pk if farm else None, **kpis})
+
+class MilkByStageView(AnalyticsPeriodMixin, APIView):
+    """Milk production grouped by each cow's lifecycle stage on the milking date"""
+    
+    DEFAULT_PERIOD_DAYS = 30
+    
+    def get(self, request):
+        start_date, end_date = self.get_period()
+        farm = self.get_farm()
+        stats = AnalyticsService.get_milk_production_by_stage(farm, start_date, end_date)
+        return Response({'farm': farm.pk if farm else None, **stats})
+
+
+class SireEvaluationView(AnalyticsPeriodMixin, APIView):
+    """Sire/AI straw ranking by daughters' yield, calving ease and conception"""
+    
+    def get(self, request):
+        order_by = request.query_params.get('order_by', 'first_lactation_yield')
+        if order_by not in SireEvaluationService.RANKING_FIELDS:
+            raise serializers.ValidationError(
+                {'order_by': f"Choose one of {', '.join(SireEvaluationService.RANKING_FIELDS)}."}
+            )
+        try:
+            min_daughters = int(request.query_params.get('min_daughters', 0))
+        except ValueError:
+            raise serializers.ValidationError({'min_daughters': 'Must be a whole number.'})
+        
+        farm = self.get_farm()
+        return Response({
+            'farm': farm.pk if farm else None,
+            'order_by': order_by,
+            'sires': SireEvaluationService.rank_sires(farm, order_by, min_daughters),
+        })
@@ -55,15 +55,18 @@ class AuthenticationConfig(AppConfig):
 # apps/authentication/serializers.py
 from rest_framework import serializers
 from django.contrib.auth import authenticate
+from apps.common.serializers import ImageVariantsField
 from .models import User
 
 class UserSerializer(serializers.ModelSerializer):
+    profile_picture_variants = ImageVariantsField()
+    
     class Meta:
         model = User
         fields = [
             'id', 'email', 'first_name', 'last_name', 'phone_number',
-            'role', 'assigned_farm', 'profile_picture', 'is_active',
-            'date_joined'
+            'role', 'assigned_farm', 'profile_picture', 'profile_picture_variants',
+            'is_active', 'date_joined'
         ]
         read_only_fields = ['id', 'date_joined']
 
@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete
 
 class AuthenticationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.authentication'
-    verbose_name = 'Authentication'
\ No newline at end of file
+    verbose_name = 'Authentication'
+    
+    def ready(self):
+        from rest_framework.authtoken.models import Token
+        from .authentication import revoke_deleted_token
+        post_delete.connect(revoke_deleted_token, sender=Token)
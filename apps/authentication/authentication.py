@@ -0,0 +1,106 @@
+# apps/authentication/authentication.py
+import hashlib
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from apps.common.cache import LocalCache
+
+TOKEN_LOCAL_TIMEOUT = 5
+TOKEN_SHARED_TIMEOUT = 60 * 5
+
+# User columns copied into the cached snapshot; the rest load lazily if touched
+TOKEN_USER_FIELDS = [
+    'id', 'email', 'username', 'first_name', 'last_name', 'role',
+    'assigned_farm_id', 'is_active', 'is_staff', 'is_superuser', 'profile_picture',
+]
+
+class TokenCacheService:
+    """Token to user snapshots held in an in-process cache backed by the shared cache.
+    
+    Deleting a token (logout, admin, user deletion) evicts it from the shared
+    cache on commit, but other processes may keep serving it from their local
+    cache for up to TOKEN_LOCAL_TIMEOUT seconds. Writes that bypass model
+    signals, such as raw SQL, stay cached for up to TOKEN_SHARED_TIMEOUT.
+    """
+    
+    local_cache = LocalCache(TOKEN_LOCAL_TIMEOUT)
+    
+    @staticmethod
+    def _key(token_key):
+        # Hashed so raw tokens never sit in Redis
+        return f"auth:token:{hashlib.sha256(token_key.encode()).hexdigest()}"
+    
+    @staticmethod
+    def get(token_key):
+        key = TokenCacheService._key(token_key)
+        snapshot = TokenCacheService.local_cache.get(key)
+        if snapshot is None:
+            snapshot = cache.get(key)
+            if snapshot is not None:
+                TokenCacheService.local_cache.set(key, snapshot)
+        return snapshot
+    
+    @staticmethod
+    def set(token_key, snapshot):
+        key = TokenCacheService._key(token_key)
+        cache.set(key, snapshot, TOKEN_SHARED_TIMEOUT)
+        TokenCacheService.local_cache.set(key, snapshot)
+    
+    @staticmethod
+    def invalidate_tokens(token_keys):
+        keys = [TokenCacheService._key(token_key) for token_key in token_keys]
+        if keys:
+            cache.delete_many(keys)
+            TokenCacheService.local_cache.delete_many(keys)
+    
+    @staticmethod
+    def invalidate_user(user_id):
+        """Drop cached snapshots for a user's tokens once the current transaction commits.
+        
+        The keys are read up front so this also works when the tokens are about
+        to be deleted along with the user.
+        """
+        from rest_framework.authtoken.models import Token
+        
+        token_keys = list(Token.objects.filter(user_id=user_id).values_list('key', flat=True))
+        transaction.on_commit(lambda: TokenCacheService.invalidate_tokens(token_keys))
+
+def revoke_deleted_token(sender, instance, **kwargs):
+    """post_delete hook so tokens removed anywhere stop authenticating"""
+    token_key = instance.key
+    transaction.on_commit(lambda: TokenCacheService.invalidate_tokens([token_key]))
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that skips the token and user queries on a cache hit.
+    
+    The user is rebuilt from a snapshot with every other column deferred, so
+    saving it only writes the snapshot fields.
+    """
+    
+    def authenticate_credentials(self, key):
+        from apps.authentication.models import User
+        
+        snapshot = TokenCacheService.get(key)
+        if snapshot is None:
+            snapshot = self.load_snapshot(key)
+            TokenCacheService.set(key, snapshot)
+        
+        if not snapshot['is_active']:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        
+        # from_db expects the loaded values in model field order
+        fields = [field.attname for field in User._meta.concrete_fields if field.attname in snapshot]
+        user = User.from_db('default', fields, [snapshot[field] for field in fields])
+        token = self.get_model().from_db('default', ['key', 'user_id'], [key, user.pk])
+        token.user = user
+        return user, token
+    
+    def load_snapshot(self, key):
+        """Token and user columns in one query"""
+        row = self.get_model().objects.filter(key=key).values(
+            *[f'user__{field}' for field in TOKEN_USER_FIELDS]
+        ).first()
+        if row is None:
+            raise exceptions.AuthenticationFailed('Invalid token.')
+        return {field: row[f'user__{field}'] for field in TOKEN_USER_FIELDS}
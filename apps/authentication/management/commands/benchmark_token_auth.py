@@ -0,0 +1,63 @@
+# apps/authentication/management/commands/benchmark_token_auth.py
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+from apps.authentication.authentication import CachedTokenAuthentication, TokenCacheService
+from apps.authentication.models import User
+
+class PingView(APIView):
+    """Authenticated no-op so the timings measure authentication, not the view"""
+    
+    def get(self, request):
+        return Response({'user': request.user.pk, 'farm': request.user.assigned_farm_id})
+
+class Command(BaseCommand):
+    help = 'Compare requests per second for token authentication with and without the cache'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+    
+    def handle(self, *args, **options):
+        count = options['requests']
+        if count < 1:
+            raise CommandError('--requests must be at least 1.')
+        
+        # Runs against a throwaway user that is rolled back afterwards
+        with transaction.atomic():
+            user = User.objects.create_user(
+                email='token-benchmark@example.com', username='token-benchmark',
+                password=None, first_name='Token', last_name='Benchmark'
+            )
+            token = Token.objects.create(user=user)
+            TokenCacheService.invalidate_tokens([token.key])
+            for name, auth_class in [
+                ('TokenAuthentication', TokenAuthentication),
+                ('CachedTokenAuthentication', CachedTokenAuthentication),
+            ]:
+                self.run(name, auth_class, token.key, count)
+            TokenCacheService.invalidate_tokens([token.key])
+            transaction.set_rollback(True)
+    
+    def run(self, name, auth_class, key, count):
+        view = PingView.as_view(authentication_classes=[auth_class])
+        factory = APIRequestFactory()
+        requests = [factory.get('/ping/', HTTP_AUTHORIZATION=f'Token {key}') for _ in range(count)]
+        
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for request in requests:
+                response = view(request)
+                if response.status_code != 200:
+                    raise CommandError(f'{name} rejected the benchmark token.')
+            elapsed = time.perf_counter() - started
+        
+        self.stdout.write(
+            f'{name:<28} {count / elapsed:>10.0f} req/s  '
+            f'{len(queries) / count:.2f} queries/request'
+        )
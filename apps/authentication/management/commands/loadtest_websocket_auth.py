@@ -0,0 +1,71 @@
+# apps/authentication/management/commands/loadtest_websocket_auth.py
+import asyncio
+import time
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.authtoken.models import Token
+from apps.authentication.authentication import TokenCacheService
+from apps.authentication.models import User
+
+class Command(BaseCommand):
+    help = 'Open a burst of token-authenticated WebSocket connections against the in-memory channel layer'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=500)
+        parser.add_argument('--users', type=int, default=25)
+    
+    def handle(self, *args, **options):
+        if options['connections'] < 1 or options['users'] < 1:
+            raise CommandError('--connections and --users must be at least 1.')
+        
+        # Channels closes the connection between lookups, so clean up explicitly rather than rolling back
+        users = [
+            User.objects.create_user(
+                email=f'ws-load-{i}@example.com', username=f'ws-load-{i}', password=None,
+                first_name='Load', last_name=str(i)
+            )
+            for i in range(options['users'])
+        ]
+        keys = []
+        try:
+            keys = [Token.objects.create(user=user).key for user in users]
+            TokenCacheService.invalidate_tokens(keys)
+            with override_settings(
+                CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+            ), CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                accepted = async_to_sync(self.storm)(keys, options['connections'])
+                elapsed = time.perf_counter() - started
+        finally:
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+            TokenCacheService.invalidate_tokens(keys)
+        
+        token_queries = sum('authtoken_token' in query['sql'] for query in queries)
+        self.stdout.write(
+            f"{accepted}/{options['connections']} connections accepted in {elapsed:.2f}s "
+            f"({options['connections'] / elapsed:.0f}/s), {token_queries} token lookups "
+            f"for {len(keys)} users"
+        )
+    
+    async def storm(self, keys, count):
+        from config.asgi import application
+        
+        async def connect(i):
+            communicator = ApplicationCommunicator(application, {
+                'type': 'websocket',
+                'path': '/ws/notifications/',
+                'query_string': f'token={keys[i % len(keys)]}'.encode(),
+                'headers': [],
+                'subprotocols': [],
+            })
+            await communicator.send_input({'type': 'websocket.connect'})
+            response = await communicator.receive_output(timeout=10)
+            await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await communicator.wait(timeout=10)
+            return response['type'] == 'websocket.accept'
+        
+        results = await asyncio.gather(*(connect(i) for i in range(count)))
+        return sum(results)
@@ -1,9 +1,12 @@
 # apps/authentication/managers.py
 from django.contrib.auth.models import BaseUserManager
+from django.db.models import Q
 
 class UserManager(BaseUserManager):
     """Custom manager for User model"""
     
+    use_in_migrations = True
+    
     def create_user(self, email, password=None, **extra_fields):
         if not email:
             raise ValueError('Email is required')
@@ -31,3 +34,10 @@ class UserManager(BaseUserManager):
     
     def get_farmers(self):
         return self.filter(role='farmer', is_active=True)
+    
+    def get_audience(self, farm_id=None, roles=()):
+        """Active users in the given roles plus the active farmers assigned to a farm"""
+        audience = Q(role__in=roles)
+        if farm_id is not None:
+            audience |= Q(role='farmer', assigned_farm_id=farm_id)
+        return self.filter(audience, is_active=True)
@@ -0,0 +1,59 @@
+# apps/authentication/middleware.py
+import asyncio
+from urllib.parse import parse_qs
+from channels.auth import AuthMiddlewareStack
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework import exceptions
+from .authentication import CachedTokenAuthentication
+
+class TokenAuthMiddleware(BaseMiddleware):
+    """Populate scope["user"] from a DRF token, resolved once when the socket connects.
+    
+    The token comes from an "Authorization: Token <key>" header or a ?token=
+    query parameter. Lookups go through the cached token authentication, and
+    connections that arrive together with the same token share one lookup.
+    """
+    
+    def __init__(self, inner):
+        super().__init__(inner)
+        # Shared by every connection on purpose: it holds in-flight lookups only
+        self.pending = {}
+    
+    @staticmethod
+    def get_token(scope):
+        for name, value in scope.get('headers', []):
+            if name == b'authorization':
+                parts = value.decode('latin1').split()
+                if len(parts) == 2 and parts[0].lower() == 'token':
+                    return parts[1]
+        query = parse_qs(scope.get('query_string', b'').decode())
+        return (query.get('token') or [None])[0]
+    
+    @database_sync_to_async
+    def authenticate(self, key):
+        try:
+            user, _ = CachedTokenAuthentication().authenticate_credentials(key)
+        except exceptions.AuthenticationFailed:
+            return AnonymousUser()
+        return user
+    
+    async def resolve_user(self, key):
+        lookup = self.pending.get(key)
+        if lookup is None:
+            lookup = asyncio.ensure_future(self.authenticate(key))
+            self.pending[key] = lookup
+            lookup.add_done_callback(lambda _: self.pending.pop(key, None))
+        # Shielded so one client hanging up does not cancel the lookup for the rest
+        return await asyncio.shield(lookup)
+    
+    async def __call__(self, scope, receive, send):
+        key = self.get_token(scope)
+        if key:
+            scope = dict(scope, user=await self.resolve_user(key))
+        return await super().__call__(scope, receive, send)
+
+def TokenAuthMiddlewareStack(inner):
+    """Token authentication with the session cookie as a fallback for browsers"""
+    return AuthMiddlewareStack(TokenAuthMiddleware(inner))
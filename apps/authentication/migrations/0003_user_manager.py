@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:32
+
+import apps.authentication.managers
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_user_profile_picture_variants'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', apps.authentication.managers.UserManager()),
+            ],
+        ),
+    ]
@@ -2,6 +2,7 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from apps.common.models import TimeStampedModel
+from .managers import UserManager
 
 class User(AbstractUser, TimeStampedModel):
     """Custom User model with farm assignment and role management"""
@@ -27,6 +28,14 @@ class User(AbstractUser, TimeStampedModel):
         null=True, 
         blank=True
     )
+    profile_picture_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text="Resized JPEG/WebP copies, filled in by a background task"
+    )
+    
+    objects = UserManager()
     
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
@@ -39,6 +48,45 @@ class User(AbstractUser, TimeStampedModel):
     def __str__(self):
         return f"{self.get_full_name()} ({self.email})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_picture = instance.__dict__.get('profile_picture')
+        instance._loaded_access = instance._access_state()
+        return instance
+    
+    def _access_state(self):
+        """Fields that decide what a cached token session may do"""
+        return tuple(self.__dict__.get(field) for field in ('role', 'is_active', 'assigned_farm_id'))
+    
+    def save(self, *args, **kwargs):
+        from apps.common.images import queue_image_variants
+        
+        # A new upload invalidates the old variants until the task rebuilds them
+        picture = self.profile_picture.name if self.profile_picture else ''
+        picture_changed = (getattr(self, '_loaded_picture', None) or '') != picture
+        if picture_changed:
+            self.profile_picture_variants = {}
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'profile_picture_variants'}
+        super().save(*args, **kwargs)
+        # The upload is renamed into upload_to on save, so track the stored name
+        self._loaded_picture = self.profile_picture.name if self.profile_picture else ''
+        
+        # Cached token sessions must not outlive a role, farm or deactivation change
+        access = self._access_state()
+        if getattr(self, '_loaded_access', access) != access:
+            from .authentication import TokenCacheService
+            TokenCacheService.invalidate_user(self.pk)
+        self._loaded_access = access
+        if picture_changed:
+            queue_image_variants(self, 'profile_picture', 'profile_picture_variants')
+    
+    def delete(self, *args, **kwargs):
+        from .authentication import TokenCacheService
+        TokenCacheService.invalidate_user(self.pk)
+        return super().delete(*args, **kwargs)
+    
     @property
     def is_admin(self):
         return self.role == 'admin'
@@ -48,7 +96,8 @@ class User(AbstractUser, TimeStampedModel):
         return self.role == 'farmer'
     
     def can_access_farm(self, farm):
-        """Check if user can access a specific farm"""
+        """Check if user can access a specific farm (a Farm or its id)"""
         if self.is_admin:
             return True
-        return self.assigned_farm == farm
+        farm_id = getattr(farm, 'pk', farm)
+        return farm_id is not None and self.assigned_farm_id == farm_id
@@ -1,5 +1,6 @@
 # apps/authentication/permissions.py
 from rest_framework import permissions
+from apps.common.scoping import get_object_farm_id
 
 class IsAdminUser(permissions.BasePermission):
     """Permission class for admin users only"""
@@ -28,12 +29,6 @@ class CanAccessFarm(permissions.BasePermission):
         if request.user.is_admin:
             return True
         
-        # Check if object has farm attribute
-        if hasattr(obj, 'farm'):
-            return request.user.can_access_farm(obj.farm)
-        
-        # If object is a farm itself
-        if hasattr(obj, 'farmers'):
-            return request.user.can_access_farm(obj)
-        
-        return False
\ No newline at end of file
+        # Compare foreign key ids so the Farm row is never loaded
+        farm_id = get_object_farm_id(obj)
+        return farm_id is not None and farm_id == request.user.assigned_farm_id
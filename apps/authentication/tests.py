@@ -1,3 +1,118 @@
-from django.test import TestCase
+# apps/authentication/tests.py
+import asyncio
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from apps.farms.models import Farm
+from .authentication import TokenCacheService
+from .models import User
 
-# Create your tests here.
+class CachedTokenAuthenticationTests(TestCase):
+    """Cached token sessions skip the database and drop on access changes"""
+    
+    def setUp(self):
+        cache.clear()
+        TokenCacheService.local_cache.clear()
+        self.farm = Farm.objects.create(name='Green Acres', location='Nakuru')
+        self.farmer = User.objects.create_user(
+            email='farmer@example.com', username='farmer', password='pass',
+            first_name='Fay', last_name='Farmer', role='farmer', assigned_farm=self.farm
+        )
+        self.client = APIClient()
+        response = self.client.post(
+            '/api/auth/login/', {'email': 'farmer@example.com', 'password': 'pass'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {response.json()['token']}")
+    
+    def get_farms(self):
+        return self.client.get('/api/farms/')
+    
+    def test_cache_hit_skips_token_and_user_queries(self):
+        self.assertEqual(self.get_farms().status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_farms()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 1)
+        self.assertFalse(any('authtoken_token' in query['sql'] for query in queries))
+    
+    def test_deactivation_revokes_cached_session(self):
+        self.assertEqual(self.get_farms().status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.farmer.is_active = False
+            self.farmer.save()
+        self.assertEqual(self.get_farms().status_code, 401)
+    
+    def test_role_change_refreshes_cached_session(self):
+        Farm.objects.create(name='Hillside', location='Kisii')
+        self.assertEqual(self.get_farms().json()['count'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.farmer.role = 'admin'
+            self.farmer.save()
+        self.assertEqual(self.get_farms().json()['count'], 2)
+    
+    def test_logout_revokes_cached_session(self):
+        self.assertEqual(self.get_farms().status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post('/api/auth/logout/').status_code, 204)
+        self.assertEqual(self.get_farms().status_code, 401)
+    
+    def test_deleted_token_is_revoked_wherever_it_is_deleted(self):
+        self.assertEqual(self.get_farms().status_code, 200)
+        # As the admin's delete view does: one token row, outside any logout
+        with self.captureOnCommitCallbacks(execute=True):
+            Token.objects.get(user=self.farmer).delete()
+        self.assertEqual(self.get_farms().status_code, 401)
+
+class TokenAuthMiddlewareTests(TransactionTestCase):
+    """WebSocket connections authenticate from a token with one lookup per token"""
+    
+    def setUp(self):
+        cache.clear()
+        TokenCacheService.local_cache.clear()
+        self.user = User.objects.create_user(
+            email='farmer@example.com', username='farmer', password='pass',
+            first_name='Fay', last_name='Farmer'
+        )
+        self.token = Token.objects.create(user=self.user)
+    
+    async def connect(self, query_string=b'', headers=None):
+        from config.asgi import application
+        
+        communicator = ApplicationCommunicator(application, {
+            'type': 'websocket',
+            'path': '/ws/notifications/',
+            'query_string': query_string,
+            'headers': headers or [],
+            'subprotocols': [],
+        })
+        await communicator.send_input({'type': 'websocket.connect'})
+        response = await communicator.receive_output(timeout=5)
+        await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await communicator.wait(timeout=5)
+        return response['type']
+    
+    def test_header_and_query_tokens_are_accepted(self):
+        header = [(b'authorization', f'Token {self.token.key}'.encode())]
+        self.assertEqual(async_to_sync(self.connect)(headers=header), 'websocket.accept')
+        query = f'token={self.token.key}'.encode()
+        self.assertEqual(async_to_sync(self.connect)(query_string=query), 'websocket.accept')
+    
+    def test_invalid_token_is_rejected(self):
+        self.assertEqual(async_to_sync(self.connect)(query_string=b'token=nope'), 'websocket.close')
+    
+    def test_connection_burst_shares_one_lookup(self):
+        query = f'token={self.token.key}'.encode()
+        
+        async def burst():
+            return await asyncio.gather(*(self.connect(query_string=query) for _ in range(20)))
+        
+        with CaptureQueriesContext(connection) as queries:
+            results = async_to_sync(burst)()
+        self.assertEqual(set(results), {'websocket.accept'})
+        self.assertEqual(sum('authtoken_token' in query['sql'] for query in queries), 1)
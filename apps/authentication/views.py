@@ -1,3 +1,32 @@
-from django.shortcuts import render
+# apps/authentication/views.py
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .admin import LoginSerializer, UserSerializer
 
-# Create your views here.
+class LoginView(APIView):
+    """Exchange email and password for an API token"""
+    
+    permission_classes = [AllowAny]
+    
+    def post(self, request):
+        serializer = LoginSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+        token, _ = Token.objects.get_or_create(user=user)
+        return Response({
+            'token': token.key,
+            'user': UserSerializer(user, context={'request': request}).data,
+        })
+
+class LogoutView(APIView):
+    """Revoke the caller's token and its cached session"""
+    
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        # post_delete evicts the cached sessions
+        Token.objects.filter(user_id=request.user.pk).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -1,8 +1,33 @@
 # apps/breeding/admin.py
+from datetime import timedelta
 from django.contrib import admin
+from django.utils import timezone
 from django.utils.html import format_html
 from .models import BreedingRecord, HeatDetection
 
+class CalvingStatusFilter(admin.SimpleListFilter):
+    """Filter breeding records on the annotated calving status"""
+    
+    title = 'calving status'
+    parameter_name = 'calving_status'
+    
+    def lookups(self, request, model_admin):
+        return [
+            ('overdue', 'Overdue'),
+            ('due_7', 'Due within 7 days'),
+            ('due_30', 'Due within 30 days'),
+        ]
+    
+    def queryset(self, request, queryset):
+        today = timezone.now().date()
+        if self.value() == 'overdue':
+            return queryset.filter(calving_overdue=True)
+        if self.value() == 'due_7':
+            return queryset.due_between(today, today + timedelta(days=7))
+        if self.value() == 'due_30':
+            return queryset.due_between(today, today + timedelta(days=30))
+        return queryset
+
 @admin.register(BreedingRecord)
 class BreedingRecordAdmin(admin.ModelAdmin):
     list_display = [
@@ -11,8 +36,8 @@ class BreedingRecordAdmin(admin.ModelAdmin):
         'is_overdue'
     ]
     list_filter = [
-        'breeding_method', 'pregnancy_confirmed', 'breeding_date',
-        'cow__farm'
+        CalvingStatusFilter, 'breeding_method', 'pregnancy_confirmed',
+        'breeding_date', 'cow__farm'
     ]
     search_fields = ['cow__name', 'cow__tag_number', 'bull_info', 'ai_technician']
     ordering = ['-breeding_date']
@@ -44,10 +69,15 @@ class BreedingRecordAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'cow__farm'
+        ).with_calving_status()
+    
     def days_to_calving(self, obj):
-        days = obj.days_to_calving
-        if days is None:
+        if obj.calving_due_in is None:
             return "-"
+        days = obj.calving_due_in.days
         if days < 0:
             return format_html('<span style="color: red;">Overdue by {} days</span>', abs(days))
         elif days <= 7:
@@ -55,13 +85,13 @@ class BreedingRecordAdmin(admin.ModelAdmin):
         else:
             return f"{days} days"
     days_to_calving.short_description = 'Days to Calving'
+    days_to_calving.admin_order_field = 'calving_due_in'
     
     def is_overdue(self, obj):
-        if obj.is_overdue:
-            return format_html('<span style="color: red;">Yes</span>')
-        return "No"
+        return obj.calving_overdue
     is_overdue.short_description = 'Overdue'
     is_overdue.boolean = True
+    is_overdue.admin_order_field = 'calving_overdue'
 
 @admin.register(HeatDetection)
 class HeatDetectionAdmin(admin.ModelAdmin):
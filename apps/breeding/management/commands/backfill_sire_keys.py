@@ -0,0 +1,30 @@
+# apps/breeding/management/commands/backfill_sire_keys.py
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from apps.breeding.models import BreedingRecord
+from apps.livestock.services import normalize_sire
+
+BACKFILL_BATCH_SIZE = 1000
+
+class Command(BaseCommand):
+    help = 'Backfill the normalized sire key used by sire rankings on breeding records'
+    
+    def handle(self, *args, **options):
+        # Covers rows written before sire_key existed and by .update()/bulk_create
+        records = BreedingRecord.objects.filter(
+            Q(bull_info__isnull=False) | Q(sire_key__isnull=False)
+        ).only('id', 'bull_info', 'sire_key').order_by('pk')
+        
+        stale = []
+        updated = 0
+        for record in records.iterator(chunk_size=BACKFILL_BATCH_SIZE):
+            sire_key = normalize_sire(record.bull_info)
+            if record.sire_key != sire_key:
+                record.sire_key = sire_key
+                stale.append(record)
+            if len(stale) == BACKFILL_BATCH_SIZE:
+                updated += BreedingRecord.objects.bulk_update(stale, ['sire_key'])
+                stale = []
+        updated += BreedingRecord.objects.bulk_update(stale, ['sire_key'])
+        
+        self.stdout.write(self.style.SUCCESS(f'Backfilled the sire key on {updated} breeding records.'))
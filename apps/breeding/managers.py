@@ -0,0 +1,44 @@
+# apps/breeding/managers.py
+from django.db import models
+from django.db.models import (
+    BooleanField, Case, DurationField, ExpressionWrapper, F, Q, Value, When
+)
+from django.utils import timezone
+from apps.common.scoping import FarmScopedQuerySetMixin
+
+class BreedingRecordQuerySet(FarmScopedQuerySetMixin, models.QuerySet):
+    """Queryset helpers for breeding records"""
+    
+    def active(self):
+        return self.filter(is_deleted=False, cow__is_deleted=False)
+    
+    def pending_calving(self):
+        """Confirmed pregnancies that have not calved yet"""
+        return self.filter(pregnancy_confirmed=True, actual_calving_date__isnull=True)
+    
+    def with_calving_status(self, today=None):
+        """Annotate days to calving and overdue flag as database expressions"""
+        today = today or timezone.now().date()
+        pending = Q(pregnancy_confirmed=True, actual_calving_date__isnull=True)
+        
+        return self.annotate(
+            calving_due_in=Case(
+                When(pending, then=ExpressionWrapper(
+                    F('expected_calving_date') - Value(today, output_field=models.DateField()),
+                    output_field=DurationField()
+                )),
+                default=None,
+                output_field=DurationField()
+            ),
+            calving_overdue=Case(
+                When(pending & Q(expected_calving_date__lt=today), then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField()
+            ),
+        )
+    
+    def due_between(self, start_date, end_date):
+        """Pending calvings expected within a date range (uses the calving index)"""
+        return self.pending_calving().filter(
+            expected_calving_date__range=[start_date, end_date]
+        )
@@ -4,6 +4,7 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 from datetime import timedelta
 from apps.common.models import BaseModel
+from .managers import BreedingRecordQuerySet
 
 class BreedingRecord(BaseModel):
     """Breeding cycle management for cows"""
@@ -30,6 +31,8 @@ class BreedingRecord(BaseModel):
         null=True,
         help_text="Bull name/ID or AI straw details"
     )
+    # bull_info normalized like Cow.father_info, so sire rankings and pedigrees agree
+    sire_key = models.CharField(max_length=100, blank=True, null=True, editable=False)
     ai_technician = models.CharField(max_length=100, blank=True, null=True)
     breeding_cost = models.DecimalField(
         max_digits=8,
@@ -53,11 +56,21 @@ class BreedingRecord(BaseModel):
     )
     notes = models.TextField(blank=True, null=True)
     
+    objects = BreedingRecordQuerySet.as_manager()
+    
     class Meta:
         db_table = 'breeding_records'
         verbose_name = 'Breeding Record'
         verbose_name_plural = 'Breeding Records'
         ordering = ['-breeding_date']
+        indexes = [
+            models.Index(
+                fields=['pregnancy_confirmed', 'actual_calving_date', 'expected_calving_date'],
+                name='breeding_calving_status_idx'
+            ),
+            models.Index(fields=['sire_key', 'actual_calving_date'], name='breeding_sire_idx'),
+            models.Index(fields=['cow', 'breeding_date'], name='breeding_cow_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.cow.name} - Bred on {self.breeding_date}"
@@ -85,10 +98,24 @@ class BreedingRecord(BaseModel):
         return (self.expected_calving_date - timezone.now().date()).days
     
     def save(self, *args, **kwargs):
+        from apps.analytics.services import ReproductiveKPIService
+        from apps.livestock.services import normalize_sire
+        
         # Auto-calculate expected calving date (283 days from breeding)
         if not self.expected_calving_date:
             self.expected_calving_date = self.breeding_date + timedelta(days=283)
+        self.sire_key = normalize_sire(self.bull_info)
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'sire_key'}
         super().save(*args, **kwargs)
+        ReproductiveKPIService.invalidate([self.cow.farm_id])
+        
+        # Registering the calf here fills in her lineage from this service
+        calf = self.calf_born
+        if calf and (calf.mother_id is None or (not calf.father_info and self.bull_info)):
+            calf.mother_id = calf.mother_id or self.cow_id
+            calf.father_info = calf.father_info or self.bull_info
+            calf.save(update_fields=['mother', 'father_info', 'updated_at'])
 
 class HeatDetection(BaseModel):
     """Track heat detection in cows"""
@@ -129,6 +156,9 @@ class HeatDetection(BaseModel):
         verbose_name = 'Heat Detection'
         verbose_name_plural = 'Heat Detections'
         ordering = ['-heat_date']
+        indexes = [
+            models.Index(fields=['cow', 'heat_date'], name='heat_cow_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.cow.name} - Heat detected on {self.heat_date}"
@@ -136,4 +166,10 @@ class HeatDetection(BaseModel):
     @property
     def farm(self):
         return self.cow.farm
+    
+    def save(self, *args, **kwargs):
+        from apps.analytics.services import ReproductiveKPIService
+        
+        super().save(*args, **kwargs)
+        ReproductiveKPIService.invalidate([self.cow.farm_id])
 
@@ -0,0 +1,24 @@
+# apps/breeding/serializers.py
+from rest_framework import serializers
+from .models import BreedingRecord
+
+class CalvingCalendarEntrySerializer(serializers.ModelSerializer):
+    cow_name = serializers.CharField(source='cow.name', read_only=True)
+    tag_number = serializers.CharField(source='cow.tag_number', read_only=True)
+    farm = serializers.IntegerField(source='cow.farm_id', read_only=True)
+    farm_name = serializers.CharField(source='cow.farm.name', read_only=True)
+    days_to_calving = serializers.SerializerMethodField()
+    is_overdue = serializers.BooleanField(source='calving_overdue', read_only=True)
+    
+    class Meta:
+        model = BreedingRecord
+        fields = [
+            'id', 'cow', 'cow_name', 'tag_number', 'farm', 'farm_name',
+            'breeding_date', 'bull_info', 'expected_calving_date',
+            'days_to_calving', 'is_overdue'
+        ]
+    
+    def get_days_to_calving(self, obj):
+        if obj.calving_due_in is None:
+            return None
+        return obj.calving_due_in.days
@@ -0,0 +1,143 @@
+# apps/breeding/services.py
+from datetime import timedelta
+from django.db.models import Max, Min
+from django.utils import timezone
+from apps.livestock.models import Cow
+from .models import BreedingRecord, HeatDetection
+
+HEAT_CYCLE_DAYS = 21
+HEAT_WINDOW_DAYS = 3
+POSTPARTUM_FIRST_HEAT_DAYS = 45
+DRY_OFF_DAYS_BEFORE_CALVING = 60
+CALVING_ALERT_DAYS = 7
+
+class ReproductionForecastService:
+    """Herd-wide heat, dry-off and calving predictions"""
+    
+    @staticmethod
+    def _latest_per_cow(queryset, date_field):
+        """Map cow id to the latest value of date_field in a single grouped query"""
+        return dict(
+            queryset.exclude(**{f'{date_field}__isnull': True})
+            .order_by()
+            .values('cow_id')
+            .annotate(latest=Max(date_field))
+            .values_list('cow_id', 'latest')
+        )
+    
+    @staticmethod
+    def _predict_next_heat(reference_date, on_date):
+        """Return (window_start, window_end, missed) for the next expected heat"""
+        expected = reference_date + timedelta(days=HEAT_CYCLE_DAYS)
+        missed = on_date > expected + timedelta(days=HEAT_WINDOW_DAYS)
+        if missed:
+            # Roll forward whole cycles until the window reaches on_date
+            overdue_days = (on_date - expected).days - HEAT_WINDOW_DAYS
+            cycles = -(-overdue_days // HEAT_CYCLE_DAYS)
+            expected += timedelta(days=cycles * HEAT_CYCLE_DAYS)
+        window = timedelta(days=HEAT_WINDOW_DAYS)
+        return expected - window, expected + window, missed
+    
+    @staticmethod
+    def forecast_herd(farm=None, on_date=None):
+        """Predict reproductive events for every active cow (one query per source)"""
+        on_date = on_date or timezone.now().date()
+        
+        cows = Cow.objects.filter(is_deleted=False, is_active=True).exclude(
+            current_stage__in=['calf', 'sold']
+        )
+        heats = HeatDetection.objects.filter(is_deleted=False)
+        breedings = BreedingRecord.objects.filter(is_deleted=False)
+        if farm is not None:
+            cows = cows.filter(farm=farm)
+            heats = heats.filter(cow__farm=farm)
+            breedings = breedings.filter(cow__farm=farm)
+        
+        last_heat = ReproductionForecastService._latest_per_cow(heats, 'heat_date')
+        last_breeding = ReproductionForecastService._latest_per_cow(breedings, 'breeding_date')
+        last_calving = ReproductionForecastService._latest_per_cow(breedings, 'actual_calving_date')
+        expected_calving = dict(
+            breedings.pending_calving()
+            .order_by()
+            .values('cow_id')
+            .annotate(expected=Min('expected_calving_date'))
+            .values_list('cow_id', 'expected')
+        )
+        
+        forecasts = []
+        for cow in cows.values('id', 'name', 'tag_number', 'farm_id', 'current_stage'):
+            cow_id = cow['id']
+            calving_date = expected_calving.get(cow_id)
+            calved_on = last_calving.get(cow_id)
+            forecast = {
+                **cow,
+                'last_heat_date': last_heat.get(cow_id),
+                'last_breeding_date': last_breeding.get(cow_id),
+                'last_calving_date': calved_on,
+                'expected_calving_date': calving_date,
+                'dry_off_date': None,
+                'next_heat_start': None,
+                'next_heat_end': None,
+                'missed_heat': False,
+            }
+            
+            if calving_date:
+                forecast['dry_off_date'] = calving_date - timedelta(days=DRY_OFF_DAYS_BEFORE_CALVING)
+            else:
+                # Only heats or services since the last calving count towards the cycle
+                references = [
+                    value for value in (forecast['last_heat_date'], forecast['last_breeding_date'])
+                    if value and (not calved_on or value > calved_on)
+                ]
+                if references:
+                    reference = max(references)
+                elif calved_on:
+                    reference = calved_on + timedelta(
+                        days=POSTPARTUM_FIRST_HEAT_DAYS - HEAT_CYCLE_DAYS
+                    )
+                else:
+                    reference = None
+                
+                if reference:
+                    start, end, missed = ReproductionForecastService._predict_next_heat(
+                        reference, on_date
+                    )
+                    forecast['next_heat_start'] = start
+                    forecast['next_heat_end'] = end
+                    forecast['missed_heat'] = missed
+            
+            forecasts.append(forecast)
+        
+        return forecasts
+    
+    @staticmethod
+    def get_daily_tasks(farm, on_date=None):
+        """Build the day's reproductive task list for a farm"""
+        on_date = on_date or timezone.now().date()
+        calving_horizon = on_date + timedelta(days=CALVING_ALERT_DAYS)
+        
+        tasks = {
+            'heat_watch': [],
+            'missed_heat': [],
+            'dry_off': [],
+            'calving_due': [],
+        }
+        for forecast in ReproductionForecastService.forecast_herd(farm, on_date):
+            if forecast['missed_heat']:
+                tasks['missed_heat'].append(forecast)
+            if forecast['next_heat_start'] and forecast['next_heat_start'] <= on_date <= forecast['next_heat_end']:
+                tasks['heat_watch'].append(forecast)
+            if (
+                forecast['dry_off_date'] and forecast['dry_off_date'] <= on_date
+                and forecast['current_stage'] == 'lactating'
+            ):
+                tasks['dry_off'].append(forecast)
+            if forecast['expected_calving_date'] and forecast['expected_calving_date'] <= calving_horizon:
+                tasks['calving_due'].append(forecast)
+        
+        return {
+            'farm': farm.id,
+            'date': on_date,
+            'summary': {task: len(cows) for task, cows in tasks.items()},
+            'tasks': tasks,
+        }
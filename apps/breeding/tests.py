@@ -1,3 +1,153 @@
+# apps/breeding/tests.py
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.authentication.models import User
+from apps.common.testing import create_cow
+from apps.farms.models import Farm
+from .models import BreedingRecord, HeatDetection
+from .services import HEAT_CYCLE_DAYS, HEAT_WINDOW_DAYS, ReproductionForecastService
 
-# Create your tests here.
+class BreedingTestMixin:
+    """Shared farm, users and pregnancy factory"""
+    
+    def setUp(self):
+        self.today = timezone.now().date()
+        self.farm = Farm.objects.create(name='Green Acres', location='Nakuru')
+        self.admin = User.objects.create_user(
+            email='admin@example.com', username='admin', password='pass',
+            first_name='Ada', last_name='Admin', role='admin'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+    
+    def create_pregnancy(self, cow, due_in, confirmed=True):
+        due_date = self.today + timedelta(days=due_in)
+        return BreedingRecord.objects.create(
+            cow=cow, breeding_date=due_date - timedelta(days=283),
+            heat_detected_date=due_date - timedelta(days=283),
+            expected_calving_date=due_date, pregnancy_confirmed=confirmed
+        )
+
+class CalvingStatusTests(BreedingTestMixin, TestCase):
+    """calving_due_in and calving_overdue are computed in the database"""
+    
+    def test_annotations(self):
+        upcoming = self.create_pregnancy(create_cow(self.farm, tag_number='T1'), due_in=10)
+        overdue = self.create_pregnancy(create_cow(self.farm, tag_number='T2'), due_in=-3)
+        unconfirmed = self.create_pregnancy(create_cow(self.farm, tag_number='T3'), due_in=5, confirmed=False)
+        calved = self.create_pregnancy(create_cow(self.farm, tag_number='T4'), due_in=-1)
+        calved.actual_calving_date = self.today
+        calved.save()
+        
+        records = {
+            record.pk: record
+            for record in BreedingRecord.objects.with_calving_status(self.today)
+        }
+        self.assertEqual(records[upcoming.pk].calving_due_in, timedelta(days=10))
+        self.assertFalse(records[upcoming.pk].calving_overdue)
+        self.assertEqual(records[overdue.pk].calving_due_in, timedelta(days=-3))
+        self.assertTrue(records[overdue.pk].calving_overdue)
+        for record in (unconfirmed, calved):
+            self.assertIsNone(records[record.pk].calving_due_in)
+            self.assertFalse(records[record.pk].calving_overdue)
+
+class CalvingCalendarTests(BreedingTestMixin, TestCase):
+    """Calvings land in the week bucket that contains their due date"""
+    
+    def get_calendar(self, weeks):
+        response = self.client.get('/api/breeding/calving-calendar/', {'weeks': weeks})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+    
+    def test_week_buckets(self):
+        for tag, due_in in [('A', 0), ('B', 6), ('C', 7), ('D', 13), ('E', 14), ('F', -2)]:
+            self.create_pregnancy(create_cow(self.farm, tag_number=tag), due_in=due_in)
+        
+        data = self.get_calendar(2)
+        self.assertEqual(data['end_date'], self.today + timedelta(days=13))
+        self.assertEqual(data['total_due'], 5)
+        self.assertEqual([entry['tag_number'] for entry in data['overdue']], ['F'])
+        for week, tags in zip(data['calendar'], [['A', 'B'], ['C', 'D']]):
+            self.assertEqual([entry['tag_number'] for entry in week['cows']], tags)
+            for entry in week['cows']:
+                self.assertLessEqual(str(week['start_date']), entry['expected_calving_date'])
+                self.assertLessEqual(entry['expected_calving_date'], str(week['end_date']))
+    
+    def test_weeks_is_validated(self):
+        response = self.client.get('/api/breeding/calving-calendar/', {'weeks': 0})
+        self.assertEqual(response.status_code, 400)
+
+class ReproductionForecastTests(BreedingTestMixin, TestCase):
+    """Heat, dry-off and calving predictions and the daily task list built from them"""
+    
+    def forecast(self, cow):
+        forecasts = ReproductionForecastService.forecast_herd(self.farm, self.today)
+        return next(forecast for forecast in forecasts if forecast['id'] == cow.pk)
+    
+    def test_next_heat_follows_latest_heat_or_service(self):
+        cow = create_cow(self.farm, tag_number='H1', current_stage='lactating')
+        HeatDetection.objects.create(cow=cow, heat_date=self.today - timedelta(days=30))
+        HeatDetection.objects.create(cow=cow, heat_date=self.today - timedelta(days=20))
+        
+        forecast = self.forecast(cow)
+        expected = self.today + timedelta(days=HEAT_CYCLE_DAYS - 20)
+        self.assertEqual(forecast['next_heat_start'], expected - timedelta(days=HEAT_WINDOW_DAYS))
+        self.assertEqual(forecast['next_heat_end'], expected + timedelta(days=HEAT_WINDOW_DAYS))
+        self.assertFalse(forecast['missed_heat'])
+    
+    def test_missed_heat_rolls_forward_to_the_current_cycle(self):
+        cow = create_cow(self.farm, tag_number='H2', current_stage='lactating')
+        HeatDetection.objects.create(cow=cow, heat_date=self.today - timedelta(days=30))
+        
+        forecast = self.forecast(cow)
+        self.assertTrue(forecast['missed_heat'])
+        self.assertEqual(
+            forecast['next_heat_start'],
+            self.today + timedelta(days=2 * HEAT_CYCLE_DAYS - 30 - HEAT_WINDOW_DAYS)
+        )
+        self.assertGreaterEqual(forecast['next_heat_end'], self.today)
+    
+    def test_pregnant_cow_gets_dry_off_instead_of_heat(self):
+        cow = create_cow(self.farm, tag_number='P1', current_stage='lactating')
+        record = self.create_pregnancy(cow, due_in=50)
+        
+        forecast = self.forecast(cow)
+        self.assertEqual(forecast['expected_calving_date'], record.expected_calving_date)
+        self.assertEqual(forecast['dry_off_date'], self.today - timedelta(days=10))
+        self.assertIsNone(forecast['next_heat_start'])
+    
+    def test_daily_tasks(self):
+        dry_off = create_cow(self.farm, tag_number='P1', current_stage='lactating')
+        self.create_pregnancy(dry_off, due_in=5)
+        watch = create_cow(self.farm, tag_number='H1', current_stage='lactating')
+        HeatDetection.objects.create(cow=watch, heat_date=self.today - timedelta(days=HEAT_CYCLE_DAYS))
+        create_cow(self.farm, tag_number='C1', current_stage='calf')
+        
+        tasks = ReproductionForecastService.get_daily_tasks(self.farm, self.today)
+        self.assertEqual(tasks['summary'], {'heat_watch': 1, 'missed_heat': 0, 'dry_off': 1, 'calving_due': 1})
+        self.assertEqual(tasks['tasks']['heat_watch'][0]['id'], watch.pk)
+        self.assertEqual(tasks['tasks']['calving_due'][0]['id'], dry_off.pk)
+    
+    def test_impossible_date_is_a_bad_request(self):
+        response = self.client.get(f'/api/breeding/farms/{self.farm.pk}/daily-tasks/', {'date': '2024-02-30'})
+        self.assertEqual(response.status_code, 400)
+
+class BackfillSireKeyTests(BreedingTestMixin, TestCase):
+    """Records written around save() get the sire key the rankings filter on"""
+    
+    def test_backfill_normalizes_bull_info(self):
+        cow = create_cow(self.farm, tag_number='B1')
+        record = self.create_pregnancy(cow, due_in=100)
+        BreedingRecord.objects.filter(pk=record.pk).update(bull_info='  Big   Ben ', sire_key=None)
+        stale = self.create_pregnancy(cow, due_in=200)
+        BreedingRecord.objects.filter(pk=stale.pk).update(bull_info=None, sire_key='old bull')
+        
+        call_command('backfill_sire_keys', stdout=StringIO())
+        record.refresh_from_db()
+        stale.refresh_from_db()
+        self.assertEqual(record.sire_key, 'big ben')
+        self.assertIsNone(stale.sire_key)
@@ -1,7 +1,9 @@
 from django.urls import path
+from . import views
 
 app_name = 'breeding'
 
 urlpatterns = [
-    # URLs will be added later
+    path('calving-calendar/', views.CalvingCalendarView.as_view(), name='calving-calendar'),
+    path('farms/<int:farm_id>/daily-tasks/', views.DailyTaskListView.as_view(), name='daily-tasks'),
 ]
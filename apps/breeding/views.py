@@ -1,3 +1,85 @@
-from django.shortcuts import render
+# apps/breeding/views.py
+from datetime import timedelta
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from apps.authentication.permissions import CanAccessFarm
+from apps.common.dates import get_date_param
+from apps.farms.models import Farm
+from .models import BreedingRecord
+from .serializers import CalvingCalendarEntrySerializer
+from .services import ReproductionForecastService
 
-# Create your views here.
+class CalvingCalendarView(APIView):
+    """Cows due to calve over the next N weeks, grouped by week"""
+    
+    DEFAULT_WEEKS = 4
+    MAX_WEEKS = 52
+    
+    def get_weeks(self, request):
+        weeks = request.query_params.get('weeks', self.DEFAULT_WEEKS)
+        try:
+            weeks = int(weeks)
+        except (TypeError, ValueError):
+            raise serializers.ValidationError({'weeks': 'Must be a whole number.'})
+        if not 1 <= weeks <= self.MAX_WEEKS:
+            raise serializers.ValidationError(
+                {'weeks': f'Must be between 1 and {self.MAX_WEEKS}.'}
+            )
+        return weeks
+    
+    def get(self, request):
+        weeks = self.get_weeks(request)
+        today = timezone.now().date()
+        # Last day of the final week, so every match falls inside one of the buckets
+        end_date = today + timedelta(weeks=weeks, days=-1)
+        
+        # Single query: overdue plus upcoming calvings across all visible farms
+        records = BreedingRecord.objects.active().for_user(request.user).pending_calving().filter(
+            expected_calving_date__lte=end_date,
+            cow__is_active=True
+        ).select_related('cow__farm').with_calving_status(today).order_by(
+            'expected_calving_date', 'cow__farm__name'
+        )
+        
+        calendar = [
+            {
+                'week': week + 1,
+                'start_date': today + timedelta(weeks=week),
+                'end_date': today + timedelta(weeks=week, days=6),
+                'cows': [],
+            }
+            for week in range(weeks)
+        ]
+        overdue = []
+        for entry in CalvingCalendarEntrySerializer(records, many=True).data:
+            days = entry['days_to_calving']
+            if days < 0:
+                overdue.append(entry)
+            else:
+                calendar[days // 7]['cows'].append(entry)
+        
+        return Response({
+            'start_date': today,
+            'end_date': end_date,
+            'weeks': weeks,
+            'total_due': len(overdue) + sum(len(week['cows']) for week in calendar),
+            'overdue': overdue,
+            'calendar': calendar,
+        })
+
+
+class DailyTaskListView(APIView):
+    """Daily heat watch, missed heat, dry-off and calving tasks for a farm"""
+    
+    permission_classes = [IsAuthenticated, CanAccessFarm]
+    
+    def get(self, request, farm_id):
+        farm = get_object_or_404(Farm, pk=farm_id, is_deleted=False)
+        self.check_object_permissions(request, farm)
+        
+        on_date = get_date_param(request.query_params, 'date', timezone.now().date())
+        return Response(ReproductionForecastService.get_daily_tasks(farm, on_date))
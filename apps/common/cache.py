@@ -0,0 +1,57 @@
+# apps/common/cache.py
+import threading
+import time
+from collections import OrderedDict
+
+class LocalCache:
+    """Small per-process LRU cache with a TTL, used in front of the shared cache.
+    
+    Other processes cannot invalidate it, so the TTL bounds how stale an entry
+    can get after a write made elsewhere.
+    """
+    
+    def __init__(self, timeout, max_entries=5000):
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+    
+    def get_many(self, keys):
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+    
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+    
+    def set_many(self, mapping):
+        for key, value in mapping.items():
+            self.set(key, value)
+    
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+    
+    def clear(self):
+        with self._lock:
+            self._data.clear()
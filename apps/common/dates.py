@@ -0,0 +1,25 @@
+# apps/common/dates.py
+from django.utils.dateparse import parse_date
+from rest_framework import serializers
+
+def parse_or_none(value, parser=parse_date):
+    """Parse an ISO date (or datetime, with parse_datetime); None if malformed or impossible.
+    
+    Django's parsers return None for malformed text but raise ValueError for
+    well-formed impossible values such as 2024-02-30.
+    """
+    if not isinstance(value, str):
+        return None
+    try:
+        return parser(value)
+    except ValueError:
+        return None
+
+def get_date_param(params, name, default=None):
+    """YYYY-MM-DD query parameter, default when absent, 400 when present but not a real date"""
+    if name not in params:
+        return default
+    parsed = parse_or_none(params[name])
+    if parsed is None:
+        raise serializers.ValidationError({name: 'Use the YYYY-MM-DD format.'})
+    return parsed
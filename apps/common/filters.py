@@ -0,0 +1,13 @@
+# apps/common/filters.py
+from rest_framework.filters import BaseFilterBackend
+from .scoping import scope_to_user
+
+class FarmScopeFilterBackend(BaseFilterBackend):
+    """Limit generic views to the requesting user's farm.
+    
+    Applies to any farm-owned model; views can set farm_scope_lookup to use a
+    different path to the farm id.
+    """
+    
+    def filter_queryset(self, request, queryset, view):
+        return scope_to_user(queryset, request.user, getattr(view, 'farm_scope_lookup', None))
@@ -0,0 +1,114 @@
+# apps/common/images.py
+import hashlib
+import posixpath
+from io import BytesIO
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+# Longest edge in pixels per variant; every size is written as JPEG and WebP
+IMAGE_VARIANT_SIZES = {
+    'thumb': 150,
+    'small': 400,
+    'medium': 800,
+}
+IMAGE_VARIANT_FORMATS = {
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+}
+HASH_LENGTH = 16
+
+def content_hash(field_file):
+    """Short sha256 of the uploaded file, used to name its variants"""
+    digest = hashlib.sha256()
+    field_file.open('rb')
+    try:
+        for chunk in field_file.chunks():
+            digest.update(chunk)
+    finally:
+        field_file.close()
+    return digest.hexdigest()[:HASH_LENGTH]
+
+def variant_path(original_name, digest, size_name, extension):
+    directory = posixpath.dirname(original_name)
+    return posixpath.join(directory, 'variants', f'{digest}_{size_name}.{extension}')
+
+def _clean_copy(image, size, mode):
+    """Resized copy with orientation applied and no EXIF/ICC metadata"""
+    resized = image.copy()
+    resized.thumbnail((size, size), Image.LANCZOS)
+    clean = Image.new(mode, resized.size, (255, 255, 255))
+    if resized.mode == 'RGBA':
+        clean.paste(resized, mask=resized.getchannel('A'))
+    else:
+        clean.paste(resized)
+    return clean
+
+def generate_variants(field_file):
+    """Write resized, metadata-free JPEG and WebP variants; return their storage paths.
+    
+    Names are content-hashed, so re-uploading the same photo reuses the files
+    already on disk instead of processing it again.
+    """
+    storage = field_file.storage
+    digest = content_hash(field_file)
+    variants = {
+        size_name: {
+            format_name: variant_path(field_file.name, digest, size_name, extension)
+            for format_name, (_, extension, _) in IMAGE_VARIANT_FORMATS.items()
+        }
+        for size_name in IMAGE_VARIANT_SIZES
+    }
+    missing = [
+        (size_name, format_name, path)
+        for size_name, paths in variants.items()
+        for format_name, path in paths.items()
+        if not storage.exists(path)
+    ]
+    if not missing:
+        return variants
+    
+    field_file.open('rb')
+    try:
+        with Image.open(field_file) as source:
+            image = ImageOps.exif_transpose(source)
+            image.load()
+    finally:
+        field_file.close()
+    if image.mode not in ('RGB', 'RGBA'):
+        # Covers LA/PA alpha channels as well as palette transparency
+        image = image.convert('RGBA' if image.has_transparency_data else 'RGB')
+    
+    for size_name, format_name, path in missing:
+        pil_format, _, options = IMAGE_VARIANT_FORMATS[format_name]
+        mode = 'RGB' if pil_format == 'JPEG' else image.mode
+        buffer = BytesIO()
+        _clean_copy(image, IMAGE_VARIANT_SIZES[size_name], mode).save(buffer, pil_format, **options)
+        storage.save(path, ContentFile(buffer.getvalue()))
+    return variants
+
+def variant_urls(variants, request=None, storage=None):
+    """Map stored variant paths to URLs, absolute when a request is available.
+    
+    Pass the image field's storage; variants are written there, not to default_storage.
+    """
+    storage = storage or default_storage
+    urls = {}
+    for size_name, paths in (variants or {}).items():
+        urls[size_name] = {}
+        for format_name, path in paths.items():
+            url = storage.url(path)
+            urls[size_name][format_name] = request.build_absolute_uri(url) if request else url
+    return urls
+
+def queue_image_variants(instance, field_name, variants_field):
+    """Regenerate variants in the background once the new upload is committed"""
+    from .tasks import generate_image_variants
+    
+    if not getattr(instance, field_name):
+        return
+    model_label = instance._meta.label
+    transaction.on_commit(
+        lambda: generate_image_variants.delay(model_label, instance.pk, field_name, variants_field)
+    )
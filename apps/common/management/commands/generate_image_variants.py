@@ -0,0 +1,36 @@
+# apps/common/management/commands/generate_image_variants.py
+from django.core.management.base import BaseCommand
+from apps.authentication.models import User
+from apps.common.tasks import generate_image_variants
+from apps.livestock.models import Cow
+
+IMAGE_FIELDS = [
+    (Cow, 'image', 'image_variants'),
+    (User, 'profile_picture', 'profile_picture_variants'),
+]
+
+class Command(BaseCommand):
+    help = 'Generate thumbnail and WebP variants for uploaded cow and profile photos'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Regenerate variants even where they already exist'
+        )
+    
+    def handle(self, *args, **options):
+        for model, field_name, variants_field in IMAGE_FIELDS:
+            queryset = model._default_manager.exclude(**{field_name: ''}).exclude(
+                **{f'{field_name}__isnull': True}
+            )
+            if not options['all']:
+                queryset = queryset.filter(**{variants_field: {}})
+            
+            processed = 0
+            for pk in queryset.values_list('pk', flat=True).iterator():
+                generate_image_variants(model._meta.label, pk, field_name, variants_field)
+                processed += 1
+            self.stdout.write(self.style.SUCCESS(
+                f'Generated variants for {processed} {model._meta.verbose_name_plural}.'
+            ))
@@ -0,0 +1,70 @@
+# apps/common/scoping.py
+from functools import lru_cache
+
+# Relations followed, in order, to find the farm that owns a model
+FARM_OWNER_FIELDS = ['farm', 'cow', 'batch', 'chicken_batch']
+
+@lru_cache(maxsize=None)
+def get_farm_lookup(model):
+    """ORM path from a model to its farm id ('farm_id', 'cow__farm_id', 'pk'), or None.
+    
+    Models can set farm_scope_lookup to override the discovered path, or to
+    None when they are not owned by a farm.
+    """
+    if 'farm_scope_lookup' in model.__dict__:
+        return model.farm_scope_lookup
+    if model._meta.label == 'farms.Farm':
+        return 'pk'
+    
+    fields = {field.name: field for field in model._meta.concrete_fields}
+    for name in FARM_OWNER_FIELDS:
+        field = fields.get(name)
+        if field is None or not field.is_relation:
+            continue
+        if field.related_model._meta.label == 'farms.Farm':
+            return field.attname
+        inner = get_farm_lookup(field.related_model)
+        if inner and inner != 'pk':
+            return f'{name}__{inner}'
+    return None
+
+def scope_to_user(queryset, user, lookup=None):
+    """Restrict a queryset to the user's farm in SQL; admins see every farm"""
+    lookup = lookup or get_farm_lookup(queryset.model)
+    if lookup is None or getattr(user, 'is_admin', False):
+        return queryset
+    farm_id = getattr(user, 'assigned_farm_id', None)
+    if farm_id is None:
+        return queryset.none()
+    return queryset.filter(**{lookup: farm_id})
+
+def get_object_farm_id(obj):
+    """Farm id owning an object, read from foreign key ids rather than Farm rows.
+    
+    Related objects already loaded are followed for free; otherwise the id is
+    read with one values_list query instead of loading each row on the path.
+    """
+    lookup = get_farm_lookup(type(obj))
+    if lookup is None:
+        return None
+    if lookup == 'pk':
+        return obj.pk
+    *path, attname = lookup.split('__')
+    current = obj
+    for name in path:
+        field = current._meta.get_field(name)
+        if getattr(current, field.attname) is None:
+            return None
+        if not field.is_cached(current):
+            return (
+                type(obj)._base_manager.filter(pk=obj.pk)
+                .values_list(lookup, flat=True).first()
+            )
+        current = getattr(current, name)
+    return getattr(current, attname)
+
+class FarmScopedQuerySetMixin:
+    """Adds for_user() to querysets of farm-owned models"""
+    
+    def for_user(self, user):
+        return scope_to_user(self, user)
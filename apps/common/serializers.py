@@ -0,0 +1,23 @@
+# apps/common/serializers.py
+from rest_framework import serializers
+from .images import variant_urls
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """Variant URLs keyed by size then format, e.g. {'thumb': {'webp': ...}}
+    
+    image_field names the source image field (default: this field's name without
+    '_variants'); its storage is the one the variants were written to.
+    """
+    
+    def __init__(self, image_field=None, **kwargs):
+        self.image_field = image_field
+        super().__init__(**kwargs)
+    
+    def bind(self, field_name, parent):
+        super().bind(field_name, parent)
+        if self.image_field is None:
+            self.image_field = field_name.removesuffix('_variants')
+    
+    def to_representation(self, value):
+        storage = self.parent.Meta.model._meta.get_field(self.image_field).storage
+        return variant_urls(value, self.context.get('request'), storage)
@@ -0,0 +1,22 @@
+# apps/common/tasks.py
+from celery import shared_task
+from django.apps import apps
+from .images import generate_variants
+
+@shared_task
+def generate_image_variants(model_label, pk, field_name, variants_field):
+    """Build thumbnails/WebP for an uploaded image and store their paths"""
+    model = apps.get_model(model_label)
+    instance = model._default_manager.filter(pk=pk).first()
+    if instance is None:
+        return None
+    field_file = getattr(instance, field_name)
+    if not field_file:
+        return None
+    
+    variants = generate_variants(field_file)
+    # Only store if the image was not replaced while this task was queued
+    model._default_manager.filter(pk=pk, **{field_name: field_file.name}).update(
+        **{variants_field: variants}
+    )
+    return variants
@@ -0,0 +1,18 @@
+# apps/common/testing.py
+from datetime import timedelta
+from itertools import count
+from django.utils import timezone
+from apps.livestock.models import Cow
+
+# Shared across test cases, so tags stay unique even without a rollback
+_cow_numbers = count(1)
+
+def create_cow(farm, **kwargs):
+    """Cow with a unique name and tag on a farm; any field can be overridden"""
+    number = next(_cow_numbers)
+    kwargs.setdefault('name', f'Cow {number}')
+    kwargs.setdefault('tag_number', f'COW{number:05d}')
+    kwargs.setdefault('breed', 'friesian')
+    kwargs.setdefault('date_acquired', timezone.now().date() - timedelta(days=900))
+    kwargs.setdefault('acquisition_cost', 0)
+    return Cow.objects.create(farm=farm, **kwargs)
@@ -1,3 +1,147 @@
-from django.test import TestCase
+# apps/common/tests.py
+import shutil
+import tempfile
+from datetime import date
+from io import BytesIO
+from unittest import mock
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+from apps.authentication.models import User
+from apps.farms.models import Farm
+from apps.livestock.models import Cow
+from apps.livestock.serializers import CowSerializer
+from apps.production.models import MilkProduction
+from .dates import get_date_param, parse_or_none
+from .images import IMAGE_VARIANT_SIZES, variant_urls
+from .scoping import get_object_farm_id, scope_to_user
+from .testing import create_cow
+from .tasks import generate_image_variants
 
-# Create your tests here.
+class ImageVariantTests(TestCase):
+    """Uploads get resized JPEG/WebP variants written to, and served from, the field's storage"""
+    
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.farm = Farm.objects.create(name='Green Acres', location='Nakuru')
+    
+    def upload(self, mode='LA', size=(1000, 500)):
+        buffer = BytesIO()
+        Image.new(mode, size, (128, 64) if mode == 'LA' else 128).save(buffer, 'PNG')
+        return SimpleUploadedFile('photo.png', buffer.getvalue(), content_type='image/png')
+    
+    def create_photographed_cow(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            cow = create_cow(self.farm, image=self.upload())
+        cow.refresh_from_db()
+        return cow
+    
+    def open_variant(self, path):
+        with default_storage.open(path) as stored:
+            image = Image.open(stored)
+            image.load()
+        return image
+    
+    def test_task_writes_every_size_and_keeps_alpha(self):
+        cow = self.create_photographed_cow()
+        self.assertEqual(set(cow.image_variants), set(IMAGE_VARIANT_SIZES))
+        
+        for size_name, longest_edge in IMAGE_VARIANT_SIZES.items():
+            webp = self.open_variant(cow.image_variants[size_name]['webp'])
+            jpeg = self.open_variant(cow.image_variants[size_name]['jpeg'])
+            self.assertEqual(webp.size, (longest_edge, longest_edge // 2))
+            self.assertEqual(webp.mode, 'RGBA')
+            self.assertEqual(jpeg.mode, 'RGB')
+            self.assertFalse(webp.getexif())
+    
+    def test_rerun_reuses_content_hashed_files(self):
+        cow = self.create_photographed_cow()
+        with mock.patch.object(generate_image_variants, 'delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                cow.save()
+        delay.assert_not_called()
+        
+        path = cow.image_variants['thumb']['webp']
+        modified = default_storage.get_modified_time(path)
+        variants = generate_image_variants(Cow._meta.label, cow.pk, 'image', 'image_variants')
+        self.assertEqual(variants, cow.image_variants)
+        self.assertEqual(default_storage.get_modified_time(path), modified)
+    
+    def test_urls_come_from_the_given_storage(self):
+        cow = self.create_photographed_cow()
+        path = cow.image_variants['thumb']['webp']
+        cdn = FileSystemStorage(location=self.media_root, base_url='https://cdn.example.com/media/')
+        self.assertEqual(
+            variant_urls(cow.image_variants, storage=cdn)['thumb']['webp'],
+            f'https://cdn.example.com/media/{path}'
+        )
+        data = CowSerializer(cow).data
+        self.assertEqual(data['image_variants']['thumb']['webp'], cow.image.storage.url(path))
+
+class FarmScopingTests(TestCase):
+    """Farmers only reach rows of their assigned farm; farm ids are read without loading owners"""
+    
+    def setUp(self):
+        today = timezone.now().date()
+        self.farm = Farm.objects.create(name='Green Acres', location='Nakuru')
+        self.other_farm = Farm.objects.create(name='Hillside', location='Nakuru')
+        self.farmer = User.objects.create_user(
+            email='farmer@example.com', username='farmer', password='pass',
+            first_name='Fay', last_name='Farmer', role='farmer', assigned_farm=self.farm
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.farmer)
+        self.cows = {}
+        for farm in (self.farm, self.other_farm):
+            cow = create_cow(farm)
+            MilkProduction.objects.create(cow=cow, date=today, session='morning', quantity_liters=10)
+            self.cows[farm.pk] = cow
+    
+    def test_farm_id_is_read_without_loading_the_owner(self):
+        record = MilkProduction.objects.get(cow__farm=self.other_farm)
+        with self.assertNumQueries(1):
+            self.assertEqual(get_object_farm_id(record), self.other_farm.pk)
+        record = MilkProduction.objects.select_related('cow').get(cow__farm=self.other_farm)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_object_farm_id(record), self.other_farm.pk)
+            self.assertEqual(get_object_farm_id(self.cows[self.farm.pk]), self.farm.pk)
+            self.assertEqual(get_object_farm_id(self.farm), self.farm.pk)
+    
+    def test_farmer_cannot_list_or_retrieve_other_farms(self):
+        self.assertEqual(
+            list(scope_to_user(MilkProduction.objects.all(), self.farmer).values_list('cow__farm_id', flat=True)),
+            [self.farm.pk]
+        )
+        response = self.client.get('/api/livestock/herd/')
+        self.assertEqual([cow['id'] for cow in response.data['results']], [self.cows[self.farm.pk].pk])
+        
+        other_cow = self.cows[self.other_farm.pk]
+        self.assertEqual(self.client.get(f'/api/livestock/herd/{other_cow.pk}/').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/livestock/cows/{other_cow.pk}/stage-history/').status_code, 403)
+        self.assertEqual(
+            self.client.get(f'/api/breeding/farms/{self.other_farm.pk}/daily-tasks/').status_code, 403
+        )
+        own_cow = self.cows[self.farm.pk]
+        self.assertEqual(self.client.get(f'/api/livestock/cows/{own_cow.pk}/stage-history/').status_code, 200)
+
+class DateParamTests(TestCase):
+    """Date query parameters are optional but never silently ignored"""
+    
+    def test_get_date_param(self):
+        default = timezone.now().date()
+        self.assertEqual(get_date_param({}, 'date', default), default)
+        self.assertEqual(get_date_param({'date': '2024-02-29'}, 'date'), date(2024, 2, 29))
+        for value in ('2024-02-30', 'yesterday', ''):
+            with self.assertRaises(ValidationError):
+                get_date_param({'date': value}, 'date', default)
+        self.assertIsNone(parse_or_none('2024-02-30T00:00:00', parse_datetime))
+        self.assertIsNone(parse_or_none(None))
@@ -23,3 +23,18 @@ class FarmAdmin(admin.ModelAdmin):
             'fields': ('established_date', 'description', 'is_active')
         }),
     )
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_totals()
+    
+    @admin.display(description='Total cows', ordering='cow_count')
+    def total_cows(self, obj):
+        return obj.cow_count
+    
+    @admin.display(description='Total chickens', ordering='chicken_count')
+    def total_chickens(self, obj):
+        return obj.chicken_count
+    
+    @admin.display(description='Active farmers', ordering='farmer_count')
+    def active_farmers(self, obj):
+        return obj.farmer_count
@@ -0,0 +1,38 @@
+# apps/farms/managers.py
+from django.db import models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from apps.common.scoping import FarmScopedQuerySetMixin
+
+def _subquery_total(queryset, group_by, aggregate):
+    """Correlated per-farm aggregate that does not multiply rows like a join would"""
+    return Coalesce(
+        Subquery(
+            queryset.order_by().values(group_by).annotate(total=aggregate).values('total'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+class FarmQuerySet(FarmScopedQuerySetMixin, models.QuerySet):
+    """Queryset helpers for farms"""
+    
+    def active(self):
+        return self.filter(is_deleted=False)
+    
+    def with_totals(self):
+        """Annotate cow, lactating cow, chicken and farmer counts in the same query"""
+        from apps.authentication.models import User
+        from apps.livestock.models import ChickenBatch, Cow
+        
+        cows = Cow.objects.filter(farm=OuterRef('pk'), is_deleted=False)
+        batches = ChickenBatch.objects.filter(farm=OuterRef('pk'), is_deleted=False)
+        farmers = User.objects.filter(assigned_farm=OuterRef('pk'), is_active=True)
+        return self.annotate(
+            cow_count=_subquery_total(cows, 'farm', Count('id')),
+            lactating_cow_count=_subquery_total(
+                cows.filter(current_stage='lactating'), 'farm', Count('id')
+            ),
+            chicken_count=_subquery_total(batches, 'farm', Sum('current_count')),
+            farmer_count=_subquery_total(farmers, 'assigned_farm', Count('id'))
+        )
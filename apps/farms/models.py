@@ -1,6 +1,7 @@
 # apps/farms/models.py
 from django.db import models
 from apps.common.models import BaseModel
+from .managers import FarmQuerySet
 
 class Farm(BaseModel):
     """Farm model representing each dairy farm location"""
@@ -14,6 +15,8 @@ class Farm(BaseModel):
     description = models.TextField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
     
+    objects = FarmQuerySet.as_manager()
+    
     class Meta:
         db_table = 'farms'
         verbose_name = 'Farm'
@@ -23,16 +26,23 @@ class Farm(BaseModel):
     def __str__(self):
         return f"{self.name} - {self.location}"
     
+    # The totals below use FarmQuerySet.with_totals() annotations when present
     @property
     def total_cows(self):
+        if hasattr(self, 'cow_count'):
+            return self.cow_count
         return self.cows.filter(is_deleted=False).count()
     
     @property
     def total_chickens(self):
+        if hasattr(self, 'chicken_count'):
+            return self.chicken_count
         return self.chicken_batches.filter(is_deleted=False).aggregate(
             total=models.Sum('current_count')
         )['total'] or 0
     
     @property
     def active_farmers(self):
+        if hasattr(self, 'farmer_count'):
+            return self.farmer_count
         return self.farmers.filter(is_active=True).count()
\ No newline at end of file
@@ -0,0 +1,27 @@
+# apps/farms/serializers.py
+from rest_framework import serializers
+from .models import Farm
+
+class FarmSerializer(serializers.ModelSerializer):
+    """Farm with totals from FarmQuerySet.with_totals()"""
+    
+    total_cows = serializers.IntegerField(source='cow_count', read_only=True)
+    lactating_cows = serializers.IntegerField(source='lactating_cow_count', read_only=True)
+    total_chickens = serializers.IntegerField(source='chicken_count', read_only=True)
+    active_farmers = serializers.IntegerField(source='farmer_count', read_only=True)
+    
+    class Meta:
+        model = Farm
+        fields = [
+            'id', 'name', 'location', 'address', 'phone_number', 'email',
+            'established_date', 'description', 'is_active', 'total_cows',
+            'lactating_cows', 'total_chickens', 'active_farmers',
+            'created_at', 'updated_at'
+        ]
+
+class FarmSummarySerializer(FarmSerializer):
+    class Meta(FarmSerializer.Meta):
+        fields = [
+            'id', 'name', 'location', 'is_active', 'total_cows',
+            'lactating_cows', 'total_chickens', 'active_farmers'
+        ]
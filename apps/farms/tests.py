@@ -1,3 +1,81 @@
+# apps/farms/tests.py
+from datetime import timedelta
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.authentication.models import User
+from apps.livestock.models import ChickenBatch, Cow
+from .models import Farm
 
-# Create your tests here.
+class FarmTotalsTests(TestCase):
+    """Farm list and summary read every total from one annotated query"""
+    
+    def setUp(self):
+        self.today = timezone.now().date()
+        self.admin = User.objects.create_user(
+            email='admin@example.com', username='admin', password='pass',
+            first_name='Ada', last_name='Admin', role='admin'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.count = 0
+    
+    def create_farm(self, cows=0, lactating=0, chickens=0, farmers=0):
+        self.count += 1
+        farm = Farm.objects.create(name=f'Farm {self.count}', location='Nakuru')
+        for number in range(cows + 1):
+            stage = 'lactating' if number < lactating else 'heifer'
+            cow = Cow.objects.create(
+                farm=farm, name=f'Cow {number}', tag_number=f'F{self.count}-{number}', breed='friesian',
+                current_stage=stage, date_acquired=self.today - timedelta(days=100), acquisition_cost=0
+            )
+        # The extra cow is soft-deleted and must not be counted
+        cow.soft_delete()
+        if chickens:
+            ChickenBatch.objects.create(
+                farm=farm, batch_name='Layers', batch_type='layers', initial_count=chickens,
+                current_count=chickens, date_acquired=self.today, acquisition_cost_per_bird=300
+            )
+        for number in range(farmers + 1):
+            User.objects.create_user(
+                email=f'farmer{self.count}-{number}@example.com', username=f'farmer{self.count}-{number}',
+                password='pass', first_name='Fay', last_name='Farmer', role='farmer',
+                assigned_farm=farm, is_active=number < farmers
+            )
+        return farm
+    
+    def get(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data, len(context.captured_queries)
+    
+    def test_list_totals_and_query_count(self):
+        self.create_farm(cows=3, lactating=2, chickens=50, farmers=1)
+        _, few_farms = self.get('/api/farms/')
+        for _ in range(5):
+            self.create_farm(cows=2, lactating=1, chickens=10, farmers=2)
+        
+        data, many_farms = self.get('/api/farms/')
+        # One COUNT for pagination and one annotated SELECT for the page
+        self.assertEqual(many_farms, few_farms)
+        self.assertEqual(many_farms, 2)
+        first = next(farm for farm in data['results'] if farm['name'] == 'Farm 1')
+        self.assertEqual(
+            (first['total_cows'], first['lactating_cows'], first['total_chickens'], first['active_farmers']),
+            (3, 2, 50, 1)
+        )
+    
+    def test_summary_is_a_single_query(self):
+        self.create_farm(cows=3, lactating=2, chickens=50, farmers=1)
+        self.create_farm(cows=1, chickens=0, farmers=2)
+        
+        data, queries = self.get('/api/farms/summary/')
+        self.assertEqual(queries, 1)
+        self.assertEqual(data['farm_count'], 2)
+        self.assertEqual(
+            data['totals'],
+            {'total_cows': 4, 'lactating_cows': 2, 'total_chickens': 50, 'active_farmers': 3}
+        )
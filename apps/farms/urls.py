@@ -1,8 +1,10 @@
-from django.urls import path, include
-from rest_framework.routers import DefaultRouter
+from django.urls import path
+from . import views
 
 app_name = 'farms'
 
 urlpatterns = [
-    # Will add router later
+    path('', views.FarmListView.as_view(), name='farm-list'),
+    path('summary/', views.FarmSummaryView.as_view(), name='farm-summary'),
+    path('<int:pk>/', views.FarmDetailView.as_view(), name='farm-detail'),
 ]
@@ -1,3 +1,33 @@
-from django.shortcuts import render
+# apps/farms/views.py
+from rest_framework import generics
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from .models import Farm
+from .serializers import FarmSerializer, FarmSummarySerializer
 
-# Create your views here.
+class FarmQuerysetMixin:
+    """Farms with totals annotated; the farm scope filter limits farmers to their own"""
+    
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        return Farm.objects.active().with_totals()
+
+class FarmListView(FarmQuerysetMixin, generics.ListAPIView):
+    """Paginated farms with cow, chicken and farmer totals"""
+    
+    serializer_class = FarmSerializer
+
+class FarmDetailView(FarmQuerysetMixin, generics.RetrieveAPIView):
+    serializer_class = FarmSerializer
+
+class FarmSummaryView(FarmQuerysetMixin, generics.GenericAPIView):
+    """Totals for every farm plus grand totals, from a single query"""
+    
+    def get(self, request):
+        farms = FarmSummarySerializer(self.filter_queryset(self.get_queryset()), many=True).data
+        totals = {
+            field: sum(farm[field] for farm in farms)
+            for field in ['total_cows', 'lactating_cows', 'total_chickens', 'active_farmers']
+        }
+        return Response({'farm_count': len(farms), 'totals': totals, 'farms': farms})
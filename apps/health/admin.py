@@ -1,6 +1,35 @@
 # apps/health/admin.py
 from django.contrib import admin
-from .models import Veterinarian, HealthRecord
+from django.contrib.admin.views.main import SEARCH_VAR, ChangeList
+from .models import Veterinarian, HealthRecord, WithdrawalPeriod, OutbreakAlert, VaccinationSchedule
+from .search import MAX_SEARCH_LIMIT, format_snippet, get_search_backend
+
+class RankedResults:
+    """Record ids in rank order that load only the slice a page asks for"""
+    
+    def __init__(self, queryset, ranked_ids):
+        self.queryset = queryset
+        self.ranked_ids = ranked_ids
+    
+    def __len__(self):
+        return len(self.ranked_ids)
+    
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        ids = self.ranked_ids[index]
+        records = self.queryset.in_bulk(ids)
+        return [records[pk] for pk in ids if pk in records]
+
+class RankedChangeList(ChangeList):
+    """Show every page, including a single unpaginated one, in search rank order"""
+    
+    def get_results(self, request):
+        super().get_results(request)
+        if isinstance(self.paginator.object_list, RankedResults) and (
+            not self.multi_page or (self.show_all and self.can_show_all)
+        ):
+            self.result_list = self.paginator.object_list[:]
 
 @admin.register(Veterinarian)
 class VeterinarianAdmin(admin.ModelAdmin):
@@ -15,11 +44,11 @@ class VeterinarianAdmin(admin.ModelAdmin):
 @admin.register(HealthRecord)
 class HealthRecordAdmin(admin.ModelAdmin):
     list_display = [
-        'animal_name', 'animal_type', 'disease_name', 'date_reported',
+        'animal_name', 'animal_type', 'farm', 'disease_name', 'date_reported',
         'treatment_status', 'veterinarian', 'medicine_cost'
     ]
     list_filter = [
-        'animal_type', 'treatment_status', 'date_reported',
+        'farm', 'animal_type', 'treatment_status', 'date_reported',
         'veterinarian', 'follow_up_required'
     ]
     search_fields = ['disease_name', 'symptoms', 'diagnosis', 'medicine_used']
@@ -36,7 +65,7 @@ class HealthRecordAdmin(admin.ModelAdmin):
         ('Treatment', {
             'fields': (
                 'treatment_date', 'medicine_used', 'medicine_cost',
-                'veterinarian', 'treatment_status'
+                'veterinarian', 'treatment_status', 'milk_withdrawal_days'
             )
         }),
         ('Recovery and Follow-up', {
@@ -48,3 +77,84 @@ class HealthRecordAdmin(admin.ModelAdmin):
             'fields': ('notes',)
         }),
     )
+    
+    def _search_hits(self, request):
+        # Run the full-text search once per request; None means fall back to icontains
+        if not hasattr(request, 'health_search_hits'):
+            search_term = request.GET.get(SEARCH_VAR, '').strip()
+            backend = get_search_backend()
+            request.health_search_hits = None
+            if search_term and backend is not None:
+                request.health_search_hits = {
+                    pk: (rank, snippet)
+                    for pk, rank, snippet in backend.search(search_term, limit=MAX_SEARCH_LIMIT)
+                }
+        return request.health_search_hits
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('farm', 'veterinarian')
+    
+    def get_search_results(self, request, queryset, search_term):
+        hits = self._search_hits(request)
+        if hits is None:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(pk__in=hits), False
+    
+    def get_changelist(self, request, **kwargs):
+        return RankedChangeList
+    
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        # Hits arrive ranked; order the filtered ids in Python rather than with a CASE per hit
+        hits = self._search_hits(request)
+        if hits is not None:
+            matching = set(queryset.values_list('pk', flat=True))
+            queryset = RankedResults(queryset, [pk for pk in hits if pk in matching])
+        return super().get_paginator(request, queryset, per_page, orphans, allow_empty_first_page)
+    
+    def get_list_display(self, request):
+        list_display = list(super().get_list_display(request))
+        hits = self._search_hits(request)
+        if hits is not None:
+            def search_snippet(obj):
+                return format_snippet(hits.get(obj.pk, (None, ''))[1])
+            search_snippet.short_description = 'Match'
+            list_display.insert(1, search_snippet)
+        return list_display
+
+@admin.register(WithdrawalPeriod)
+class WithdrawalPeriodAdmin(admin.ModelAdmin):
+    list_display = ['cow', 'farm', 'medicine', 'start_date', 'end_date', 'health_record']
+    list_filter = ['farm', 'start_date', 'end_date']
+    search_fields = ['cow__name', 'cow__tag_number', 'medicine']
+    ordering = ['-start_date']
+    date_hierarchy = 'start_date'
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('cow__farm', 'farm', 'health_record')
+
+@admin.register(OutbreakAlert)
+class OutbreakAlertAdmin(admin.ModelAdmin):
+    list_display = [
+        'disease_name', 'location', 'case_count', 'farm_count', 'baseline_cases',
+        'window_start', 'window_end', 'is_active', 'resolved_on'
+    ]
+    list_filter = ['is_active', 'location', 'window_end']
+    search_fields = ['disease_name', 'location']
+    readonly_fields = [
+        'disease_key', 'location_key', 'case_count', 'farm_count',
+        'baseline_cases', 'notified_case_count'
+    ]
+    date_hierarchy = 'window_end'
+
+@admin.register(VaccinationSchedule)
+class VaccinationScheduleAdmin(admin.ModelAdmin):
+    list_display = [
+        'animal_name', 'animal_type', 'vaccine_name', 'due_date',
+        'administered_date', 'veterinarian'
+    ]
+    list_filter = ['animal_type', 'vaccine_name', 'due_date', 'administered_date']
+    search_fields = ['vaccine_name', 'cow__name', 'cow__tag_number', 'chicken_batch__batch_name']
+    date_hierarchy = 'due_date'
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('cow', 'chicken_batch', 'veterinarian')
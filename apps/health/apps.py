@@ -1,6 +1,11 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 class HealthConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.health'
-    verbose_name = 'Health Management'
\ No newline at end of file
+    verbose_name = 'Health Management'
+    
+    def ready(self):
+        from .search import install_search_backend
+        post_migrate.connect(install_search_backend, sender=self)
\ No newline at end of file
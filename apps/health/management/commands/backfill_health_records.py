@@ -0,0 +1,28 @@
+# apps/health/management/commands/backfill_health_records.py
+from django.core.management.base import BaseCommand
+from django.db.models import OuterRef, Subquery
+from apps.health.models import HealthRecord
+from apps.livestock.models import Cow, ChickenBatch
+
+class Command(BaseCommand):
+    help = 'Backfill the denormalized farm and animal name on health records'
+    
+    def handle(self, *args, **options):
+        cows = Cow.objects.filter(pk=OuterRef('cow_id'))
+        batches = ChickenBatch.objects.filter(pk=OuterRef('chicken_batch_id'))
+        
+        # One set-based UPDATE per animal type
+        cow_records = HealthRecord.objects.filter(cow__isnull=False).update(
+            farm_id=Subquery(cows.values('farm_id')[:1]),
+            animal_display_name=Subquery(cows.values('name')[:1])
+        )
+        batch_records = HealthRecord.objects.filter(
+            cow__isnull=True, chicken_batch__isnull=False
+        ).update(
+            farm_id=Subquery(batches.values('farm_id')[:1]),
+            animal_display_name=Subquery(batches.values('batch_name')[:1])
+        )
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Backfilled {cow_records} cow and {batch_records} chicken batch health records.'
+        ))
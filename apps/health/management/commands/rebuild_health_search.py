@@ -0,0 +1,14 @@
+# apps/health/management/commands/rebuild_health_search.py
+from django.core.management.base import BaseCommand, CommandError
+from apps.health.search import get_search_backend
+
+class Command(BaseCommand):
+    help = 'Create or rebuild the full-text search index for health records'
+    
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        if backend is None:
+            raise CommandError('Full-text search is not supported on this database')
+        backend.install()
+        backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt health search index ({backend.__class__.__name__}).'))
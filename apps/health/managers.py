@@ -0,0 +1,29 @@
+# apps/health/managers.py
+from django.db import models
+from django.db.models import Count, Sum
+from apps.common.scoping import FarmScopedQuerySetMixin
+
+class HealthRecordQuerySet(FarmScopedQuerySetMixin, models.QuerySet):
+    """Queryset helpers for health records using the denormalized farm key"""
+    
+    OPEN_STATUSES = ['diagnosed', 'treating']
+    
+    def active(self):
+        return self.filter(is_deleted=False)
+    
+    def open_treatments(self, farm=None):
+        """Records still being diagnosed or treated, optionally for one farm"""
+        queryset = self.active().filter(treatment_status__in=self.OPEN_STATUSES)
+        if farm is not None:
+            queryset = queryset.filter(farm=farm)
+        return queryset
+    
+    def vet_spend_by_farm(self, start_date=None, end_date=None):
+        """Medicine cost and case count grouped by farm in a single query"""
+        queryset = self.active()
+        if start_date and end_date:
+            queryset = queryset.filter(date_reported__range=[start_date, end_date])
+        return queryset.order_by('farm_id').values('farm_id', 'farm__name').annotate(
+            total_cost=Sum('medicine_cost'),
+            cases=Count('id')
+        )
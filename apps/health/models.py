@@ -1,7 +1,9 @@
 # apps/health/models.py
 from django.db import models
 from django.core.validators import MinValueValidator
+from datetime import timedelta
 from apps.common.models import BaseModel
+from .managers import HealthRecordQuerySet
 
 class Veterinarian(BaseModel):
     """Veterinarian contact information"""
@@ -56,6 +58,17 @@ class HealthRecord(BaseModel):
         related_name='health_records'
     )
     
+    # Denormalized from the animal on save so farm queries stay on one table
+    farm = models.ForeignKey(
+        'farms.Farm',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='health_records'
+    )
+    animal_display_name = models.CharField(max_length=100, blank=True, editable=False)
+    
     # Health record details
     date_reported = models.DateField()
     disease_name = models.CharField(max_length=100)
@@ -85,30 +98,239 @@ class HealthRecord(BaseModel):
     recovery_date = models.DateField(null=True, blank=True)
     follow_up_required = models.BooleanField(default=False)
     follow_up_date = models.DateField(null=True, blank=True)
+    milk_withdrawal_days = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Days milk must be withheld after treatment starts"
+    )
     notes = models.TextField(blank=True, null=True)
     
+    objects = HealthRecordQuerySet.as_manager()
+    
     class Meta:
         db_table = 'health_records'
         verbose_name = 'Health Record'
         verbose_name_plural = 'Health Records'
         ordering = ['-date_reported']
+        indexes = [
+            models.Index(fields=['farm', 'treatment_status'], name='health_farm_status_idx'),
+            models.Index(fields=['farm', 'date_reported'], name='health_farm_date_idx'),
+            models.Index(fields=['date_reported', 'disease_name'], name='health_date_disease_idx'),
+            models.Index(
+                fields=['follow_up_date'],
+                condition=models.Q(follow_up_required=True),
+                name='health_follow_up_due_idx'
+            ),
+        ]
     
     def __str__(self):
-        animal_name = self.cow.name if self.cow else self.chicken_batch.batch_name
-        return f"{animal_name} - {self.disease_name} ({self.date_reported})"
+        return f"{self.animal_name} - {self.disease_name} ({self.date_reported})"
     
     @property
-    def farm(self):
-        if self.cow:
-            return self.cow.farm
-        elif self.chicken_batch:
-            return self.chicken_batch.farm
+    def animal(self):
+        if self.cow_id:
+            return self.cow
+        elif self.chicken_batch_id:
+            return self.chicken_batch
         return None
     
     @property
     def animal_name(self):
-        if self.cow:
+        return self.animal_display_name or "Unknown"
+    
+    def save(self, *args, **kwargs):
+        # Keep the denormalized farm key and display name in step with the animal
+        animal = self.animal
+        if animal is not None:
+            self.farm_id = animal.farm_id
+            self.animal_display_name = animal.name if self.cow_id else animal.batch_name
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'farm', 'animal_display_name'}
+        super().save(*args, **kwargs)
+        self.sync_withdrawal_period()
+    
+    def delete(self, *args, **kwargs):
+        # Cascaded withdrawal windows skip their own delete(), so re-flag here
+        from .services import WithdrawalService
+        had_windows = self.withdrawal_periods.exists()
+        result = super().delete(*args, **kwargs)
+        if had_windows:
+            WithdrawalService.flag_production(cow_id=self.cow_id)
+        return result
+    
+    def sync_withdrawal_period(self):
+        """Create, update or retire the milk withdrawal window for a cow under treatment"""
+        existing = self.withdrawal_periods.filter(is_deleted=False)
+        applies = bool(self.cow_id and self.medicine_used and self.milk_withdrawal_days) and not self.is_deleted
+        if not applies:
+            # A cleared medicine or withdrawal, or a deleted record, releases the milk again
+            for period in existing:
+                period.soft_delete()
+            return None
+        if self.treatment_status != 'treating' and not existing.exists():
+            return None
+        
+        # The treatment day counts as the first withdrawal day; end_date is inclusive
+        start_date = self.treatment_date or self.date_reported
+        period, _ = WithdrawalPeriod.objects.update_or_create(
+            health_record=self,
+            defaults={
+                'cow_id': self.cow_id,
+                'farm_id': self.farm_id,
+                'medicine': self.medicine_used[:100],
+                'start_date': start_date,
+                'end_date': start_date + timedelta(days=self.milk_withdrawal_days - 1),
+                'is_deleted': False,
+                'deleted_at': None,
+            }
+        )
+        return period
+
+class WithdrawalPeriod(BaseModel):
+    """Window during which a treated cow's milk must be withheld"""
+    
+    health_record = models.ForeignKey(
+        HealthRecord,
+        on_delete=models.CASCADE,
+        related_name='withdrawal_periods'
+    )
+    cow = models.ForeignKey(
+        'livestock.Cow',
+        on_delete=models.CASCADE,
+        related_name='withdrawal_periods'
+    )
+    farm = models.ForeignKey(
+        'farms.Farm',
+        on_delete=models.CASCADE,
+        related_name='withdrawal_periods'
+    )
+    medicine = models.CharField(max_length=100)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    notes = models.TextField(blank=True, null=True)
+    
+    class Meta:
+        db_table = 'health_withdrawal_periods'
+        verbose_name = 'Milk Withdrawal Period'
+        verbose_name_plural = 'Milk Withdrawal Periods'
+        ordering = ['-start_date']
+        indexes = [
+            models.Index(fields=['cow', 'start_date', 'end_date'], name='withdrawal_cow_window_idx'),
+            models.Index(fields=['farm', 'end_date', 'start_date'], name='withdrawal_farm_window_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.health_record.animal_name} - {self.medicine} ({self.start_date} to {self.end_date})"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_cow_id = instance.__dict__.get('cow_id')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        
+        # Re-flag milk against the current windows, for the previous cow too if it moved
+        from .services import WithdrawalService
+        previous_cow_id = getattr(self, '_loaded_cow_id', None)
+        WithdrawalService.flag_production(cow_id={self.cow_id, previous_cow_id} - {None})
+        self._loaded_cow_id = self.cow_id
+    
+    def delete(self, *args, **kwargs):
+        from .services import WithdrawalService
+        result = super().delete(*args, **kwargs)
+        WithdrawalService.flag_production(cow_id=self.cow_id)
+        return result
+
+class OutbreakAlert(BaseModel):
+    """Cluster of one disease across farms in a location, as raised by the outbreak detector"""
+    
+    # Normalized (lower-cased, trimmed) grouping keys
+    disease_key = models.CharField(max_length=100)
+    location_key = models.CharField(max_length=100)
+    
+    disease_name = models.CharField(max_length=100)
+    location = models.CharField(max_length=100)
+    window_start = models.DateField()
+    window_end = models.DateField()
+    case_count = models.PositiveIntegerField()
+    farm_count = models.PositiveIntegerField()
+    baseline_cases = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    notified_case_count = models.PositiveIntegerField(default=0)
+    is_active = models.BooleanField(default=True)
+    resolved_on = models.DateField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'health_outbreak_alerts'
+        verbose_name = 'Outbreak Alert'
+        verbose_name_plural = 'Outbreak Alerts'
+        ordering = ['-window_end', '-case_count']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['disease_key', 'location_key'],
+                condition=models.Q(is_active=True),
+                name='unique_active_outbreak'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.disease_name} in {self.location} ({self.case_count} cases, {self.farm_count} farms)"
+
+class VaccinationSchedule(BaseModel):
+    """Planned vaccination for a cow or chicken batch"""
+    
+    animal_type = models.CharField(max_length=15, choices=HealthRecord.ANIMAL_TYPE_CHOICES)
+    cow = models.ForeignKey(
+        'livestock.Cow',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='vaccinations'
+    )
+    chicken_batch = models.ForeignKey(
+        'livestock.ChickenBatch',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='vaccinations'
+    )
+    vaccine_name = models.CharField(max_length=100)
+    due_date = models.DateField()
+    administered_date = models.DateField(null=True, blank=True)
+    veterinarian = models.ForeignKey(
+        Veterinarian,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='vaccinations'
+    )
+    notes = models.TextField(blank=True, null=True)
+    
+    class Meta:
+        db_table = 'health_vaccination_schedules'
+        verbose_name = 'Vaccination Schedule'
+        verbose_name_plural = 'Vaccination Schedules'
+        ordering = ['due_date']
+        indexes = [
+            models.Index(
+                fields=['due_date'],
+                condition=models.Q(administered_date__isnull=True),
+                name='vaccination_pending_due_idx'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.animal_name} - {self.vaccine_name} (due {self.due_date})"
+    
+    @property
+    def animal_name(self):
+        if self.animal_type == 'cow' and self.cow:
             return self.cow.name
-        elif self.chicken_batch:
+        elif self.animal_type == 'chicken_batch' and self.chicken_batch:
             return self.chicken_batch.batch_name
-        return "Unknown"
\ No newline at end of file
+        return "Unknown"
+    
+    @property
+    def is_pending(self):
+        return self.administered_date is None
\ No newline at end of file
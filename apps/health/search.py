@@ -0,0 +1,221 @@
+# apps/health/search.py
+import re
+from django.db import connections
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+SEARCH_FIELDS = ['disease_name', 'symptoms', 'diagnosis', 'medicine_used']
+DEFAULT_SEARCH_LIMIT = 50
+MAX_SEARCH_LIMIT = 500
+
+# Control characters mark matches so snippets can be escaped before highlighting
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_STOP = '\x03'
+
+def search_terms(query):
+    """Words of a user query; both backends AND them and prefix-match the last one"""
+    return re.findall(r'\w+', query)
+
+def clamp_limit(limit):
+    return max(1, min(int(limit), MAX_SEARCH_LIMIT))
+
+def format_snippet(snippet):
+    """HTML-escape a raw snippet and turn match markers into <mark> tags"""
+    return mark_safe(
+        escape(snippet or '')
+        .replace(HIGHLIGHT_START, '<mark>')
+        .replace(HIGHLIGHT_STOP, '</mark>')
+    )
+
+class PostgresHealthSearchBackend:
+    """Weighted tsvector column with a GIN index, generated on every write"""
+    
+    SETUP_SQL = [
+        """
+        ALTER TABLE health_records ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(disease_name, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(medicine_used, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(diagnosis, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(symptoms, '')), 'C')
+        ) STORED
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS health_records_search_idx
+        ON health_records USING GIN (search_vector)
+        """,
+    ]
+    
+    # Headlines are only built for the ranked page, not every match
+    SEARCH_SQL = """
+        SELECT ranked.id, ranked.rank, ts_headline(
+            'english',
+            concat_ws(' ... ', ranked.disease_name, ranked.diagnosis, ranked.symptoms, ranked.medicine_used),
+            ranked.query,
+            %s
+        )
+        FROM (
+            SELECT hr.id, hr.disease_name, hr.diagnosis, hr.symptoms, hr.medicine_used, query,
+                   ts_rank(hr.search_vector, query) AS rank
+            FROM health_records hr, to_tsquery('english', %s) query
+            WHERE hr.search_vector @@ query AND hr.is_deleted = false {farm_filter}
+            ORDER BY rank DESC, hr.date_reported DESC
+            LIMIT %s
+        ) ranked
+        ORDER BY ranked.rank DESC
+    """
+    
+    def __init__(self, connection):
+        self.connection = connection
+    
+    def install(self):
+        with self.connection.cursor() as cursor:
+            for statement in self.SETUP_SQL:
+                cursor.execute(statement)
+    
+    def rebuild(self):
+        # The generated column is recomputed by PostgreSQL on every write
+        self.install()
+    
+    HEADLINE_OPTIONS = (
+        f'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, '
+        'MaxFragments=2, MaxWords=20, MinWords=5'
+    )
+    
+    @staticmethod
+    def to_query_expression(query):
+        """tsquery text matching every term, the last one as a prefix (as the FTS5 backend does)"""
+        terms = search_terms(query)
+        if not terms:
+            return None
+        quoted = [f"'{term}'" for term in terms]
+        quoted[-1] += ':*'
+        return ' & '.join(quoted)
+    
+    def search(self, query, farm_id=None, limit=DEFAULT_SEARCH_LIMIT):
+        expression = self.to_query_expression(query)
+        if expression is None:
+            return []
+        farm_filter, params = '', [self.HEADLINE_OPTIONS, expression]
+        if farm_id is not None:
+            farm_filter = 'AND hr.farm_id = %s'
+            params.append(farm_id)
+        params.append(limit)
+        with self.connection.cursor() as cursor:
+            cursor.execute(self.SEARCH_SQL.format(farm_filter=farm_filter), params)
+            return [(pk, float(rank), snippet) for pk, rank, snippet in cursor.fetchall()]
+
+class SQLiteHealthSearchBackend:
+    """FTS5 external-content table kept in sync by triggers (dev/testing)"""
+    
+    SETUP_SQL = [
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS health_records_fts USING fts5(
+            disease_name, symptoms, diagnosis, medicine_used,
+            content='health_records', content_rowid='id'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS health_records_fts_insert AFTER INSERT ON health_records BEGIN
+            INSERT INTO health_records_fts(rowid, disease_name, symptoms, diagnosis, medicine_used)
+            VALUES (new.id, new.disease_name, new.symptoms, new.diagnosis, new.medicine_used);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS health_records_fts_delete AFTER DELETE ON health_records BEGIN
+            INSERT INTO health_records_fts(health_records_fts, rowid, disease_name, symptoms, diagnosis, medicine_used)
+            VALUES ('delete', old.id, old.disease_name, old.symptoms, old.diagnosis, old.medicine_used);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS health_records_fts_update AFTER UPDATE ON health_records BEGIN
+            INSERT INTO health_records_fts(health_records_fts, rowid, disease_name, symptoms, diagnosis, medicine_used)
+            VALUES ('delete', old.id, old.disease_name, old.symptoms, old.diagnosis, old.medicine_used);
+            INSERT INTO health_records_fts(rowid, disease_name, symptoms, diagnosis, medicine_used)
+            VALUES (new.id, new.disease_name, new.symptoms, new.diagnosis, new.medicine_used);
+        END
+        """,
+    ]
+    
+    # bm25 weights follow SEARCH_FIELDS; lower scores rank higher in FTS5
+    SEARCH_SQL = """
+        SELECT hr.id, -bm25(health_records_fts, 10.0, 2.0, 4.0, 4.0) AS rank,
+               snippet(health_records_fts, -1, %s, %s, '...', 16)
+        FROM health_records_fts
+        INNER JOIN health_records hr ON hr.id = health_records_fts.rowid
+        WHERE health_records_fts MATCH %s AND hr.is_deleted = 0 {farm_filter}
+        ORDER BY bm25(health_records_fts, 10.0, 2.0, 4.0, 4.0), hr.date_reported DESC
+        LIMIT %s
+    """
+    
+    def __init__(self, connection):
+        self.connection = connection
+    
+    def install(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'health_records_fts'"
+            )
+            created = cursor.fetchone() is None
+            for statement in self.SETUP_SQL:
+                cursor.execute(statement)
+        if created:
+            self.rebuild()
+    
+    def rebuild(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute("INSERT INTO health_records_fts(health_records_fts) VALUES ('rebuild')")
+    
+    @staticmethod
+    def to_match_expression(query):
+        """Quote user terms so FTS5 syntax characters cannot break the query"""
+        terms = search_terms(query)
+        if not terms:
+            return None
+        quoted = [f'"{term}"' for term in terms]
+        quoted[-1] += '*'
+        return ' '.join(quoted)
+    
+    def search(self, query, farm_id=None, limit=DEFAULT_SEARCH_LIMIT):
+        expression = self.to_match_expression(query)
+        if expression is None:
+            return []
+        farm_filter, params = '', [HIGHLIGHT_START, HIGHLIGHT_STOP, expression]
+        if farm_id is not None:
+            farm_filter = 'AND hr.farm_id = %s'
+            params.append(farm_id)
+        params.append(limit)
+        with self.connection.cursor() as cursor:
+            cursor.execute(self.SEARCH_SQL.format(farm_filter=farm_filter), params)
+            return cursor.fetchall()
+
+BACKENDS = {
+    'postgresql': PostgresHealthSearchBackend,
+    'sqlite': SQLiteHealthSearchBackend,
+}
+
+def get_search_backend(using='default'):
+    """Full-text backend for the database vendor, or None if unsupported"""
+    connection = connections[using]
+    backend_class = BACKENDS.get(connection.vendor)
+    return backend_class(connection) if backend_class else None
+
+def install_search_backend(sender=None, using='default', **kwargs):
+    """post_migrate hook creating the search column/index or FTS table"""
+    from .models import HealthRecord
+    
+    backend = get_search_backend(using)
+    # Skip until health_records exists (plain migrate does not sync unmigrated apps)
+    if backend is not None and HealthRecord._meta.db_table in backend.connection.introspection.table_names():
+        backend.install()
+
+def search_health_records(query, farm_id=None, limit=DEFAULT_SEARCH_LIMIT):
+    """Return [(record, rank, snippet)] ordered by relevance"""
+    from .models import HealthRecord
+    
+    backend = get_search_backend()
+    if backend is None or not query.strip():
+        return []
+    hits = backend.search(query, farm_id=farm_id, limit=clamp_limit(limit))
+    records = HealthRecord.objects.select_related('veterinarian').in_bulk([pk for pk, _, _ in hits])
+    return [(records[pk], rank, snippet) for pk, rank, snippet in hits if pk in records]
@@ -0,0 +1,19 @@
+# apps/health/serializers.py
+from rest_framework import serializers
+from .models import HealthRecord
+
+class HealthRecordSerializer(serializers.ModelSerializer):
+    animal_name = serializers.CharField(source='animal_display_name', read_only=True)
+    veterinarian_name = serializers.CharField(source='veterinarian.name', read_only=True)
+    
+    class Meta:
+        model = HealthRecord
+        fields = [
+            'id', 'animal_type', 'cow', 'chicken_batch', 'farm', 'animal_name',
+            'date_reported', 'disease_name', 'symptoms', 'diagnosis',
+            'treatment_date', 'medicine_used', 'medicine_cost', 'veterinarian',
+            'veterinarian_name', 'treatment_status', 'recovery_date',
+            'follow_up_required', 'follow_up_date', 'notes', 'created_at',
+            'updated_at'
+        ]
+        read_only_fields = ['farm']
@@ -0,0 +1,264 @@
+# apps/health/services.py
+from datetime import timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Count, Exists, Max, Min, OuterRef, Q
+from django.db.models.functions import Coalesce, Lower, Trim
+from django.utils import timezone
+from .models import HealthRecord, OutbreakAlert, VaccinationSchedule, WithdrawalPeriod
+
+# Outbreak detection thresholds
+OUTBREAK_WINDOW_DAYS = 7
+OUTBREAK_BASELINE_WINDOWS = 8
+OUTBREAK_MIN_CASES = 3
+OUTBREAK_MIN_FARMS = 2
+OUTBREAK_BASELINE_FACTOR = 2
+OUTBREAK_ESCALATION_FACTOR = 2
+
+# Due-queue reminders: how far ahead to warn and how far back to catch missed runs
+FOLLOW_UP_LEAD_DAYS = 1
+VACCINATION_LEAD_DAYS = 3
+DUE_QUEUE_LOOKBACK_DAYS = 14
+
+class WithdrawalService:
+    """Milk withdrawal checks against active treatment windows"""
+    
+    @staticmethod
+    def active_periods(on_date, farm=None):
+        """Withdrawal windows covering a date (farm/end_date index)"""
+        periods = WithdrawalPeriod.objects.filter(
+            is_deleted=False,
+            start_date__lte=on_date,
+            end_date__gte=on_date
+        )
+        if farm is not None:
+            periods = periods.filter(farm=farm)
+        return periods
+    
+    @staticmethod
+    def withheld_cow_ids(on_date, farm=None):
+        """Every cow whose milk is withheld on a date, in one query"""
+        return set(
+            WithdrawalService.active_periods(on_date, farm).values_list('cow_id', flat=True)
+        )
+    
+    @staticmethod
+    def is_withheld(cow_id, on_date):
+        return WithdrawalService.active_periods(on_date).filter(cow_id=cow_id).exists()
+    
+    @staticmethod
+    def flag_records(records):
+        """Set is_withheld on unsaved milk records (e.g. before bulk_create)"""
+        withheld = {}
+        for record in records:
+            if record.date not in withheld:
+                withheld[record.date] = WithdrawalService.withheld_cow_ids(record.date)
+            record.is_withheld = record.cow_id in withheld[record.date]
+        return records
+    
+    @staticmethod
+    def flag_production(queryset=None, cow_id=None):
+        """Set is_withheld on milk records with two set-based UPDATEs.
+        
+        cow_id may be one id or several. Daily summaries for the farms and
+        dates whose flags changed get their withheld totals recomputed.
+        """
+        from apps.production.models import DailyMilkSummary, MilkProduction
+        
+        if queryset is None:
+            queryset = MilkProduction.objects.all()
+        if isinstance(cow_id, (set, list, tuple)):
+            queryset = queryset.filter(cow_id__in=cow_id)
+        elif cow_id is not None:
+            queryset = queryset.filter(cow_id=cow_id)
+        
+        covering = WithdrawalPeriod.objects.filter(
+            is_deleted=False,
+            cow_id=OuterRef('cow_id'),
+            start_date__lte=OuterRef('date'),
+            end_date__gte=OuterRef('date')
+        )
+        queryset = queryset.annotate(under_withdrawal=Exists(covering))
+        to_flag = queryset.filter(under_withdrawal=True, is_withheld=False)
+        to_clear = queryset.filter(under_withdrawal=False, is_withheld=True)
+        affected = set(to_flag.order_by().values_list('cow__farm_id', 'date').distinct()) | set(
+            to_clear.order_by().values_list('cow__farm_id', 'date').distinct()
+        )
+        flagged = to_flag.update(is_withheld=True)
+        cleared = to_clear.update(is_withheld=False)
+        DailyMilkSummary.objects.refresh_withheld(affected)
+        return flagged, cleared
+
+
+class OutbreakDetectionService:
+    """Sliding-window disease clustering per location across farms"""
+    
+    @staticmethod
+    def window_counts(on_date=None, window_days=OUTBREAK_WINDOW_DAYS,
+                      baseline_windows=OUTBREAK_BASELINE_WINDOWS):
+        """Case and farm counts per (disease, location) for the current window and its baseline"""
+        on_date = on_date or timezone.now().date()
+        window_start = on_date - timedelta(days=window_days)
+        baseline_start = window_start - timedelta(days=window_days * baseline_windows)
+        in_window = Q(date_reported__gt=window_start)
+        
+        # One grouped query over the date_reported/disease_name index range
+        return (
+            HealthRecord.objects
+            .filter(
+                is_deleted=False,
+                farm__isnull=False,
+                date_reported__gt=baseline_start,
+                date_reported__lte=on_date
+            )
+            .annotate(
+                disease_key=Lower(Trim('disease_name')),
+                location_key=Lower(Trim('farm__location'))
+            )
+            .values('disease_key', 'location_key')
+            .annotate(
+                disease_name=Min(Trim('disease_name')),
+                location=Min(Trim('farm__location')),
+                case_count=Count('id', filter=in_window),
+                farm_count=Count('farm', filter=in_window, distinct=True),
+                baseline_total=Count('id', filter=~in_window),
+                first_case=Min('date_reported', filter=in_window),
+                last_case=Max('date_reported', filter=in_window)
+            )
+            .filter(case_count__gte=1)
+            .order_by('-case_count')
+        )
+    
+    @staticmethod
+    def detect(on_date=None, window_days=OUTBREAK_WINDOW_DAYS,
+               baseline_windows=OUTBREAK_BASELINE_WINDOWS, min_cases=OUTBREAK_MIN_CASES,
+               min_farms=OUTBREAK_MIN_FARMS):
+        """Clusters above the absolute thresholds and well above their usual rate"""
+        clusters = []
+        rows = OutbreakDetectionService.window_counts(on_date, window_days, baseline_windows).filter(
+            case_count__gte=min_cases,
+            farm_count__gte=min_farms
+        )
+        for row in rows:
+            baseline = Decimal(row['baseline_total']) / baseline_windows
+            if row['case_count'] >= OUTBREAK_BASELINE_FACTOR * baseline:
+                row['baseline_cases'] = baseline.quantize(Decimal('0.01'))
+                clusters.append(row)
+        return clusters
+    
+    @staticmethod
+    def notify_admins(alerts, escalated=False):
+        """Urgent notification for every active admin, per alert, through the admin group"""
+        from apps.notifications.services import NotificationFanoutService
+        
+        sent = 0
+        for alert in alerts:
+            title = f"{'Escalating' if escalated else 'Possible'} outbreak: {alert.disease_name} in {alert.location}"
+            message = (
+                f"{alert.case_count} cases of {alert.disease_name} reported across "
+                f"{alert.farm_count} farms in {alert.location} between {alert.window_start} "
+                f"and {alert.window_end} (usual rate {alert.baseline_cases} per week)."
+            )
+            sent += len(NotificationFanoutService.fan_out(
+                title, message, 'disease_outbreak', roles=('admin',), priority='urgent'
+            ))
+        return sent
+    
+    @staticmethod
+    @transaction.atomic
+    def run(on_date=None):
+        """Raise new alerts, escalate growing ones and resolve clusters that have subsided"""
+        on_date = on_date or timezone.now().date()
+        clusters = OutbreakDetectionService.detect(on_date)
+        active = {
+            (alert.disease_key, alert.location_key): alert
+            for alert in OutbreakAlert.objects.select_for_update().filter(is_active=True, is_deleted=False)
+        }
+        
+        new_alerts, escalated, updated = [], [], []
+        now = timezone.now()
+        for cluster in clusters:
+            key = (cluster['disease_key'], cluster['location_key'])
+            alert = active.pop(key, None)
+            if alert is None:
+                new_alerts.append(OutbreakAlert(
+                    disease_key=cluster['disease_key'],
+                    location_key=cluster['location_key'],
+                    disease_name=cluster['disease_name'],
+                    location=cluster['location'],
+                    window_start=cluster['first_case'],
+                    window_end=cluster['last_case'],
+                    case_count=cluster['case_count'],
+                    farm_count=cluster['farm_count'],
+                    baseline_cases=cluster['baseline_cases'],
+                    notified_case_count=cluster['case_count']
+                ))
+                continue
+            
+            alert.window_end = cluster['last_case']
+            alert.case_count = cluster['case_count']
+            alert.farm_count = cluster['farm_count']
+            alert.baseline_cases = cluster['baseline_cases']
+            alert.updated_at = now
+            if alert.case_count >= alert.notified_case_count * OUTBREAK_ESCALATION_FACTOR:
+                alert.notified_case_count = alert.case_count
+                escalated.append(alert)
+            updated.append(alert)
+        
+        OutbreakAlert.objects.bulk_create(new_alerts)
+        OutbreakAlert.objects.bulk_update(
+            updated,
+            ['window_end', 'case_count', 'farm_count', 'baseline_cases', 'notified_case_count', 'updated_at']
+        )
+        resolved = OutbreakAlert.objects.filter(pk__in=[alert.pk for alert in active.values()]).update(
+            is_active=False,
+            resolved_on=on_date,
+            updated_at=now
+        )
+        
+        notified = OutbreakDetectionService.notify_admins(new_alerts)
+        notified += OutbreakDetectionService.notify_admins(escalated, escalated=True)
+        return {
+            'new': len(new_alerts),
+            'escalated': len(escalated),
+            'ongoing': len(updated) - len(escalated),
+            'resolved': resolved,
+            'notifications': notified,
+        }
+
+
+class DueQueueService:
+    """Due treatment follow-ups and vaccinations, read by the daily alert rules run"""
+    
+    @staticmethod
+    def due_follow_ups(on_date):
+        """Open follow-ups in the reminder window (partial follow_up_date index)"""
+        return (
+            HealthRecord.objects
+            .filter(
+                follow_up_required=True,
+                follow_up_date__gte=on_date - timedelta(days=DUE_QUEUE_LOOKBACK_DAYS),
+                follow_up_date__lte=on_date + timedelta(days=FOLLOW_UP_LEAD_DAYS),
+                is_deleted=False
+            )
+            .exclude(treatment_status__in=['recovered', 'dead'])
+            .values('id', 'farm_id', 'cow_id', 'animal_display_name', 'disease_name', 'follow_up_date')
+        )
+    
+    @staticmethod
+    def due_vaccinations(on_date):
+        """Pending vaccinations in the reminder window (partial due_date index)"""
+        return (
+            VaccinationSchedule.objects
+            .filter(
+                administered_date__isnull=True,
+                due_date__gte=on_date - timedelta(days=DUE_QUEUE_LOOKBACK_DAYS),
+                due_date__lte=on_date + timedelta(days=VACCINATION_LEAD_DAYS),
+                is_deleted=False
+            )
+            .annotate(
+                farm_id=Coalesce('cow__farm_id', 'chicken_batch__farm_id'),
+                animal_display_name=Coalesce('cow__name', 'chicken_batch__batch_name')
+            )
+            .values('id', 'farm_id', 'cow_id', 'animal_display_name', 'vaccine_name', 'due_date')
+        )
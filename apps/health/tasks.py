@@ -0,0 +1,8 @@
+# apps/health/tasks.py
+from celery import shared_task
+from .services import OutbreakDetectionService
+
+@shared_task
+def detect_disease_outbreaks():
+    """Hourly scan for disease clusters across farms in the same location"""
+    return OutbreakDetectionService.run()
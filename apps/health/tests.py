@@ -1,3 +1,333 @@
+# apps/health/tests.py
+from datetime import timedelta
+from decimal import Decimal
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.authentication.models import User
+from apps.common.testing import create_cow
+from apps.farms.models import Farm
+from apps.livestock.models import ChickenBatch, Cow
+from apps.notifications.models import Notification
+from apps.notifications.services import AlertRuleService
+from apps.production.models import DailyMilkSummary, MilkProduction
+from .models import HealthRecord, OutbreakAlert, VaccinationSchedule
+from .search import PostgresHealthSearchBackend, SQLiteHealthSearchBackend
+from .services import (
+    DUE_QUEUE_LOOKBACK_DAYS, FOLLOW_UP_LEAD_DAYS, OUTBREAK_MIN_CASES, OUTBREAK_WINDOW_DAYS,
+    VACCINATION_LEAD_DAYS, DueQueueService, OutbreakDetectionService
+)
 
-# Create your tests here.
+class HealthTestMixin:
+    """Farms, an admin client and animal factories shared by the health tests"""
+    
+    def setUp(self):
+        self.today = timezone.now().date()
+        self.farm = Farm.objects.create(name='Green Acres', location='Nakuru')
+        self.other_farm = Farm.objects.create(name='Hillside', location='Nakuru')
+        self.admin = User.objects.create_user(
+            email='admin@example.com', username='admin', password='pass',
+            first_name='Ada', last_name='Admin', role='admin'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+    
+    def create_record(self, animal, **kwargs):
+        kwargs.setdefault('date_reported', self.today)
+        kwargs.setdefault('disease_name', 'Mastitis')
+        kwargs.setdefault('symptoms', 'Swollen udder')
+        if isinstance(animal, Cow):
+            kwargs.update(animal_type='cow', cow=animal)
+        else:
+            kwargs.update(animal_type='chicken_batch', chicken_batch=animal)
+        return HealthRecord.objects.create(**kwargs)
+
+class DenormalizedAnimalTests(HealthTestMixin, TestCase):
+    """Health records keep the animal's farm and name in step with the animal"""
+    
+    def test_cow_save_updates_records(self):
+        cow = create_cow(self.farm)
+        record = self.create_record(cow)
+        self.assertEqual((record.farm_id, record.animal_display_name), (self.farm.pk, cow.name))
+        
+        cow = Cow.objects.get(pk=cow.pk)
+        cow.name = 'Daisy'
+        cow.farm = self.other_farm
+        cow.save()
+        record.refresh_from_db()
+        self.assertEqual((record.farm_id, record.animal_display_name), (self.other_farm.pk, 'Daisy'))
+    
+    def test_chicken_batch_save_updates_records(self):
+        batch = ChickenBatch.objects.create(
+            farm=self.farm, batch_name='Layers A', batch_type='layers', initial_count=100,
+            current_count=100, date_acquired=self.today, acquisition_cost_per_bird=Decimal('300')
+        )
+        record = self.create_record(batch, disease_name='Newcastle')
+        self.assertEqual(record.animal_display_name, 'Layers A')
+        
+        batch = ChickenBatch.objects.get(pk=batch.pk)
+        batch.batch_name = 'Layers B'
+        batch.save()
+        record.refresh_from_db()
+        self.assertEqual((record.farm_id, record.animal_display_name), (self.farm.pk, 'Layers B'))
+    
+    def test_vet_spend_groups_by_farm_and_rejects_impossible_dates(self):
+        self.create_record(create_cow(self.farm), medicine_cost=Decimal('100'))
+        self.create_record(create_cow(self.farm), medicine_cost=Decimal('50'))
+        self.create_record(create_cow(self.other_farm), medicine_cost=Decimal('10'))
+        
+        response = self.client.get('/api/health/vet-spend/')
+        self.assertEqual(
+            [(row['farm_id'], row['total_cost'], row['cases']) for row in response.data],
+            [(self.farm.pk, Decimal('150'), 2), (self.other_farm.pk, Decimal('10'), 1)]
+        )
+        response = self.client.get('/api/health/vet-spend/', {'start_date': '2024-02-30', 'end_date': '2024-03-01'})
+        self.assertEqual(response.status_code, 400)
+        # Malformed values are rejected, not treated as an all-time query
+        response = self.client.get('/api/health/vet-spend/', {'start_date': 'foo', 'end_date': 'bar'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data), {'start_date'})
+
+class MilkWithdrawalTests(HealthTestMixin, TestCase):
+    """Withdrawal windows flag milk, keep summaries current and cap sales"""
+    
+    def setUp(self):
+        super().setUp()
+        self.cow = create_cow(self.farm, current_stage='lactating')
+        self.start = self.today - timedelta(days=5)
+    
+    def milk(self, day, liters='10'):
+        return MilkProduction.objects.create(
+            cow=self.cow, date=self.start + timedelta(days=day), session='morning',
+            quantity_liters=Decimal(liters)
+        )
+    
+    def treat(self, days=3):
+        return self.create_record(
+            self.cow, treatment_date=self.start, treatment_status='treating',
+            medicine_used='Oxytetracycline', milk_withdrawal_days=days
+        )
+    
+    def withheld_days(self):
+        return sorted(
+            (record.date - self.start).days
+            for record in MilkProduction.objects.filter(cow=self.cow, is_withheld=True)
+        )
+    
+    def test_window_covers_exactly_the_withdrawal_days(self):
+        record = self.treat(days=3)
+        period = record.withdrawal_periods.get()
+        self.assertEqual(period.end_date, self.start + timedelta(days=2))
+        
+        # Write-time flags for records saved after the window exists
+        for day in range(-1, 5):
+            self.milk(day)
+        self.assertEqual(self.withheld_days(), [0, 1, 2])
+    
+    def test_bulk_flag_follows_window_changes_and_summaries(self):
+        for day in range(-1, 5):
+            self.milk(day)
+        summary = DailyMilkSummary.objects.create(farm=self.farm, date=self.start)
+        summary.calculate_summary()
+        self.assertEqual(summary.withheld_total, 0)
+        
+        record = self.treat(days=2)
+        self.assertEqual(self.withheld_days(), [0, 1])
+        summary.refresh_from_db()
+        self.assertEqual(summary.withheld_total, Decimal('10'))
+        self.assertEqual(summary.saleable_total, Decimal('0'))
+        
+        record.milk_withdrawal_days = 4
+        record.save()
+        self.assertEqual(self.withheld_days(), [0, 1, 2, 3])
+        
+        record.medicine_used = ''
+        record.save()
+        self.assertEqual(self.withheld_days(), [])
+        summary.refresh_from_db()
+        self.assertEqual(summary.withheld_total, 0)
+        
+        record.medicine_used = 'Penicillin'
+        record.save()
+        self.assertEqual(self.withheld_days(), [0, 1, 2, 3])
+        record.soft_delete()
+        self.assertEqual(self.withheld_days(), [])
+    
+    def test_sales_are_capped_at_saleable_liters(self):
+        self.treat(days=1)
+        self.milk(0, liters='12')
+        MilkProduction.objects.create(
+            cow=create_cow(self.farm, current_stage='lactating'), date=self.start,
+            session='morning', quantity_liters=Decimal('8')
+        )
+        
+        def sell(liters):
+            return self.client.post('/api/production/milk-sales/', {
+                'farm': self.farm.pk, 'date': self.start, 'quantity_liters': liters,
+                'price_per_liter': '50'
+            })
+        
+        self.assertEqual(sell('9').status_code, 400)
+        self.assertEqual(sell('5').status_code, 201)
+        response = sell('4')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Only 3', str(response.data['quantity_liters']))
+        
+        DailyMilkSummary.objects.create(farm=self.farm, date=self.start).calculate_summary()
+        summary = self.client.get('/api/production/daily-summaries/').data['results'][0]
+        self.assertEqual((summary['withheld_total'], summary['saleable_total']), ('12.00', '8.00'))
+
+class HealthSearchTests(HealthTestMixin, TestCase):
+    """Both full-text backends build the same query and the API ranks matches"""
+    
+    def test_query_builders_agree(self):
+        for query, fts, tsquery in [
+            ('mastitis', '"mastitis"*', "'mastitis':*"),
+            ('swollen "udder" -x', '"swollen" "udder" "x"*', "'swollen' & 'udder' & 'x':*"),
+            ("o'neil; drop", '"o" "neil" "drop"*', "'o' & 'neil' & 'drop':*"),
+            ('  --  ', None, None),
+        ]:
+            self.assertEqual(SQLiteHealthSearchBackend.to_match_expression(query), fts)
+            self.assertEqual(PostgresHealthSearchBackend.to_query_expression(query), tsquery)
+    
+    def test_search_ranks_and_clamps_limit(self):
+        cow = create_cow(self.farm)
+        self.create_record(cow, disease_name='Mastitis', symptoms='Swollen udder')
+        self.create_record(cow, disease_name='Lameness', symptoms='Mild mastitis suspected')
+        self.create_record(cow, disease_name='Bloat', symptoms='Distended rumen')
+        
+        response = self.client.get('/api/health/search/', {'q': 'masti'})
+        self.assertEqual(
+            [hit['disease_name'] for hit in response.data['results']], ['Mastitis', 'Lameness']
+        )
+        for limit in ('-1', '0'):
+            response = self.client.get('/api/health/search/', {'q': 'masti', 'limit': limit})
+            self.assertEqual(response.data['count'], 1)
+    
+    def test_admin_orders_matches_by_rank(self):
+        cow = create_cow(self.farm)
+        self.create_record(cow, disease_name='Lameness', symptoms='Mild mastitis suspected')
+        self.create_record(cow, disease_name='Mastitis', symptoms='Swollen udder')
+        self.admin.is_staff = self.admin.is_superuser = True
+        self.admin.save()
+        self.client.force_login(self.admin)
+        
+        response = self.client.get('/admin/health/healthrecord/', {'q': 'mastitis'})
+        self.assertEqual(
+            [record.disease_name for record in response.context['cl'].result_list], ['Mastitis', 'Lameness']
+        )
+
+class OutbreakDetectionTests(HealthTestMixin, TestCase):
+    """Clusters across farms in a location raise, escalate and resolve one alert each"""
+    
+    def report(self, farm, days_ago=0, disease='Foot and Mouth'):
+        return self.create_record(
+            create_cow(farm), disease_name=disease,
+            date_reported=self.today - timedelta(days=days_ago)
+        )
+    
+    def test_threshold_uses_the_sliding_window(self):
+        self.report(self.farm, days_ago=1)
+        self.report(self.other_farm, days_ago=2)
+        # Outside the seven-day window, so it only feeds the baseline
+        self.report(self.farm, days_ago=OUTBREAK_WINDOW_DAYS)
+        self.assertEqual(OutbreakDetectionService.detect(self.today), [])
+        
+        self.report(self.farm, days_ago=OUTBREAK_WINDOW_DAYS - 1)
+        clusters = OutbreakDetectionService.detect(self.today)
+        self.assertEqual(len(clusters), 1)
+        self.assertEqual((clusters[0]['case_count'], clusters[0]['farm_count']), (3, 2))
+        self.assertEqual(clusters[0]['baseline_cases'], Decimal('0.12'))
+        
+        # A single farm never makes an outbreak, however many cases it has
+        for _ in range(OUTBREAK_MIN_CASES):
+            self.report(self.farm, disease='Lameness')
+        self.assertEqual(len(OutbreakDetectionService.detect(self.today)), 1)
+    
+    def test_alerts_are_deduplicated_escalated_and_resolved(self):
+        for farm in (self.farm, self.other_farm, self.farm):
+            self.report(farm)
+        
+        result = OutbreakDetectionService.run(self.today)
+        self.assertEqual((result['new'], result['notifications']), (1, 1))
+        self.assertEqual(Notification.objects.filter(notification_type='disease_outbreak').count(), 1)
+        
+        # Same cluster on the next run: the alert is kept, nobody is notified again
+        result = OutbreakDetectionService.run(self.today)
+        self.assertEqual((result['new'], result['ongoing'], result['notifications']), (0, 1, 0))
+        self.assertEqual(OutbreakAlert.objects.filter(is_active=True).count(), 1)
+        
+        # Doubling the cases re-notifies once
+        for farm in (self.farm, self.other_farm, self.other_farm):
+            self.report(farm)
+        result = OutbreakDetectionService.run(self.today)
+        self.assertEqual((result['escalated'], result['notifications']), (1, 1))
+        alert = OutbreakAlert.objects.get(is_active=True)
+        self.assertEqual((alert.case_count, alert.notified_case_count), (6, 6))
+        self.assertEqual(OutbreakDetectionService.run(self.today)['escalated'], 0)
+        
+        later = self.today + timedelta(days=OUTBREAK_WINDOW_DAYS)
+        result = OutbreakDetectionService.run(later)
+        self.assertEqual(result['resolved'], 1)
+        alert.refresh_from_db()
+        self.assertEqual((alert.is_active, alert.resolved_on), (False, later))
+
+class DueQueueTests(HealthTestMixin, TestCase):
+    """Follow-ups and vaccinations are queued inside their reminder windows exactly once"""
+    
+    def follow_up(self, due_in, **kwargs):
+        return self.create_record(
+            create_cow(self.farm), follow_up_required=True,
+            follow_up_date=self.today + timedelta(days=due_in), **kwargs
+        )
+    
+    def vaccination(self, animal, due_in, **kwargs):
+        animal_type = 'cow' if isinstance(animal, Cow) else 'chicken_batch'
+        return VaccinationSchedule.objects.create(
+            animal_type=animal_type, vaccine_name='Anthrax',
+            due_date=self.today + timedelta(days=due_in), **{animal_type: animal}, **kwargs
+        )
+    
+    def test_follow_up_window(self):
+        due = [
+            self.follow_up(FOLLOW_UP_LEAD_DAYS),
+            self.follow_up(0),
+            self.follow_up(-DUE_QUEUE_LOOKBACK_DAYS),
+        ]
+        self.follow_up(FOLLOW_UP_LEAD_DAYS + 1)
+        self.follow_up(-DUE_QUEUE_LOOKBACK_DAYS - 1)
+        self.follow_up(0, treatment_status='recovered')
+        self.create_record(create_cow(self.farm), follow_up_date=self.today)
+        
+        ids = {row['id'] for row in DueQueueService.due_follow_ups(self.today)}
+        self.assertEqual(ids, {record.pk for record in due})
+    
+    def test_vaccination_window_and_animal_farm(self):
+        batch = ChickenBatch.objects.create(
+            farm=self.other_farm, batch_name='Layers A', batch_type='layers', initial_count=100,
+            current_count=100, date_acquired=self.today, acquisition_cost_per_bird=Decimal('300')
+        )
+        cow_due = self.vaccination(create_cow(self.farm), VACCINATION_LEAD_DAYS)
+        batch_due = self.vaccination(batch, -DUE_QUEUE_LOOKBACK_DAYS)
+        self.vaccination(create_cow(self.farm), VACCINATION_LEAD_DAYS + 1)
+        self.vaccination(create_cow(self.farm), 0, administered_date=self.today)
+        
+        rows = {row['id']: row for row in DueQueueService.due_vaccinations(self.today)}
+        self.assertEqual(set(rows), {cow_due.pk, batch_due.pk})
+        self.assertEqual(rows[cow_due.pk]['farm_id'], self.farm.pk)
+        self.assertEqual(
+            (rows[batch_due.pk]['farm_id'], rows[batch_due.pk]['animal_display_name']),
+            (self.other_farm.pk, 'Layers A')
+        )
+    
+    def test_rerun_is_idempotent(self):
+        self.follow_up(0)
+        self.vaccination(create_cow(self.farm), 1)
+        types = ['treatment_followup', 'vaccination_due']
+        
+        counts = AlertRuleService.run(self.today, types=types)
+        self.assertEqual(counts, {'treatment_followup': 1, 'vaccination_due': 1})
+        self.assertEqual(Notification.objects.filter(notification_type__in=types).count(), 2)
+        
+        AlertRuleService.run(self.today, types=types)
+        self.assertEqual(Notification.objects.filter(notification_type__in=types).count(), 2)
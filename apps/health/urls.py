@@ -1,7 +1,10 @@
 from django.urls import path
+from . import views
 
 app_name = 'health'
 
 urlpatterns = [
-    # URLs will be added later
+    path('open-treatments/', views.OpenTreatmentListView.as_view(), name='open-treatments'),
+    path('vet-spend/', views.VetSpendView.as_view(), name='vet-spend'),
+    path('search/', views.HealthRecordSearchView.as_view(), name='health-search'),
 ]
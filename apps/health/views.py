@@ -1,3 +1,65 @@
-from django.shortcuts import render
+# apps/health/views.py
+from rest_framework import generics, serializers
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from apps.authentication.permissions import IsAdminUser
+from apps.common.dates import get_date_param
+from .models import HealthRecord
+from .search import DEFAULT_SEARCH_LIMIT, clamp_limit, format_snippet, search_health_records
+from .serializers import HealthRecordSerializer
 
-# Create your views here.
+class OpenTreatmentListView(generics.ListAPIView):
+    """Open treatments, optionally for one farm, from the farm/status index"""
+    
+    serializer_class = HealthRecordSerializer
+    permission_classes = [IsAdminUser]
+    
+    def get_queryset(self):
+        queryset = HealthRecord.objects.open_treatments().select_related('veterinarian')
+        farm_id = self.request.query_params.get('farm')
+        if farm_id:
+            queryset = queryset.filter(farm_id=farm_id)
+        return queryset
+
+class VetSpendView(APIView):
+    """Veterinary spend and case counts per farm"""
+    
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        start_date = get_date_param(request.query_params, 'start_date')
+        end_date = get_date_param(request.query_params, 'end_date')
+        if bool(start_date) != bool(end_date):
+            raise serializers.ValidationError(
+                'Provide both start_date and end_date (YYYY-MM-DD) or neither.'
+            )
+        return Response(list(HealthRecord.objects.vet_spend_by_farm(start_date, end_date)))
+
+
+class HealthRecordSearchView(APIView):
+    """Ranked full-text search over disease, symptoms, diagnosis and medicine"""
+    
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            raise serializers.ValidationError({'q': 'This parameter is required.'})
+        try:
+            limit = clamp_limit(request.query_params.get('limit', DEFAULT_SEARCH_LIMIT))
+        except ValueError:
+            raise serializers.ValidationError({'limit': 'Must be a whole number.'})
+        
+        hits = search_health_records(query, request.query_params.get('farm'), limit)
+        return Response({
+            'query': query,
+            'count': len(hits),
+            'results': [
+                {
+                    **HealthRecordSerializer(record).data,
+                    'rank': rank,
+                    'snippet': format_snippet(snippet),
+                }
+                for record, rank, snippet in hits
+            ],
+        })
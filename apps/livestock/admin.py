@@ -1,12 +1,23 @@
 # apps/livestock/admin.py
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.utils.html import format_html
-from .models import Cow, ChickenBatch, ChickenReduction
+from .models import Cow, CowStageHistory, ChickenBatch, ChickenReduction
+from .services import LifecycleService, StageTransitionError
+
+class CowStageHistoryInline(admin.TabularInline):
+    model = CowStageHistory
+    fields = ['stage', 'previous_stage', 'started_on', 'changed_by', 'notes']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+    
+    def has_add_permission(self, request, obj=None):
+        return False
 
 @admin.register(Cow)
 class CowAdmin(admin.ModelAdmin):
     list_display = [
-        'name', 'tag_number', 'farm', 'breed', 'current_stage',
+        'image_tag', 'name', 'tag_number', 'farm', 'breed', 'current_stage',
         'age_in_months', 'is_active', 'created_at'
     ]
     list_filter = [
@@ -38,11 +49,28 @@ class CowAdmin(admin.ModelAdmin):
     )
     
     readonly_fields = ['age_in_months']
+    inlines = [CowStageHistoryInline]
+    actions = ['dry_off']
     
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('farm', 'mother')
     
+    @admin.action(description='Dry off selected cows')
+    def dry_off(self, request, queryset):
+        try:
+            count = LifecycleService.transition(
+                queryset.values_list('id', flat=True), 'dry', user=request.user
+            )
+        except StageTransitionError as exc:
+            self.message_user(request, f"No cows were dried off: {exc}.", messages.ERROR)
+            return
+        self.message_user(request, f"{count} cows dried off.")
+    
     def image_tag(self, obj):
+        # Prefer the generated thumbnail so list pages do not load full photos
+        thumbnail = obj.image_variants.get('thumb', {}).get('webp')
+        if thumbnail:
+            return format_html('<img src="{}" width="50" height="50" />', obj.image.storage.url(thumbnail))
         if obj.image:
             return format_html('<img src="{}" width="50" height="50" />', obj.image.url)
         return "No Image"
@@ -0,0 +1,216 @@
+# apps/livestock/importers.py
+import csv
+import io
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from .models import ChickenBatch, Cow, CowStageHistory
+
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 500
+
+class CSVImporter:
+    """Stream a CSV into unsaved model instances, validate them in bulk, then bulk_create.
+    
+    Imports are all-or-nothing: any row error means nothing is written and the
+    per-row report is returned instead.
+    """
+    
+    model = None
+    columns = []
+    required_columns = []
+    unique_field = None
+    clean_exclude = ['farm']
+    
+    def __init__(self, farm):
+        self.farm = farm
+        self.errors = []
+        self.error_count = 0
+        self.row_count = 0
+    
+    def add_error(self, row_number, errors):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row_number, 'errors': errors})
+    
+    @staticmethod
+    def open_reader(file):
+        """csv.DictReader over a binary or text file, with normalized column names"""
+        if isinstance(file.read(0), bytes):
+            file = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+        reader = csv.DictReader(file)
+        reader.fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+        return reader
+    
+    def build(self, row):
+        """Return an unsaved instance for a row; raise ValidationError on bad values"""
+        instance = self.model(farm=self.farm)
+        for column in self.columns:
+            if row.get(column):
+                setattr(instance, column, row[column])
+        instance.clean_fields(exclude=self.clean_exclude)
+        return instance
+    
+    def parse(self, file):
+        # Row 0 reports problems with the file as a whole
+        try:
+            return self.parse_rows(file)
+        except UnicodeDecodeError:
+            self.add_error(0, {'file': 'File is not UTF-8 encoded; save it as a UTF-8 CSV.'})
+        except csv.Error as exc:
+            self.add_error(0, {'file': f"Not a readable CSV file: {exc}."})
+        return []
+    
+    def parse_rows(self, file):
+        reader = self.open_reader(file)
+        missing = [column for column in self.required_columns if column not in reader.fieldnames]
+        if missing:
+            self.add_error(1, {'header': f"Missing column(s): {', '.join(missing)}."})
+            return []
+        
+        parsed, seen = [], {}
+        for row_number, raw in enumerate(reader, start=2):
+            self.row_count += 1
+            row = {key: (value or '').strip() for key, value in raw.items() if key is not None}
+            try:
+                instance = self.build(row)
+            except ValidationError as exc:
+                self.add_error(row_number, {
+                    field: ' '.join(messages) for field, messages in exc.message_dict.items()
+                })
+                continue
+            key = getattr(instance, self.unique_field)
+            if key in seen:
+                self.add_error(row_number, {
+                    self.unique_field: f"Duplicate of row {seen[key]}."
+                })
+                continue
+            seen[key] = row_number
+            parsed.append((row_number, row, instance))
+        return parsed
+    
+    def existing_keys(self, keys):
+        """Keys that already exist, fetched in one query"""
+        return set(
+            self.model.objects.filter(farm=self.farm, **{f'{self.unique_field}__in': keys})
+            .values_list(self.unique_field, flat=True)
+        )
+    
+    def validate(self, parsed):
+        existing = self.existing_keys([getattr(instance, self.unique_field) for _, _, instance in parsed])
+        valid = []
+        for row_number, row, instance in parsed:
+            if getattr(instance, self.unique_field) in existing:
+                self.add_error(row_number, {self.unique_field: 'Already exists on this farm.'})
+            else:
+                valid.append((row_number, row, instance))
+        return valid
+    
+    def after_create(self, rows):
+        pass
+    
+    def run(self, file, dry_run=False):
+        parsed = self.parse(file)
+        rows = self.validate(parsed)
+        created = 0
+        if not self.error_count and not dry_run:
+            with transaction.atomic():
+                self.model.objects.bulk_create(
+                    [instance for _, _, instance in rows], batch_size=IMPORT_BATCH_SIZE
+                )
+                self.after_create(rows)
+            created = len(rows)
+        return {
+            'farm': self.farm.pk,
+            'dry_run': dry_run,
+            'rows': self.row_count,
+            'valid': 0 if self.error_count else len(rows),
+            'created': created,
+            'error_count': self.error_count,
+            'errors': sorted(self.errors, key=lambda error: error['row']),
+        }
+
+class CowImporter(CSVImporter):
+    """Cows with optional mother_tag referencing this farm or earlier in the file"""
+    
+    model = Cow
+    columns = [
+        'tag_number', 'name', 'breed', 'date_of_birth', 'date_acquired',
+        'acquisition_cost', 'current_stage', 'weight', 'father_info', 'notes'
+    ]
+    required_columns = ['tag_number', 'name', 'breed', 'date_acquired', 'acquisition_cost']
+    unique_field = 'tag_number'
+    clean_exclude = ['farm', 'mother', 'image']
+    
+    def existing_keys(self, keys):
+        # tag_number is unique across all farms, not just this one
+        return set(Cow.objects.filter(tag_number__in=keys).values_list('tag_number', flat=True))
+    
+    def validate(self, parsed):
+        rows = super().validate(parsed)
+        in_file = {instance.tag_number for _, _, instance in rows}
+        mother_tags = {row['mother_tag'] for _, row, _ in rows if row.get('mother_tag')}
+        self.mother_ids = dict(
+            Cow.objects.filter(farm=self.farm, tag_number__in=mother_tags, is_deleted=False)
+            .values_list('tag_number', 'id')
+        )
+        
+        valid = []
+        for row_number, row, instance in rows:
+            mother_tag = row.get('mother_tag')
+            if mother_tag == instance.tag_number:
+                self.add_error(row_number, {'mother_tag': 'A cow cannot be her own mother.'})
+            elif mother_tag and mother_tag not in self.mother_ids and mother_tag not in in_file:
+                self.add_error(row_number, {'mother_tag': f"No cow tagged '{mother_tag}' on this farm."})
+            else:
+                instance.mother_id = self.mother_ids.get(mother_tag)
+                valid.append((row_number, row, instance))
+        return valid
+    
+    def after_create(self, rows):
+        from apps.analytics.services import ReproductiveKPIService
+        from .services import PedigreeService, TagScanService
+        
+        # Link calves whose mothers were created by this same import
+        created_ids = {instance.tag_number: instance.pk for _, _, instance in rows}
+        linked = []
+        for _, row, instance in rows:
+            mother_tag = row.get('mother_tag')
+            if mother_tag and instance.mother_id is None:
+                instance.mother_id = created_ids[mother_tag]
+                linked.append(instance)
+        Cow.objects.bulk_update(linked, ['mother'], batch_size=IMPORT_BATCH_SIZE)
+        
+        CowStageHistory.objects.bulk_create(
+            [
+                CowStageHistory(cow_id=instance.pk, stage=instance.current_stage, started_on=instance.date_acquired)
+                for _, _, instance in rows
+            ],
+            batch_size=IMPORT_BATCH_SIZE
+        )
+        PedigreeService.recompute_all(
+            cow_ids=[instance.pk for _, _, instance in rows if instance.mother_id and instance.father_info]
+        )
+        TagScanService.invalidate_tags(created_ids)
+        ReproductiveKPIService.invalidate([self.farm.pk])
+
+class ChickenBatchImporter(CSVImporter):
+    model = ChickenBatch
+    columns = [
+        'batch_name', 'batch_type', 'initial_count', 'current_count', 'date_acquired',
+        'acquisition_cost_per_bird', 'expected_laying_start', 'notes'
+    ]
+    required_columns = [
+        'batch_name', 'batch_type', 'initial_count', 'date_acquired', 'acquisition_cost_per_bird'
+    ]
+    unique_field = 'batch_name'
+    
+    def build(self, row):
+        # A new batch starts at full strength unless a current count is given
+        row = dict(row)
+        row['current_count'] = row.get('current_count') or row.get('initial_count')
+        return super().build(row)
+
+IMPORTERS = {
+    'cows': CowImporter,
+    'chicken-batches': ChickenBatchImporter,
+}
@@ -0,0 +1,34 @@
+# apps/livestock/management/commands/import_livestock.py
+from django.core.management.base import BaseCommand, CommandError
+from apps.farms.models import Farm
+from apps.livestock.importers import IMPORTERS
+
+class Command(BaseCommand):
+    help = 'Import cows or chicken batches for a farm from a CSV file'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTERS))
+        parser.add_argument('csv_path')
+        parser.add_argument('--farm', type=int, required=True, help='Farm id to import into')
+        parser.add_argument('--dry-run', action='store_true', help='Validate without saving')
+    
+    def handle(self, *args, **options):
+        try:
+            farm = Farm.objects.get(pk=options['farm'], is_deleted=False)
+        except Farm.DoesNotExist:
+            raise CommandError(f"Farm {options['farm']} does not exist")
+        
+        with open(options['csv_path'], 'rb') as csv_file:
+            report = IMPORTERS[options['kind']](farm).run(csv_file, dry_run=options['dry_run'])
+        
+        for error in report['errors']:
+            details = '; '.join(f'{field}: {message}' for field, message in error['errors'].items())
+            self.stderr.write(f"Row {error['row']}: {details}")
+        if report['error_count']:
+            raise CommandError(
+                f"{report['error_count']} of {report['rows']} rows have errors; nothing was imported."
+            )
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"{report['valid']} rows are valid."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Imported {report['created']} {options['kind']}."))
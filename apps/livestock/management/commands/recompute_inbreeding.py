@@ -0,0 +1,10 @@
+# apps/livestock/management/commands/recompute_inbreeding.py
+from django.core.management.base import BaseCommand
+from apps.livestock.services import PedigreeService
+
+class Command(BaseCommand):
+    help = 'Recompute the cached inbreeding coefficient for every cow'
+    
+    def handle(self, *args, **options):
+        updated = PedigreeService.recompute_all()
+        self.stdout.write(self.style.SUCCESS(f'Recomputed {updated} inbreeding coefficients.'))
@@ -0,0 +1,70 @@
+# apps/livestock/managers.py
+from datetime import timedelta
+from django.db import models
+from django.db.models import Count, DecimalField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from apps.common.scoping import FarmScopedQuerySetMixin
+
+HERD_YIELD_WINDOW_DAYS = 7
+
+class CowQuerySet(FarmScopedQuerySetMixin, models.QuerySet):
+    """Queryset helpers for cows"""
+    
+    def active(self):
+        return self.filter(is_deleted=False)
+    
+    def with_herd_stats(self, today=None):
+        """Annotate calf count, 7-day average daily yield, last heat and last breeding.
+        
+        Each figure is a correlated subquery on an indexed (cow, date) column so
+        the annotations do not multiply rows the way stacked joins would.
+        """
+        from apps.breeding.models import BreedingRecord, HeatDetection
+        from apps.production.models import MilkProduction
+        
+        today = today or timezone.now().date()
+        calves = (
+            self.model.objects
+            .filter(mother=OuterRef('pk'), is_deleted=False)
+            .order_by()
+            .values('mother')
+            .annotate(total=Count('id'))
+            .values('total')
+        )
+        recent_yield = (
+            MilkProduction.objects
+            .filter(
+                cow=OuterRef('pk'),
+                date__gt=today - timedelta(days=HERD_YIELD_WINDOW_DAYS),
+                date__lte=today,
+                is_deleted=False
+            )
+            .order_by()
+            .values('cow')
+            .annotate(
+                average=Sum('quantity_liters') / Count('date', distinct=True)
+            )
+            .values('average')
+        )
+        last_heat = (
+            HeatDetection.objects
+            .filter(cow=OuterRef('pk'), is_deleted=False)
+            .order_by('-heat_date')
+            .values('heat_date')[:1]
+        )
+        last_breeding = (
+            BreedingRecord.objects
+            .filter(cow=OuterRef('pk'), is_deleted=False)
+            .order_by('-breeding_date')
+            .values('breeding_date')[:1]
+        )
+        return self.annotate(
+            calf_count=Coalesce(Subquery(calves), 0),
+            avg_daily_yield_7d=Subquery(
+                recent_yield,
+                output_field=DecimalField(max_digits=8, decimal_places=2)
+            ),
+            last_heat_date=Subquery(last_heat),
+            last_breeding_date=Subquery(last_breeding)
+        )
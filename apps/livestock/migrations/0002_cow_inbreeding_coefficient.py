@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('livestock', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cow',
+            name='inbreeding_coefficient',
+            field=models.DecimalField(decimal_places=6, default=0, editable=False, help_text="Cached Wright's coefficient, recomputed when lineage changes", max_digits=7),
+        ),
+    ]
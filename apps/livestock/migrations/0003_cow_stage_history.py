@@ -0,0 +1,55 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:14
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def seed_current_stages(apps, schema_editor):
+    # Existing cows start their history in their current stage
+    Cow = apps.get_model('livestock', 'Cow')
+    CowStageHistory = apps.get_model('livestock', 'CowStageHistory')
+    CowStageHistory.objects.bulk_create(
+        (
+            CowStageHistory(cow_id=cow_id, stage=stage, started_on=started_on)
+            for cow_id, stage, started_on in Cow.objects.values_list(
+                'id', 'current_stage', 'date_acquired'
+            ).iterator()
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('livestock', '0002_cow_inbreeding_coefficient'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CowStageHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('stage', models.CharField(choices=[('calf', 'Calf'), ('heifer', 'Heifer'), ('lactating', 'Lactating'), ('dry', 'Dry Period'), ('pregnant', 'Pregnant'), ('heat', 'In Heat'), ('sick', 'Sick'), ('sold', 'Sold')], max_length=15)),
+                ('previous_stage', models.CharField(blank=True, choices=[('calf', 'Calf'), ('heifer', 'Heifer'), ('lactating', 'Lactating'), ('dry', 'Dry Period'), ('pregnant', 'Pregnant'), ('heat', 'In Heat'), ('sick', 'Sick'), ('sold', 'Sold')], max_length=15, null=True)),
+                ('started_on', models.DateField()),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='cow_stage_changes', to=settings.AUTH_USER_MODEL)),
+                ('cow', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stage_history', to='livestock.cow')),
+            ],
+            options={
+                'verbose_name': 'Cow Stage Change',
+                'verbose_name_plural': 'Cow Stage History',
+                'db_table': 'livestock_cow_stage_history',
+                'ordering': ['-started_on', '-id'],
+                'indexes': [models.Index(fields=['cow', 'started_on'], name='cow_stage_asof_idx')],
+            },
+        ),
+        migrations.RunPython(seed_current_stages, migrations.RunPython.noop),
+    ]
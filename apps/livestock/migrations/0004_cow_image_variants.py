@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('livestock', '0003_cow_stage_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cow',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized JPEG/WebP copies, filled in by a background task'),
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django.core.validators import MinValueValidator
 from django.utils import timezone  # Add this line
 from apps.common.models import BaseModel
+from .managers import CowQuerySet
 
 class Cow(BaseModel):
     """Individual cow management"""
@@ -58,10 +59,25 @@ class Cow(BaseModel):
         related_name='calves'
     )
     father_info = models.CharField(max_length=100, blank=True, null=True)
+    inbreeding_coefficient = models.DecimalField(
+        max_digits=7,
+        decimal_places=6,
+        default=0,
+        editable=False,
+        help_text="Cached Wright's coefficient, recomputed when lineage changes"
+    )
     image = models.ImageField(upload_to='cow_images/', null=True, blank=True)
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text="Resized JPEG/WebP copies, filled in by a background task"
+    )
     notes = models.TextField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
     
+    objects = CowQuerySet.as_manager()
+    
     class Meta:
         db_table = 'livestock_cows'
         verbose_name = 'Cow'
@@ -86,6 +102,121 @@ class Cow(BaseModel):
     
     def total_calves(self):
         return self.calves.filter(is_deleted=False).count()
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_lineage = (
+            instance.__dict__.get('mother_id'),
+            instance.__dict__.get('father_info')
+        )
+        instance._loaded_identity = (
+            instance.__dict__.get('name'),
+            instance.__dict__.get('farm_id')
+        )
+        instance._loaded_stage = instance.__dict__.get('current_stage')
+        instance._loaded_image = instance.__dict__.get('image')
+        instance._loaded_tag = instance.__dict__.get('tag_number')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        from apps.analytics.services import ReproductiveKPIService
+        from apps.common.images import queue_image_variants
+        from .services import PedigreeService, TagScanService
+        
+        adding = self._state.adding
+        
+        # A new upload invalidates the old variants until the task rebuilds them
+        image = self.image.name if self.image else ''
+        image_changed = (getattr(self, '_loaded_image', None) or '') != image
+        if image_changed:
+            self.image_variants = {}
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'image_variants'}
+        
+        # Only a new calf or a lineage edit changes the cached coefficient
+        lineage = (self.mother_id, self.father_info)
+        previous_lineage = getattr(self, '_loaded_lineage', None)
+        lineage_changed = lineage != previous_lineage
+        if lineage_changed:
+            self.inbreeding_coefficient = PedigreeService.calculate_inbreeding(
+                self.mother_id, self.father_info
+            )
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'inbreeding_coefficient'}
+        
+        super().save(*args, **kwargs)
+        self._loaded_lineage = lineage
+        
+        if lineage_changed and previous_lineage is not None:
+            PedigreeService.refresh_descendants(self)
+        
+        # Health records keep a denormalized copy of the name and farm
+        identity = (self.name, self.farm_id)
+        previous_identity = getattr(self, '_loaded_identity', identity)
+        if previous_identity != identity:
+            self.health_records.update(animal_display_name=self.name, farm_id=self.farm_id)
+        self._loaded_identity = identity
+        
+        # Stage, breed and farm all feed the reproductive KPIs of both farms
+        ReproductiveKPIService.invalidate([self.farm_id, previous_identity[1]])
+        
+        # Direct stage edits (admin, serializers) still leave a history entry
+        previous_stage = getattr(self, '_loaded_stage', None)
+        if adding or previous_stage != self.current_stage:
+            CowStageHistory.objects.create(
+                cow=self,
+                stage=self.current_stage,
+                previous_stage=None if adding else previous_stage,
+                started_on=self.date_acquired if adding else timezone.now().date()
+            )
+        self._loaded_stage = self.current_stage
+        
+        # The upload is renamed into upload_to on save, so track the stored name
+        self._loaded_image = self.image.name if self.image else ''
+        if image_changed:
+            queue_image_variants(self, 'image', 'image_variants')
+        
+        # Drop cached scan entries for the current and any previous tag
+        TagScanService.invalidate_tags({self.tag_number, getattr(self, '_loaded_tag', None)})
+        self._loaded_tag = self.tag_number
+    
+    def stage_on(self, on_date):
+        """Lifecycle stage the cow was in on a given date"""
+        from .services import LifecycleService
+        return LifecycleService.stage_on(self.pk, on_date)
+
+class CowStageHistory(BaseModel):
+    """Lifecycle stage changes of a cow; each stage lasts until the next entry"""
+    
+    cow = models.ForeignKey(
+        Cow,
+        on_delete=models.CASCADE,
+        related_name='stage_history'
+    )
+    stage = models.CharField(max_length=15, choices=Cow.STAGE_CHOICES)
+    previous_stage = models.CharField(max_length=15, choices=Cow.STAGE_CHOICES, blank=True, null=True)
+    started_on = models.DateField()
+    changed_by = models.ForeignKey(
+        'authentication.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='cow_stage_changes'
+    )
+    notes = models.TextField(blank=True, null=True)
+    
+    class Meta:
+        db_table = 'livestock_cow_stage_history'
+        verbose_name = 'Cow Stage Change'
+        verbose_name_plural = 'Cow Stage History'
+        ordering = ['-started_on', '-id']
+        indexes = [
+            models.Index(fields=['cow', 'started_on'], name='cow_stage_asof_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.cow.name}: {self.get_stage_display()} from {self.started_on}"
 
 class ChickenBatch(BaseModel):
     """Chicken batch management - chickens handled as groups"""
@@ -125,6 +256,24 @@ class ChickenBatch(BaseModel):
     def __str__(self):
         return f"{self.batch_name} ({self.current_count}/{self.initial_count}) - {self.farm.name}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_identity = (
+            instance.__dict__.get('batch_name'),
+            instance.__dict__.get('farm_id')
+        )
+        return instance
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        
+        # Health records keep a denormalized copy of the batch name and farm
+        identity = (self.batch_name, self.farm_id)
+        if getattr(self, '_loaded_identity', identity) != identity:
+            self.health_records.update(animal_display_name=self.batch_name, farm_id=self.farm_id)
+        self._loaded_identity = identity
+    
     @property
     def total_cost(self):
         return self.initial_count * self.acquisition_cost_per_bird
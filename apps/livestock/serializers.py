@@ -1,21 +1,91 @@
 # apps/livestock/serializers.py
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Cow, ChickenBatch, ChickenReduction
+from apps.common.serializers import ImageVariantsField
+from .models import Cow, CowStageHistory, ChickenBatch, ChickenReduction
+from .services import MAX_SCAN_BATCH
 
 class CowSerializer(serializers.ModelSerializer):
     age_in_months = serializers.ReadOnlyField()
     total_calves = serializers.ReadOnlyField()
     mother_name = serializers.CharField(source='mother.name', read_only=True)
+    image_variants = ImageVariantsField()
     
     class Meta:
         model = Cow
         fields = [
             'id', 'farm', 'name', 'tag_number', 'breed', 'date_of_birth',
             'date_acquired', 'acquisition_cost', 'current_stage', 'weight',
-            'mother', 'mother_name', 'father_info', 'image', 'notes',
-            'is_active', 'age_in_months', 'total_calves', 'created_at', 'updated_at'
+            'mother', 'mother_name', 'father_info', 'inbreeding_coefficient',
+            'image', 'image_variants', 'notes', 'is_active', 'age_in_months',
+            'total_calves', 'created_at', 'updated_at'
         ]
 
+class HerdCowSerializer(serializers.ModelSerializer):
+    """Herd list row; KPI fields come from CowQuerySet.with_herd_stats()"""
+    
+    age_in_months = serializers.ReadOnlyField()
+    farm_name = serializers.CharField(source='farm.name', read_only=True)
+    mother_name = serializers.CharField(source='mother.name', read_only=True, default=None)
+    calf_count = serializers.IntegerField(read_only=True)
+    avg_daily_yield_7d = serializers.DecimalField(
+        max_digits=8, decimal_places=2, read_only=True, allow_null=True
+    )
+    last_heat_date = serializers.DateField(read_only=True, allow_null=True)
+    last_breeding_date = serializers.DateField(read_only=True, allow_null=True)
+    image_variants = ImageVariantsField()
+    
+    class Meta:
+        model = Cow
+        fields = [
+            'id', 'farm', 'farm_name', 'name', 'tag_number', 'breed', 'date_of_birth',
+            'age_in_months', 'current_stage', 'weight', 'mother', 'mother_name',
+            'father_info', 'inbreeding_coefficient', 'image', 'image_variants',
+            'is_active', 'calf_count', 'avg_daily_yield_7d', 'last_heat_date', 'last_breeding_date'
+        ]
+
+class PedigreeEntrySerializer(serializers.ModelSerializer):
+    generation = serializers.IntegerField(read_only=True)
+    
+    class Meta:
+        model = Cow
+        fields = [
+            'id', 'name', 'tag_number', 'breed', 'date_of_birth', 'mother',
+            'father_info', 'inbreeding_coefficient', 'generation'
+        ]
+
+class CowStageHistorySerializer(serializers.ModelSerializer):
+    changed_by_name = serializers.CharField(source='changed_by.get_full_name', read_only=True)
+    
+    class Meta:
+        model = CowStageHistory
+        fields = [
+            'id', 'cow', 'stage', 'previous_stage', 'started_on',
+            'changed_by', 'changed_by_name', 'notes', 'created_at'
+        ]
+
+class CowStageTransitionSerializer(serializers.Serializer):
+    cow_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=1000
+    )
+    to_stage = serializers.ChoiceField(choices=Cow.STAGE_CHOICES)
+    date = serializers.DateField(required=False)
+    notes = serializers.CharField(required=False, allow_blank=True)
+    
+    def validate_date(self, value):
+        if value > timezone.now().date():
+            raise serializers.ValidationError('Stage changes cannot be dated in the future.')
+        return value
+
+class TagScanBatchSerializer(serializers.Serializer):
+    tags = serializers.ListField(
+        child=serializers.CharField(max_length=20),
+        allow_empty=False,
+        max_length=MAX_SCAN_BATCH
+    )
+
 class CowCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Cow
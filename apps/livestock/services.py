@@ -0,0 +1,446 @@
+# apps/livestock/services.py
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Max, OuterRef, Subquery
+from django.utils import timezone
+from apps.common.cache import LocalCache
+from .models import Cow, CowStageHistory
+
+DEFAULT_PEDIGREE_DEPTH = 10
+MAX_PEDIGREE_DEPTH = 20
+DAM_LINE_CACHE_TIMEOUT = 60 * 60 * 24
+# Offspring above this coefficient (half-sib mating or closer) are flagged
+INBREEDING_WARNING_LEVEL = Decimal('0.0625')
+
+# Tag scanning: identity changes rarely, today's sessions change at every milking
+SCAN_LOCAL_TIMEOUT = 10
+SCAN_COW_TIMEOUT = 60 * 60
+SCAN_SESSIONS_TIMEOUT = 60 * 5
+MAX_SCAN_BATCH = 200
+
+# Allowed lifecycle moves; 'sold' is terminal
+STAGE_TRANSITIONS = {
+    'calf': {'heifer', 'sick', 'sold'},
+    'heifer': {'heat', 'pregnant', 'sick', 'sold'},
+    'heat': {'heifer', 'pregnant', 'lactating', 'dry', 'sick', 'sold'},
+    'pregnant': {'lactating', 'dry', 'heifer', 'sick', 'sold'},
+    'lactating': {'dry', 'heat', 'pregnant', 'sick', 'sold'},
+    'dry': {'lactating', 'heat', 'pregnant', 'sick', 'sold'},
+    'sick': {'calf', 'heifer', 'heat', 'pregnant', 'lactating', 'dry', 'sold'},
+    'sold': set(),
+}
+
+ANCESTORS_SQL = """
+    WITH RECURSIVE ancestors(id, mother_id, generation) AS (
+        SELECT id, mother_id, 0 FROM livestock_cows WHERE id = %s
+        UNION ALL
+        SELECT c.id, c.mother_id, a.generation + 1
+        FROM livestock_cows c
+        INNER JOIN ancestors a ON c.id = a.mother_id
+        WHERE a.generation < %s
+    )
+    SELECT c.*, a.generation
+    FROM livestock_cows c
+    INNER JOIN ancestors a ON c.id = a.id
+    ORDER BY a.generation
+"""
+
+DESCENDANTS_SQL = """
+    WITH RECURSIVE descendants(id, generation) AS (
+        SELECT id, 1 FROM livestock_cows WHERE mother_id = %s
+        UNION ALL
+        SELECT c.id, d.generation + 1
+        FROM livestock_cows c
+        INNER JOIN descendants d ON c.mother_id = d.id
+        WHERE d.generation < %s
+    )
+    SELECT c.*, d.generation
+    FROM livestock_cows c
+    INNER JOIN descendants d ON c.id = d.id
+    ORDER BY d.generation, c.name
+"""
+
+def normalize_sire(sire):
+    """Normalize a free-text bull name/ID so sire identities can be compared"""
+    if not sire:
+        return None
+    return ' '.join(sire.split()).lower() or None
+
+def to_coefficient(value):
+    return Decimal(str(round(value, 6)))
+
+class PedigreeService:
+    """Pedigree traversal and inbreeding coefficients over the dam lineage"""
+    
+    @staticmethod
+    def get_ancestors(cow, depth=DEFAULT_PEDIGREE_DEPTH):
+        """Dam line of a cow (generation 1 = mother) in a single recursive query"""
+        ancestors = Cow.objects.raw(ANCESTORS_SQL, [cow.pk, depth])
+        return [ancestor for ancestor in ancestors if ancestor.generation > 0]
+    
+    @staticmethod
+    def get_descendants(cow, depth=DEFAULT_PEDIGREE_DEPTH):
+        """All calves, grand-calves, etc. of a cow in a single recursive query"""
+        return [
+            descendant for descendant in Cow.objects.raw(DESCENDANTS_SQL, [cow.pk, depth])
+            if not descendant.is_deleted
+        ]
+    
+    @staticmethod
+    def _dam_line_cache_key(cow_id):
+        return f'livestock:dam_line:{cow_id}'
+    
+    @staticmethod
+    def get_dam_line(cow_id):
+        """Cached [(generation, normalized sire)] for a cow and her dam line"""
+        cache_key = PedigreeService._dam_line_cache_key(cow_id)
+        dam_line = cache.get(cache_key)
+        if dam_line is None:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    """
+                    WITH RECURSIVE ancestors(id, mother_id, father_info, generation) AS (
+                        SELECT id, mother_id, father_info, 0 FROM livestock_cows WHERE id = %s
+                        UNION ALL
+                        SELECT c.id, c.mother_id, c.father_info, a.generation + 1
+                        FROM livestock_cows c
+                        INNER JOIN ancestors a ON c.id = a.mother_id
+                        WHERE a.generation < %s
+                    )
+                    SELECT generation, father_info FROM ancestors ORDER BY generation
+                    """,
+                    [cow_id, MAX_PEDIGREE_DEPTH]
+                )
+                dam_line = [
+                    (generation, normalize_sire(father_info))
+                    for generation, father_info in cursor.fetchall()
+                ]
+            cache.set(cache_key, dam_line, DAM_LINE_CACHE_TIMEOUT)
+        return dam_line
+    
+    @staticmethod
+    def _coefficient_from_dam_line(dam_line, sire):
+        """
+        Wright's coefficient for a calf of `sire` out of the dam whose line is given.
+        Sires are only known by identity, so the common ancestors are the sire
+        himself wherever he also sired a female in the dam line.
+        """
+        sire_key = normalize_sire(sire)
+        if not sire_key:
+            return 0.0
+        return sum(
+            0.5 ** (generation + 2)
+            for generation, ancestor_sire in dam_line
+            if ancestor_sire == sire_key
+        )
+    
+    @staticmethod
+    def calculate_inbreeding(dam_id, sire):
+        """Expected inbreeding coefficient of a calf from dam_id and sire"""
+        if not dam_id or not normalize_sire(sire):
+            return to_coefficient(0)
+        dam_line = PedigreeService.get_dam_line(dam_id)
+        return to_coefficient(PedigreeService._coefficient_from_dam_line(dam_line, sire))
+    
+    @staticmethod
+    def check_mating(dam, sire):
+        """Evaluate a planned mating against the dam's cached pedigree"""
+        sire_key = normalize_sire(sire)
+        dam_line = PedigreeService.get_dam_line(dam.pk) if sire_key else []
+        coefficient = to_coefficient(
+            PedigreeService._coefficient_from_dam_line(dam_line, sire)
+        )
+        return {
+            'dam': dam.pk,
+            'sire': sire,
+            'expected_inbreeding_coefficient': coefficient,
+            'shared_sire_generations': [
+                generation for generation, ancestor_sire in dam_line
+                if ancestor_sire == sire_key
+            ],
+            'acceptable': coefficient < INBREEDING_WARNING_LEVEL,
+        }
+    
+    @staticmethod
+    def refresh_descendants(cow):
+        """Recompute cached coefficients below a cow whose lineage changed"""
+        descendants = list(Cow.objects.raw(DESCENDANTS_SQL, [cow.pk, MAX_PEDIGREE_DEPTH]))
+        cache.delete_many(
+            [PedigreeService._dam_line_cache_key(cow.pk)] +
+            [PedigreeService._dam_line_cache_key(descendant.pk) for descendant in descendants]
+        )
+        if not descendants:
+            return 0
+        
+        # Walk down generation by generation, extending each dam line in memory
+        dam_lines = {cow.pk: PedigreeService.get_dam_line(cow.pk)}
+        for descendant in descendants:
+            mother_line = dam_lines.get(descendant.mother_id, [])
+            descendant.inbreeding_coefficient = to_coefficient(
+                PedigreeService._coefficient_from_dam_line(mother_line, descendant.father_info)
+            )
+            dam_lines[descendant.pk] = [(0, normalize_sire(descendant.father_info))] + [
+                (generation + 1, sire) for generation, sire in mother_line
+                if generation + 1 <= MAX_PEDIGREE_DEPTH
+            ]
+        
+        Cow.objects.bulk_update(descendants, ['inbreeding_coefficient'], batch_size=500)
+        return len(descendants)
+    
+    @staticmethod
+    def recompute_all(cow_ids=None):
+        """Recompute coefficients (all cows, or just cow_ids) from one pass over the herd table"""
+        cows = {
+            cow['id']: cow
+            for cow in Cow.objects.values('id', 'mother_id', 'father_info')
+        }
+        dam_lines = {}
+        
+        def dam_line(cow_id):
+            # Iterative walk up the dam line, guarding against cycles and depth
+            line, current, seen = [], cows.get(cow_id), set()
+            generation = 0
+            while current and current['id'] not in seen and generation <= MAX_PEDIGREE_DEPTH:
+                seen.add(current['id'])
+                line.append((generation, normalize_sire(current['father_info'])))
+                current = cows.get(current['mother_id'])
+                generation += 1
+            return line
+        
+        updated = []
+        targets = cows if cow_ids is None else {cow_id: cows[cow_id] for cow_id in cow_ids if cow_id in cows}
+        for cow_id, cow in targets.items():
+            mother_id = cow['mother_id']
+            if mother_id not in dam_lines:
+                dam_lines[mother_id] = dam_line(mother_id)
+            updated.append(Cow(
+                id=cow_id,
+                inbreeding_coefficient=to_coefficient(
+                    PedigreeService._coefficient_from_dam_line(
+                        dam_lines[mother_id], cow['father_info']
+                    )
+                )
+            ))
+        
+        Cow.objects.bulk_update(updated, ['inbreeding_coefficient'], batch_size=500)
+        cache.delete_many([PedigreeService._dam_line_cache_key(cow_id) for cow_id in targets])
+        return len(updated)
+
+
+class StageTransitionError(ValueError):
+    """Raised when some cows in a transition cannot make the requested move"""
+    
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(f"{len(errors)} cow(s) cannot make this transition")
+
+class LifecycleService:
+    """Validated cow stage transitions and point-in-time stage lookups"""
+    
+    @staticmethod
+    def can_transition(from_stage, to_stage):
+        return to_stage in STAGE_TRANSITIONS.get(from_stage, set())
+    
+    @staticmethod
+    @transaction.atomic
+    def transition(cow_ids, to_stage, on_date=None, user=None, notes=''):
+        """Move many cows to a stage with one UPDATE and one bulk_create"""
+        from apps.analytics.services import ReproductiveKPIService
+        
+        on_date = on_date or timezone.now().date()
+        cow_ids = set(cow_ids)
+        current, tags = {}, []
+        locked = (
+            Cow.objects.select_for_update()
+            .filter(pk__in=cow_ids, is_deleted=False)
+            .values_list('id', 'current_stage', 'tag_number', 'farm_id')
+        )
+        farm_ids = set()
+        for cow_id, stage, tag, farm_id in locked:
+            current[cow_id] = stage
+            tags.append(tag)
+            farm_ids.add(farm_id)
+        latest_starts = dict(
+            CowStageHistory.objects.filter(cow_id__in=cow_ids, is_deleted=False)
+            .values('cow_id')
+            .annotate(latest=Max('started_on'))
+            .values_list('cow_id', 'latest')
+        )
+        
+        errors = {}
+        for cow_id in cow_ids:
+            stage = current.get(cow_id)
+            if stage is None:
+                errors[cow_id] = 'Cow not found.'
+            elif not LifecycleService.can_transition(stage, to_stage):
+                errors[cow_id] = f"Cannot move from '{stage}' to '{to_stage}'."
+            elif latest_starts.get(cow_id) and latest_starts[cow_id] > on_date:
+                errors[cow_id] = f"Has a later stage change on {latest_starts[cow_id]}."
+        if errors:
+            raise StageTransitionError(errors)
+        
+        Cow.objects.filter(pk__in=cow_ids).update(current_stage=to_stage, updated_at=timezone.now())
+        CowStageHistory.objects.bulk_create([
+            CowStageHistory(
+                cow_id=cow_id,
+                stage=to_stage,
+                previous_stage=current[cow_id],
+                started_on=on_date,
+                changed_by=user,
+                notes=notes or None
+            )
+            for cow_id in sorted(cow_ids)
+        ])
+        TagScanService.invalidate_tags(tags)
+        ReproductiveKPIService.invalidate(farm_ids)
+        return len(cow_ids)
+    
+    @staticmethod
+    def stage_subquery(on_date, cow_ref='pk'):
+        """Stage as of a date (or date column) for annotating querysets (cow/started_on index)"""
+        if isinstance(cow_ref, str):
+            cow_ref = OuterRef(cow_ref)
+        if isinstance(on_date, str):
+            on_date = OuterRef(on_date)
+        return Subquery(
+            CowStageHistory.objects
+            .filter(cow_id=cow_ref, started_on__lte=on_date, is_deleted=False)
+            .order_by('-started_on', '-id')
+            .values('stage')[:1]
+        )
+    
+    @staticmethod
+    def stage_on(cow_id, on_date):
+        return (
+            CowStageHistory.objects
+            .filter(cow_id=cow_id, started_on__lte=on_date, is_deleted=False)
+            .order_by('-started_on', '-id')
+            .values_list('stage', flat=True)
+            .first()
+        )
+    
+    @staticmethod
+    def cows_with_stage_on(on_date, cows=None):
+        """Cows annotated with stage_on_date for a point in time"""
+        cows = Cow.objects.filter(is_deleted=False) if cows is None else cows
+        return cows.annotate(stage_on_date=LifecycleService.stage_subquery(on_date))
+
+
+class TagScanService:
+    """Ear-tag/RFID lookups served from an in-process cache backed by the shared cache"""
+    
+    local_cache = LocalCache(SCAN_LOCAL_TIMEOUT)
+    
+    @staticmethod
+    def normalize_tag(tag):
+        return tag.strip()
+    
+    @staticmethod
+    def _cow_key(tag):
+        return f"livestock:scan:tag:{tag}"
+    
+    @staticmethod
+    def _sessions_key(cow_id, on_date):
+        return f"livestock:scan:sessions:{cow_id}:{on_date.isoformat()}"
+    
+    @staticmethod
+    def _cached(keys, loader, timeout):
+        """Resolve {cache_key: item} through the local cache, the shared cache, then loader(items)"""
+        found = TagScanService.local_cache.get_many(keys)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            shared = cache.get_many(missing)
+            found.update(shared)
+            TagScanService.local_cache.set_many(shared)
+            missing = [key for key in missing if key not in shared]
+        if missing:
+            loaded = loader([keys[key] for key in missing])
+            loaded = {key: loaded[keys[key]] for key in missing}
+            cache.set_many(loaded, timeout)
+            TagScanService.local_cache.set_many(loaded)
+            found.update(loaded)
+        return found
+    
+    @staticmethod
+    def _load_cows(tags):
+        cows = Cow.objects.filter(tag_number__in=tags, is_deleted=False).values(
+            'id', 'tag_number', 'name', 'farm_id', 'current_stage', 'is_active'
+        )
+        loaded = {
+            cow['tag_number']: {
+                'id': cow['id'],
+                'tag_number': cow['tag_number'],
+                'name': cow['name'],
+                'farm': cow['farm_id'],
+                'stage': cow['current_stage'],
+                'is_active': cow['is_active'],
+            }
+            for cow in cows
+        }
+        # Cache misses too, so repeated scans of an unknown tag stay off the database
+        return {tag: loaded.get(tag, {}) for tag in tags}
+    
+    @staticmethod
+    def _load_sessions(on_date):
+        def load(cow_ids):
+            from apps.production.models import MilkProduction
+            
+            sessions = {cow_id: [] for cow_id in cow_ids}
+            records = MilkProduction.objects.filter(
+                cow_id__in=cow_ids, date=on_date, is_deleted=False
+            ).values_list('cow_id', 'session')
+            for cow_id, session in records:
+                sessions[cow_id].append(session)
+            return sessions
+        return load
+    
+    @staticmethod
+    def lookup_many(tags, farm_id=None):
+        """Resolve tags to cow summaries with today's recorded milking sessions"""
+        today = timezone.localdate()
+        tags = list(dict.fromkeys(TagScanService.normalize_tag(tag) for tag in tags if tag.strip()))
+        cow_keys = {tag: TagScanService._cow_key(tag) for tag in tags}
+        cows = TagScanService._cached(
+            {key: tag for tag, key in cow_keys.items()}, TagScanService._load_cows, SCAN_COW_TIMEOUT
+        )
+        
+        results = {}
+        for tag, key in cow_keys.items():
+            cow = cows.get(key)
+            if cow and (farm_id is None or cow['farm'] == farm_id):
+                results[tag] = dict(cow)
+        
+        session_keys = {
+            tag: TagScanService._sessions_key(cow['id'], today) for tag, cow in results.items()
+        }
+        sessions = TagScanService._cached(
+            {session_keys[tag]: cow['id'] for tag, cow in results.items()},
+            TagScanService._load_sessions(today),
+            SCAN_SESSIONS_TIMEOUT
+        )
+        for tag, key in session_keys.items():
+            results[tag]['sessions_today'] = sessions.get(key, [])
+        return results
+    
+    @staticmethod
+    def lookup(tag, farm_id=None):
+        return TagScanService.lookup_many([tag], farm_id).get(TagScanService.normalize_tag(tag))
+    
+    @staticmethod
+    def _delete_on_commit(keys):
+        # Evicting before commit would let a concurrent scan re-cache the old row
+        def delete():
+            TagScanService.local_cache.delete_many(keys)
+            cache.delete_many(keys)
+        transaction.on_commit(delete)
+    
+    @staticmethod
+    def invalidate_tags(tags):
+        keys = [TagScanService._cow_key(tag) for tag in tags if tag]
+        if keys:
+            TagScanService._delete_on_commit(keys)
+    
+    @staticmethod
+    def invalidate_sessions(cow_id, on_date):
+        TagScanService._delete_on_commit([TagScanService._sessions_key(cow_id, on_date)])
@@ -1,3 +1,365 @@
+# apps/livestock/tests.py
+import csv
+from datetime import timedelta
+from decimal import Decimal
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.authentication.models import User
+from apps.breeding.models import BreedingRecord, HeatDetection
+from apps.common.testing import create_cow
+from apps.farms.models import Farm
+from apps.production.models import MilkProduction
+from .models import Cow, CowStageHistory
+from .services import (
+    MAX_PEDIGREE_DEPTH, LifecycleService, PedigreeService, StageTransitionError, TagScanService
+)
 
-# Create your tests here.
+class HerdListQueryCountTests(TestCase):
+    """The herd API must not issue per-cow queries"""
+    
+    def setUp(self):
+        self.today = timezone.now().date()
+        self.farm = Farm.objects.create(name='Green Acres', location='Nakuru')
+        self.other_farm = Farm.objects.create(name='Hillside', location='Kisii')
+        self.admin = User.objects.create_user(
+            email='admin@example.com', username='admin', password='pass',
+            first_name='Ada', last_name='Admin', role='admin'
+        )
+        self.farmer = User.objects.create_user(
+            email='farmer@example.com', username='farmer', password='pass',
+            first_name='Fay', last_name='Farmer', role='farmer', assigned_farm=self.farm
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+    
+    def create_cows(self, count, farm=None):
+        farm = farm or self.farm
+        start = Cow.objects.count()
+        for i in range(start, start + count):
+            mother = Cow.objects.create(
+                farm=farm, name=f'Cow {i}', tag_number=f'T{i:04d}', breed='friesian',
+                date_acquired=self.today - timedelta(days=900), acquisition_cost=50000,
+                current_stage='lactating'
+            )
+            Cow.objects.create(
+                farm=farm, name=f'Calf {i}', tag_number=f'C{i:04d}', breed='friesian',
+                date_acquired=self.today, acquisition_cost=0, current_stage='calf', mother=mother
+            )
+            for days_ago in (1, 2):
+                MilkProduction.objects.create(
+                    cow=mother, date=self.today - timedelta(days=days_ago),
+                    session='morning', quantity_liters=Decimal('12.50')
+                )
+            HeatDetection.objects.create(cow=mother, heat_date=self.today - timedelta(days=20))
+            BreedingRecord.objects.create(
+                cow=mother, breeding_date=self.today - timedelta(days=19),
+                heat_detected_date=self.today - timedelta(days=20)
+            )
+    
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+    
+    def test_list_query_count_is_constant(self):
+        self.create_cows(2)
+        small_herd = self.count_queries('/api/livestock/herd/')
+        self.create_cows(10)
+        self.assertEqual(self.count_queries('/api/livestock/herd/'), small_herd)
+        
+        # One COUNT for pagination and one annotated SELECT for the page
+        self.assertEqual(small_herd, 2)
+    
+    def test_detail_is_a_single_query(self):
+        self.create_cows(1)
+        cow = Cow.objects.get(tag_number='T0000')
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/livestock/herd/{cow.pk}/')
+        self.assertEqual(response.data['calf_count'], 1)
+        self.assertEqual(response.data['avg_daily_yield_7d'], '12.50')
+        self.assertEqual(response.data['last_heat_date'], str(self.today - timedelta(days=20)))
+        self.assertEqual(response.data['last_breeding_date'], str(self.today - timedelta(days=19)))
+    
+    def test_farmer_only_sees_assigned_farm(self):
+        self.create_cows(1)
+        self.create_cows(1, farm=self.other_farm)
+        self.client.force_authenticate(self.farmer)
+        response = self.client.get('/api/livestock/herd/')
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual({row['farm'] for row in response.data['results']}, {self.farm.pk})
+
+class PedigreeServiceTests(TestCase):
+    """Inbreeding coefficients over the dam line and their upkeep on lineage edits"""
+    
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.now().date()
+        self.farm = Farm.objects.create(name='Green Acres', location='Nakuru')
+    
+    def coefficient(self, cow):
+        return Cow.objects.values_list('inbreeding_coefficient', flat=True).get(pk=cow.pk)
+    
+    def test_coefficient_counts_each_shared_sire_generation(self):
+        granddam = create_cow(self.farm, father_info='Bull X')
+        dam = create_cow(self.farm, mother=granddam, father_info='Bull Y')
+        
+        # Bull X sired the granddam: 0.5 ** (1 + 2)
+        self.assertEqual(PedigreeService.calculate_inbreeding(dam.pk, 'bull  x'), Decimal('0.125'))
+        # Bull Y sired the dam itself: 0.5 ** (0 + 2)
+        check = PedigreeService.check_mating(dam, 'Bull Y')
+        self.assertEqual(check['expected_inbreeding_coefficient'], Decimal('0.25'))
+        self.assertEqual(check['shared_sire_generations'], [0])
+        self.assertFalse(check['acceptable'])
+        self.assertTrue(PedigreeService.check_mating(dam, 'Bull Z')['acceptable'])
+        
+        calf = create_cow(self.farm, mother=dam, father_info='Bull X')
+        self.assertEqual(self.coefficient(calf), Decimal('0.125'))
+    
+    def test_lineage_edit_refreshes_descendants(self):
+        granddam = create_cow(self.farm, father_info='Bull Y')
+        dam = create_cow(self.farm, mother=granddam, father_info='Bull Z')
+        calf = create_cow(self.farm, mother=dam, father_info='Bull X')
+        self.assertEqual(self.coefficient(calf), Decimal('0'))
+        
+        granddam = Cow.objects.get(pk=granddam.pk)
+        granddam.father_info = 'Bull X'
+        granddam.save()
+        self.assertEqual(self.coefficient(calf), Decimal('0.125'))
+        self.assertEqual(
+            [cow.pk for cow in PedigreeService.get_descendants(granddam)], [dam.pk, calf.pk]
+        )
+    
+    def test_cycles_and_depth_are_bounded(self):
+        first = create_cow(self.farm, father_info='Bull X')
+        second = create_cow(self.farm, mother=first, father_info='Bull X')
+        # A data-entry loop: each cow is recorded as the other's mother
+        Cow.objects.filter(pk=first.pk).update(mother=second)
+        self.assertEqual(PedigreeService.recompute_all(), 2)
+        self.assertEqual(self.coefficient(first), Decimal('0.375'))
+        
+        cow = create_cow(self.farm, father_info='Bull X')
+        for _ in range(MAX_PEDIGREE_DEPTH + 5):
+            cow = create_cow(self.farm, mother=cow, father_info='Bull X')
+        dam_line = PedigreeService.get_dam_line(cow.pk)
+        self.assertEqual(len(dam_line), MAX_PEDIGREE_DEPTH + 1)
+        self.assertEqual(len(PedigreeService.get_ancestors(cow, depth=3)), 3)
+    
+    def test_calf_registration_fills_lineage(self):
+        dam = create_cow(self.farm, father_info='Bull X')
+        calf = create_cow(self.farm)
+        BreedingRecord.objects.create(
+            cow=dam, breeding_date=self.today - timedelta(days=283),
+            heat_detected_date=self.today - timedelta(days=283), bull_info='Bull X',
+            actual_calving_date=self.today, calf_born=calf
+        )
+        calf.refresh_from_db()
+        self.assertEqual(calf.mother_id, dam.pk)
+        self.assertEqual(calf.father_info, 'Bull X')
+        self.assertEqual(calf.inbreeding_coefficient, Decimal('0.25'))
+
+class LifecycleServiceTests(TestCase):
+    """Stage transitions are validated together and recorded in the stage history"""
+    
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.now().date()
+        self.farm = Farm.objects.create(name='Green Acres', location='Nakuru')
+        self.admin = User.objects.create_user(
+            email='admin@example.com', username='admin', password='pass',
+            first_name='Ada', last_name='Admin', role='admin'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+    
+    def history(self, cow):
+        return list(
+            CowStageHistory.objects.filter(cow=cow).order_by('started_on', 'id')
+            .values_list('previous_stage', 'stage', 'started_on')
+        )
+    
+    def test_history_is_seeded_on_create_and_direct_edits(self):
+        cow = create_cow(self.farm, current_stage='calf')
+        acquired = cow.date_acquired
+        self.assertEqual(self.history(cow), [(None, 'calf', acquired)])
+        
+        cow = Cow.objects.get(pk=cow.pk)
+        cow.current_stage = 'heifer'
+        cow.save()
+        cow.save()
+        self.assertEqual(self.history(cow), [(None, 'calf', acquired), ('calf', 'heifer', self.today)])
+    
+    def test_allowed_transition_moves_every_cow(self):
+        cows = [create_cow(self.farm), create_cow(self.farm)]
+        on_date = self.today - timedelta(days=10)
+        
+        self.assertEqual(LifecycleService.transition([cow.pk for cow in cows], 'pregnant', on_date), 2)
+        for cow in cows:
+            cow.refresh_from_db()
+            self.assertEqual(cow.current_stage, 'pregnant')
+            self.assertEqual(self.history(cow)[-1], ('heifer', 'pregnant', on_date))
+    
+    def test_rejected_transition_changes_nothing(self):
+        heifer = create_cow(self.farm)
+        sold = create_cow(self.farm, current_stage='sold')
+        moved = create_cow(self.farm)
+        LifecycleService.transition([moved.pk], 'heat', self.today)
+        
+        # Sold is terminal, and a move cannot be backdated before a later change
+        yesterday = self.today - timedelta(days=1)
+        with self.assertRaises(StageTransitionError) as raised:
+            LifecycleService.transition([heifer.pk, sold.pk, moved.pk, 0], 'pregnant', yesterday)
+        self.assertEqual(set(raised.exception.errors), {sold.pk, moved.pk, 0})
+        self.assertEqual(Cow.objects.get(pk=heifer.pk).current_stage, 'heifer')
+        self.assertEqual(len(self.history(heifer)), 1)
+        
+        response = self.client.post(
+            '/api/livestock/cows/stage-transitions/',
+            {'cow_ids': [heifer.pk, sold.pk], 'to_stage': 'pregnant'}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data['cow_ids']), {sold.pk})
+    
+    def test_stage_on_reads_the_history(self):
+        cow = create_cow(self.farm)
+        LifecycleService.transition([cow.pk], 'pregnant', self.today - timedelta(days=20))
+        LifecycleService.transition([cow.pk], 'lactating', self.today - timedelta(days=5))
+        
+        self.assertIsNone(cow.stage_on(cow.date_acquired - timedelta(days=1)))
+        self.assertEqual(cow.stage_on(self.today - timedelta(days=21)), 'heifer')
+        self.assertEqual(cow.stage_on(self.today - timedelta(days=20)), 'pregnant')
+        self.assertEqual(cow.stage_on(self.today), 'lactating')
+        annotated = LifecycleService.cows_with_stage_on(self.today - timedelta(days=10)).get(pk=cow.pk)
+        self.assertEqual(annotated.stage_on_date, 'pregnant')
+
+class TagScanInvalidationTests(TestCase):
+    """Cached scans are evicted when the write that changed them commits"""
+    
+    def setUp(self):
+        cache.clear()
+        TagScanService.local_cache.clear()
+        self.today = timezone.now().date()
+        self.farm = Farm.objects.create(name='Green Acres', location='Nakuru')
+        self.cow = Cow.objects.create(
+            farm=self.farm, name='Daisy', tag_number='S1', breed='friesian',
+            date_acquired=self.today - timedelta(days=100), acquisition_cost=0
+        )
+    
+    def test_cow_save_evicts_after_commit(self):
+        self.assertEqual(TagScanService.lookup('S1')['name'], 'Daisy')
+        
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.cow.name = 'Bella'
+            self.cow.tag_number = 'S2'
+            self.cow.save()
+            # Still inside the transaction: the committed row is what scans see
+            self.assertEqual(TagScanService.lookup('S1')['name'], 'Daisy')
+        for callback in callbacks:
+            callback()
+        self.assertIsNone(TagScanService.lookup('S1'))
+        self.assertEqual(TagScanService.lookup('S2')['name'], 'Bella')
+    
+    def test_transition_and_milk_records_evict_after_commit(self):
+        self.assertEqual(TagScanService.lookup('S1')['stage'], 'heifer')
+        self.assertEqual(TagScanService.lookup('S1')['sessions_today'], [])
+        
+        with self.captureOnCommitCallbacks() as callbacks:
+            LifecycleService.transition([self.cow.pk], 'pregnant')
+            MilkProduction.objects.create(
+                cow=self.cow, date=timezone.localdate(), session='morning', quantity_liters=10
+            )
+            self.assertEqual(TagScanService.lookup('S1')['stage'], 'heifer')
+        for callback in callbacks:
+            callback()
+        scan = TagScanService.lookup('S1')
+        self.assertEqual((scan['stage'], scan['sessions_today']), ('pregnant', ['morning']))
+    
+    def test_rolled_back_write_keeps_the_cache(self):
+        TagScanService.lookup('S1')
+        with self.captureOnCommitCallbacks() as callbacks:
+            try:
+                with transaction.atomic():
+                    self.cow.name = 'Bella'
+                    self.cow.save()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertEqual(TagScanService.lookup('S1')['name'], 'Daisy')
+
+class CowImportTests(TestCase):
+    """CSV imports are validated as a whole and written in bulk, or not at all"""
+    
+    HEADER = 'Tag_Number,Name,Breed,Date_Acquired,Acquisition_Cost,Mother_Tag,Father_Info\n'
+    
+    def setUp(self):
+        cache.clear()
+        self.farm = Farm.objects.create(name='Green Acres', location='Nakuru')
+        self.admin = User.objects.create_user(
+            email='admin@example.com', username='admin', password='pass',
+            first_name='Ada', last_name='Admin', role='admin'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+    
+    def upload(self, content, dry_run=False):
+        if isinstance(content, str):
+            content = (self.HEADER + content).encode('utf-8')
+        return self.client.post(
+            f'/api/livestock/farms/{self.farm.pk}/import/cows/',
+            {'file': SimpleUploadedFile('cows.csv', content, content_type='text/csv'), 'dry_run': dry_run},
+            format='multipart'
+        )
+    
+    def test_mother_tags_resolve_within_the_file(self):
+        # The calf is listed before its mother
+        response = self.upload(
+            'C1,Calf,friesian,2024-03-01,0,M1,Bull X\n'
+            'M1,Mother,friesian,2020-01-01,50000,,Bull X\n'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 2)
+        calf = Cow.objects.get(tag_number='C1')
+        self.assertEqual(calf.mother.tag_number, 'M1')
+        self.assertEqual(calf.inbreeding_coefficient, Decimal('0.25'))
+        self.assertEqual(calf.stage_history.count(), 1)
+    
+    def test_duplicate_tags_reject_the_whole_file(self):
+        Cow.objects.create(
+            farm=self.farm, name='Old', tag_number='E1', breed='friesian',
+            date_acquired='2020-01-01', acquisition_cost=0
+        )
+        response = self.upload(
+            'N1,New,friesian,2020-01-01,0,,\n'
+            'N1,Again,friesian,2020-01-01,0,,\n'
+            'E1,Existing,friesian,2020-01-01,0,,\n'
+            'N2,Orphan,friesian,2020-01-01,0,X9,\n'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [(error['row'], list(error['errors'])) for error in response.data['errors']],
+            [(3, ['tag_number']), (4, ['tag_number']), (5, ['mother_tag'])]
+        )
+        self.assertEqual(response.data['created'], 0)
+        self.assertFalse(Cow.objects.filter(tag_number='N1').exists())
+    
+    def test_dry_run_writes_nothing(self):
+        response = self.upload('D1,Dry,friesian,2020-01-01,0,,\n', dry_run=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['valid'], response.data['created']), (1, 0))
+        self.assertFalse(Cow.objects.filter(tag_number='D1').exists())
+    
+    def test_unreadable_files_are_reported_not_raised(self):
+        latin1 = (self.HEADER + 'L1,Ren\xe9e,friesian,2020-01-01,0,,\n').encode('latin-1')
+        oversized = (self.HEADER + f"L2,{'x' * (csv.field_size_limit() + 1)},friesian,2020-01-01,0,,\n").encode()
+        for content in (latin1, oversized):
+            response = self.upload(content)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual([error['row'] for error in response.data['errors']], [0])
+            self.assertIn('file', response.data['errors'][0]['errors'])
+        self.assertFalse(Cow.objects.exists())
@@ -1,7 +1,17 @@
 from django.urls import path
+from . import views
 
 app_name = 'livestock'
 
 urlpatterns = [
-    # URLs will be added later
+    path('herd/', views.HerdListView.as_view(), name='herd-list'),
+    path('herd/<int:pk>/', views.HerdDetailView.as_view(), name='herd-detail'),
+    path('cows/<int:pk>/pedigree/', views.CowPedigreeView.as_view(), name='cow-pedigree'),
+    path('cows/<int:pk>/descendants/', views.CowDescendantsView.as_view(), name='cow-descendants'),
+    path('cows/<int:pk>/mating-check/', views.MatingCheckView.as_view(), name='cow-mating-check'),
+    path('cows/<int:pk>/stage-history/', views.CowStageHistoryView.as_view(), name='cow-stage-history'),
+    path('farms/<int:farm_id>/import/<slug:kind>/', views.LivestockImportView.as_view(), name='livestock-import'),
+    path('scan/', views.TagBatchScanView.as_view(), name='tag-scan-batch'),
+    path('scan/<str:tag>/', views.TagScanView.as_view(), name='tag-scan'),
+    path('cows/stage-transitions/', views.CowStageTransitionView.as_view(), name='cow-stage-transitions'),
 ]
@@ -1,3 +1,211 @@
-from django.shortcuts import render
+# apps/livestock/views.py
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from rest_framework import generics, serializers, status
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from apps.authentication.permissions import CanAccessFarm
+from apps.farms.models import Farm
+from .importers import IMPORTERS
+from .models import Cow
+from .serializers import (
+    CowStageHistorySerializer, CowStageTransitionSerializer, HerdCowSerializer,
+    PedigreeEntrySerializer, TagScanBatchSerializer
+)
+from .services import (
+    DEFAULT_PEDIGREE_DEPTH, MAX_PEDIGREE_DEPTH, LifecycleService, PedigreeService,
+    StageTransitionError, TagScanService
+)
 
-# Create your views here.
+class CowObjectMixin:
+    """Farm-checked lookup of a single cow"""
+    
+    permission_classes = [IsAuthenticated, CanAccessFarm]
+    
+    def get_cow(self, pk):
+        cow = get_object_or_404(Cow.objects.select_related('farm'), pk=pk, is_deleted=False)
+        self.check_object_permissions(self.request, cow)
+        return cow
+
+class CowPedigreeMixin(CowObjectMixin):
+    """Shared depth parsing for pedigree endpoints"""
+    
+    def get_depth(self):
+        depth = self.request.query_params.get('depth', DEFAULT_PEDIGREE_DEPTH)
+        try:
+            depth = int(depth)
+        except (TypeError, ValueError):
+            raise serializers.ValidationError({'depth': 'Must be a whole number.'})
+        if not 1 <= depth <= MAX_PEDIGREE_DEPTH:
+            raise serializers.ValidationError(
+                {'depth': f'Must be between 1 and {MAX_PEDIGREE_DEPTH}.'}
+            )
+        return depth
+
+class CowPedigreeView(CowPedigreeMixin, APIView):
+    """Dam line of a cow with sire identities per generation"""
+    
+    def get(self, request, pk):
+        cow = self.get_cow(pk)
+        cow.generation = 0
+        ancestors = PedigreeService.get_ancestors(cow, self.get_depth())
+        return Response({
+            'cow': PedigreeEntrySerializer(cow).data,
+            'ancestors': PedigreeEntrySerializer(ancestors, many=True).data,
+        })
+
+class CowDescendantsView(CowPedigreeMixin, APIView):
+    """All descendants of a cow down to the requested depth"""
+    
+    def get(self, request, pk):
+        cow = self.get_cow(pk)
+        cow.generation = 0
+        descendants = PedigreeService.get_descendants(cow, self.get_depth())
+        return Response({
+            'cow': PedigreeEntrySerializer(cow).data,
+            'total_descendants': len(descendants),
+            'descendants': PedigreeEntrySerializer(descendants, many=True).data,
+        })
+
+class MatingCheckView(CowPedigreeMixin, APIView):
+    """Expected inbreeding of a planned mating between a cow and a sire"""
+    
+    def get(self, request, pk):
+        cow = self.get_cow(pk)
+        sire = request.query_params.get('sire', '').strip()
+        if not sire:
+            raise serializers.ValidationError({'sire': 'This parameter is required.'})
+        return Response(PedigreeService.check_mating(cow, sire))
+
+
+class CowStageHistoryView(CowObjectMixin, APIView):
+    """Stage history of a cow, optionally with her stage on a given date"""
+    
+    def get(self, request, pk):
+        cow = self.get_cow(pk)
+        history = cow.stage_history.filter(is_deleted=False).select_related('changed_by')
+        data = {
+            'cow': cow.id,
+            'current_stage': cow.current_stage,
+            'history': CowStageHistorySerializer(history, many=True).data,
+        }
+        as_of = request.query_params.get('as_of')
+        if as_of:
+            as_of = serializers.DateField().run_validation(as_of)
+            data['as_of'] = as_of
+            data['stage_on_date'] = LifecycleService.stage_on(cow.id, as_of)
+        return Response(data)
+
+class CowStageTransitionView(APIView):
+    """Move one or many cows to a new lifecycle stage"""
+    
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        serializer = CowStageTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        cow_ids = set(data['cow_ids'])
+        
+        cows = Cow.objects.filter(pk__in=cow_ids, is_deleted=False).for_user(request.user)
+        missing = cow_ids - set(cows.values_list('id', flat=True))
+        if missing:
+            raise serializers.ValidationError(
+                {'cow_ids': {cow_id: 'Cow not found.' for cow_id in sorted(missing)}}
+            )
+        
+        on_date = data.get('date')
+        try:
+            count = LifecycleService.transition(
+                cow_ids, data['to_stage'], on_date, request.user, data.get('notes', '')
+            )
+        except StageTransitionError as exc:
+            raise serializers.ValidationError({'cow_ids': exc.errors})
+        return Response({
+            'to_stage': data['to_stage'],
+            'date': on_date or timezone.now().date(),
+            'transitioned': count,
+        }, status=status.HTTP_200_OK)
+
+
+class HerdQuerysetMixin:
+    """Cows with herd KPIs annotated in a single query; farm scoping is left to the filter backend"""
+    
+    serializer_class = HerdCowSerializer
+    permission_classes = [IsAuthenticated, CanAccessFarm]
+    
+    def get_queryset(self):
+        cows = Cow.objects.active().select_related('farm', 'mother').with_herd_stats()
+        if self.request.user.is_admin and self.request.query_params.get('farm'):
+            try:
+                cows = cows.filter(farm_id=int(self.request.query_params['farm']))
+            except ValueError:
+                raise serializers.ValidationError({'farm': 'Must be a whole number.'})
+        stage = self.request.query_params.get('stage')
+        if stage:
+            cows = cows.filter(current_stage=stage)
+        return cows.order_by('farm__name', 'name')
+
+class HerdListView(HerdQuerysetMixin, generics.ListAPIView):
+    """Paginated herd list with calf count, recent yield and breeding dates"""
+
+class HerdDetailView(HerdQuerysetMixin, generics.RetrieveAPIView):
+    """Single cow with the same herd KPIs as the list"""
+
+
+class TagScanMixin:
+    """Scans are limited to the user's farm; admins see every farm"""
+    
+    permission_classes = [IsAuthenticated]
+    
+    def get_scan_farm_id(self):
+        user = self.request.user
+        return None if user.is_admin else user.assigned_farm_id
+
+class TagScanView(TagScanMixin, APIView):
+    """Resolve one scanned ear tag or RFID to a cow"""
+    
+    def get(self, request, tag):
+        cow = TagScanService.lookup(tag, self.get_scan_farm_id())
+        if cow is None:
+            return Response({'detail': 'No cow with this tag.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(cow)
+
+class TagBatchScanView(TagScanMixin, APIView):
+    """Resolve many scanned tags in one request"""
+    
+    def post(self, request):
+        serializer = TagScanBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        tags = [TagScanService.normalize_tag(tag) for tag in serializer.validated_data['tags']]
+        results = TagScanService.lookup_many(tags, self.get_scan_farm_id())
+        return Response({
+            'results': results,
+            'not_found': [tag for tag in dict.fromkeys(tags) if tag not in results],
+        })
+
+
+class LivestockImportView(APIView):
+    """Upload a CSV of cows or chicken batches for a farm; returns a per-row report"""
+    
+    permission_classes = [IsAuthenticated, CanAccessFarm]
+    parser_classes = [MultiPartParser, FormParser]
+    
+    def post(self, request, farm_id, kind):
+        importer_class = IMPORTERS.get(kind)
+        if importer_class is None:
+            return Response({'detail': 'Unknown import type.'}, status=status.HTTP_404_NOT_FOUND)
+        farm = get_object_or_404(Farm, pk=farm_id, is_deleted=False)
+        self.check_object_permissions(request, farm)
+        
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise serializers.ValidationError({'file': 'Upload a CSV file.'})
+        dry_run = serializers.BooleanField().to_internal_value(request.data.get('dry_run', False))
+        
+        report = importer_class(farm).run(upload, dry_run=dry_run)
+        if report['error_count']:
+            return Response(report, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_200_OK if dry_run else status.HTTP_201_CREATED)
@@ -3,32 +3,44 @@ import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from apps.common.dates import parse_or_none
+from .services import PUSH_BATCH_LIMIT, NotificationPushService, UnreadCounterService
 
 User = get_user_model()
 
+MARK_READ_LIMIT = 500
+REPLAY_PAGE_SIZE = 50
+REPLAY_MAX_PAGES = 10
+
 class NotificationConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.user = self.scope["user"]
         if self.user.is_anonymous:
             await self.close()
         else:
-            self.notification_group_name = f"notifications_{self.user.id}"
+            self.notification_group_name = NotificationPushService.group_name(self.user.id)
             
-            # Join notification group
-            await self.channel_layer.group_add(
+            # Join the personal group plus the role and farm groups used for fan-out alerts
+            self.notification_groups = [
                 self.notification_group_name,
-                self.channel_name
-            )
+                NotificationPushService.role_group_name(self.user.role),
+            ]
+            if self.user.assigned_farm_id:
+                self.notification_groups.append(
+                    NotificationPushService.farm_group_name(self.user.assigned_farm_id)
+                )
+            for group in self.notification_groups:
+                await self.channel_layer.group_add(group, self.channel_name)
             
             await self.accept()
+            await self.unread_count({'count': await self.get_unread_count()})
     
     async def disconnect(self, close_code):
-        # Leave notification group
-        if hasattr(self, 'notification_group_name'):
-            await self.channel_layer.group_discard(
-                self.notification_group_name,
-                self.channel_name
-            )
+        # Leave notification groups
+        for group in getattr(self, 'notification_groups', []):
+            await self.channel_layer.group_discard(group, self.channel_name)
     
     async def receive(self, text_data):
         # Handle incoming messages (like marking notifications as read)
@@ -38,26 +50,137 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             
             if message_type == 'mark_read':
                 notification_id = text_data_json.get('notification_id')
-                await self.mark_notification_read(notification_id)
+                await self.send_marked(await self.mark_notifications_read([notification_id]))
+            elif message_type == 'mark_read_many':
+                notification_ids = text_data_json.get('notification_ids') or []
+                await self.send_marked(await self.mark_notifications_read(notification_ids))
+            elif message_type == 'mark_all_read':
+                await self.send_marked(await self.mark_all_notifications_read())
+            elif message_type == 'resume':
+                await self.resume(text_data_json.get('last_id'), text_data_json.get('since'))
         except json.JSONDecodeError:
             pass
     
+    async def send_error(self, message):
+        await self.send(text_data=json.dumps({'type': 'error', 'message': message}))
+    
+    async def send_marked(self, count):
+        if count is None:
+            await self.send_error('notification_ids must be a list of ids.')
+        else:
+            await self.send(text_data=json.dumps({'type': 'marked_read', 'count': count}))
+    
+    async def resume(self, last_id, since):
+        """Replay notifications created after the client's last seen one, a page per frame"""
+        cursor = await self.replay_cursor(last_id, since)
+        if cursor is None:
+            await self.send_error('resume needs a known last_id or an ISO 8601 since timestamp.')
+            return
+        
+        for _ in range(REPLAY_MAX_PAGES):
+            page, cursor, has_more = await self.replay_page(*cursor)
+            await self.send(text_data=json.dumps({
+                'type': 'replay',
+                'notifications': page,
+                'has_more': has_more,
+            }))
+            if not has_more:
+                return
+        # Anything older than the replay budget is left for a REST refetch
+        await self.send(text_data=json.dumps({'type': 'replay_truncated'}))
+    
+    async def unread_count(self, event):
+        # Badge count after notifications are created, read or deleted
+        await self.send(text_data=json.dumps({
+            'type': 'unread_count',
+            'count': event['count']
+        }))
+    
+    def own_notification(self, notification):
+        """Fan-out payloads list an id per recipient; keep ours, or None if we are not one"""
+        recipients = notification.get('recipients')
+        if recipients is None:
+            return notification
+        notification_id = recipients.get(str(self.user.id))
+        if notification_id is None:
+            return None
+        notification = {key: value for key, value in notification.items() if key != 'recipients'}
+        notification['id'] = notification_id
+        return notification
+    
     async def notification_message(self, event):
         # Send notification to WebSocket
+        notification = self.own_notification(event['notification'])
+        if notification is None:
+            return
         await self.send(text_data=json.dumps({
             'type': 'notification',
-            'notification': event['notification']
+            'notification': notification
+        }))
+    
+    async def notification_batch(self, event):
+        # Several notifications coalesced into one frame, counted per recipient
+        notifications = [self.own_notification(item) for item in event['notifications']]
+        mine = [item for item in notifications if item is not None]
+        if not mine:
+            return
+        counts = event['counts']
+        await self.send(text_data=json.dumps({
+            'type': 'notifications',
+            'count': counts.get('*', 0) + counts.get(str(self.user.id), 0),
+            'notifications': mine[-PUSH_BATCH_LIMIT:]
         }))
     
     @database_sync_to_async
-    def mark_notification_read(self, notification_id):
+    def get_unread_count(self):
+        return UnreadCounterService.get(self.user.id)
+    
+    @database_sync_to_async
+    def mark_notifications_read(self, notification_ids):
+        from .models import Notification
+        
+        if not isinstance(notification_ids, list) or len(notification_ids) > MARK_READ_LIMIT:
+            return None
         try:
-            from .models import Notification
-            notification = Notification.objects.get(
-                id=notification_id,
-                recipient=self.user
-            )
-            notification.mark_as_read()
-        except Notification.DoesNotExist:
-            pass
+            notification_ids = [int(notification_id) for notification_id in notification_ids]
+        except (TypeError, ValueError):
+            return None
+        return Notification.objects.for_recipient(self.user).filter(id__in=notification_ids).mark_read()
+    
+    @database_sync_to_async
+    def mark_all_notifications_read(self):
+        from .models import Notification
+        return Notification.objects.for_recipient(self.user).mark_read()
+    
+    @database_sync_to_async
+    def replay_cursor(self, last_id, since):
+        """(created_at, id) of the last notification the client saw"""
+        from .models import Notification
+        
+        if last_id is not None:
+            try:
+                return Notification.objects.filter(
+                    id=int(last_id), recipient=self.user
+                ).values_list('created_at', 'id').get()
+            except (TypeError, ValueError, Notification.DoesNotExist):
+                pass
+        created_at = parse_or_none(since, parse_datetime)
+        if created_at is None:
+            return None
+        if timezone.is_naive(created_at):
+            created_at = timezone.make_aware(created_at)
+        return created_at, None
+    
+    @database_sync_to_async
+    def replay_page(self, created_at, last_id):
+        from .models import Notification
+        
+        notifications = list(
+            Notification.objects.for_recipient(self.user).after(created_at, last_id)[:REPLAY_PAGE_SIZE + 1]
+        )
+        page = notifications[:REPLAY_PAGE_SIZE]
+        if page:
+            created_at, last_id = page[-1].created_at, page[-1].pk
+        payloads = [NotificationPushService.payload(notification) for notification in page]
+        return payloads, (created_at, last_id), len(notifications) > REPLAY_PAGE_SIZE
 
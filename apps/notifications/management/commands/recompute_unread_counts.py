@@ -0,0 +1,20 @@
+# apps/notifications/management/commands/recompute_unread_counts.py
+from django.core.management.base import BaseCommand
+from apps.authentication.models import User
+from apps.notifications.services import UnreadCounterService
+
+RECOMPUTE_BATCH_SIZE = 1000
+
+class Command(BaseCommand):
+    help = 'Rebuild the cached unread notification counter for every active user'
+    
+    def handle(self, *args, **options):
+        user_ids = list(User.objects.filter(is_active=True).values_list('id', flat=True))
+        users = unread = 0
+        for start in range(0, len(user_ids), RECOMPUTE_BATCH_SIZE):
+            counts = UnreadCounterService.recompute(user_ids[start:start + RECOMPUTE_BATCH_SIZE])
+            users += len(counts)
+            unread += sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Recomputed unread counts for {users} users ({unread} unread).'
+        ))
@@ -0,0 +1,76 @@
+# apps/notifications/managers.py
+from collections import Counter, defaultdict
+from django.db import models, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+class NotificationQuerySet(models.QuerySet):
+    """Queryset helpers for notifications"""
+    
+    def active(self):
+        return self.filter(is_deleted=False)
+    
+    def for_recipient(self, user):
+        return self.active().filter(recipient=user)
+    
+    def unread(self):
+        return self.filter(is_read=False)
+    
+    def mark_read(self):
+        """Mark every unread notification in the queryset read with a single UPDATE.
+        
+        The rows are locked first so the unread counters drop by exactly the
+        number each recipient lost.
+        """
+        from .services import UnreadCounterService
+        
+        now = timezone.now()
+        with transaction.atomic():
+            rows = list(self.unread().order_by().select_for_update().values_list('id', 'recipient_id'))
+            if not rows:
+                return 0
+            updated = self.model.objects.filter(id__in=[row_id for row_id, _ in rows]).update(
+                is_read=True, read_at=now, updated_at=now
+            )
+            lost = Counter(recipient_id for _, recipient_id in rows)
+            UnreadCounterService.adjust({recipient_id: -count for recipient_id, count in lost.items()})
+        return updated
+    
+    def insert_deduped(self, notifications, group_for=None, batch_size=None):
+        """Insert notifications together, skip dedupe_key conflicts, push them and count them unread.
+        
+        Ignored conflicts come back without ids, so the rows inserted here are
+        reloaded. With group_for (notification -> farm/role group) one payload
+        goes to each group; otherwise each recipient is pushed on their own.
+        Returns the notifications inserted.
+        """
+        from .services import NotificationPushService, UnreadCounterService
+        
+        if not notifications:
+            return []
+        deduped = all(notification.dedupe_key for notification in notifications)
+        started = timezone.now()
+        inserted = self.bulk_create(notifications, batch_size=batch_size, ignore_conflicts=deduped)
+        if deduped:
+            inserted = list(self.model.objects.filter(
+                recipient_id__in={notification.recipient_id for notification in notifications},
+                dedupe_key__in={notification.dedupe_key for notification in notifications},
+                created_at__gte=started
+            ))
+        
+        if group_for is None:
+            NotificationPushService.push(inserted)
+        else:
+            by_group = defaultdict(list)
+            for notification in inserted:
+                by_group[group_for(notification)].append(notification)
+            NotificationPushService.push_to_groups(by_group)
+        UnreadCounterService.record_created(inserted)
+        return inserted
+    
+    def after(self, created_at, last_id=None):
+        """Notifications newer than a (created_at, id) cursor, oldest first, for keyset paging"""
+        newer = Q(created_at__gt=created_at)
+        if last_id is not None:
+            newer |= Q(created_at=created_at, id__gt=last_id)
+        return self.filter(newer).order_by('created_at', 'id')
@@ -1,6 +1,8 @@
 # apps/notifications/models.py
 from django.db import models
+from django.utils import timezone
 from apps.common.models import BaseModel
+from .managers import NotificationQuerySet
 
 class Notification(BaseModel):
     """System notifications for users"""
@@ -11,6 +13,7 @@ class Notification(BaseModel):
         ('heat_detected', 'Heat Detected'),
         ('vaccination_due', 'Vaccination Due'),
         ('treatment_followup', 'Treatment Follow-up'),
+        ('disease_outbreak', 'Disease Outbreak'),
         ('report_generated', 'Report Generated'),
         ('system', 'System Notification'),
     ]
@@ -55,17 +58,113 @@ class Notification(BaseModel):
         blank=True
     )
     
+    # Identifies the event a scheduled alert was raised for, so reruns skip it
+    dedupe_key = models.CharField(max_length=100, null=True, blank=True)
+    
+    # Repeats of an identical alert folded into this row by retention compaction
+    occurrence_count = models.PositiveIntegerField(default=1)
+    
+    # Owned by the recipient; the farm reference is informational only
+    farm_scope_lookup = None
+    
+    objects = NotificationQuerySet.as_manager()
+    
     class Meta:
         db_table = 'notifications'
         verbose_name = 'Notification'
         verbose_name_plural = 'Notifications'
         ordering = ['-created_at']
+        indexes = [
+            # Replay after a reconnect pages through this per recipient
+            models.Index(fields=['recipient', 'created_at', 'id'], name='notif_recipient_created_idx'),
+            # Unread counts only ever touch the small unread slice of the table
+            models.Index(
+                fields=['recipient'],
+                condition=models.Q(is_read=False, is_deleted=False),
+                name='notif_unread_idx'
+            ),
+            # Retention finds old read rows without scanning the inbox
+            models.Index(fields=['read_at'], condition=models.Q(is_read=True), name='notif_read_at_idx'),
+            # ...and old soft-deleted rows the same way
+            models.Index(fields=['deleted_at'], condition=models.Q(is_deleted=True), name='notif_deleted_at_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipient', 'dedupe_key'],
+                name='unique_notification_dedupe_key'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.recipient.get_full_name()} - {self.title}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'is_read' in field_names and 'is_deleted' in field_names:
+            instance._loaded_unread = instance.is_unread
+        return instance
+    
+    @property
+    def is_unread(self):
+        return not self.is_read and not self.is_deleted
+    
+    def save(self, *args, **kwargs):
+        from .services import NotificationPushService, UnreadCounterService
+        
+        created = self._state.adding
+        super().save(*args, **kwargs)
+        if created:
+            NotificationPushService.push([self])
+        
+        # Creating, reading, soft-deleting and restoring all move the unread count
+        was_unread = False if created else getattr(self, '_loaded_unread', None)
+        if was_unread is not None and was_unread != self.is_unread:
+            UnreadCounterService.adjust({self.recipient_id: 1 if self.is_unread else -1})
+        self._loaded_unread = self.is_unread
+    
+    def delete(self, *args, **kwargs):
+        from .services import UnreadCounterService
+        
+        if getattr(self, '_loaded_unread', False):
+            UnreadCounterService.adjust({self.recipient_id: -1})
+        return super().delete(*args, **kwargs)
+    
     def mark_as_read(self):
         if not self.is_read:
             self.is_read = True
             self.read_at = timezone.now()
-            self.save()
\ No newline at end of file
+            self.save()
+
+class NotificationArchive(models.Model):
+    """Read notifications moved out of the live table by retention"""
+    
+    original_id = models.BigIntegerField(unique=True)
+    recipient = models.ForeignKey(
+        'authentication.User',
+        on_delete=models.CASCADE,
+        related_name='archived_notifications'
+    )
+    title = models.CharField(max_length=100)
+    message = models.TextField()
+    notification_type = models.CharField(max_length=20)
+    priority = models.CharField(max_length=10)
+    farm_id = models.BigIntegerField(null=True, blank=True)
+    cow_id = models.BigIntegerField(null=True, blank=True)
+    dedupe_key = models.CharField(max_length=100, null=True, blank=True)
+    occurrence_count = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField()
+    read_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'notifications_archive'
+        verbose_name = 'Archived Notification'
+        verbose_name_plural = 'Archived Notifications'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', 'created_at'], name='notif_archive_recipient_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.recipient_id} - {self.title}"
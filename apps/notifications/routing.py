@@ -2,4 +2,6 @@
 from django.urls import re_path
 from . import consumers
 
-websocket_urlpat
\ No newline at end of file
+websocket_urlpatterns = [
+    re_path(r'ws/notifications/$', consumers.NotificationConsumer.as_asgi()),
+]
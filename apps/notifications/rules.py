@@ -0,0 +1,168 @@
+# apps/notifications/rules.py
+from datetime import timedelta
+from django.db.models import F
+
+# How far ahead calvings are announced and how long a heat sighting stays worth announcing
+CALVING_LEAD_DAYS = 7
+CALVING_LOOKBACK_DAYS = 14
+HEAT_LOOKBACK_DAYS = 1
+
+def when(due_date, on_date, due='due'):
+    """'was due …', 'is due today' or 'is due …' relative to the run date"""
+    if due_date < on_date:
+        return f"was {due} {due_date}"
+    return f"is {due} today" if due_date == on_date else f"is {due} {due_date}"
+
+class AlertRule:
+    """A scheduled alert: one set-based scan across every farm plus templates for each match.
+    
+    queryset() returns values() rows carrying id, farm_id and optionally cow_id; the title
+    and message templates are formatted with those rows plus context().
+    """
+    
+    notification_type = None
+    title = ''
+    message = ''
+    # Admins always hear about a match; farmers only when it is on their farm
+    notify_farmers = True
+    
+    def queryset(self, on_date):
+        raise NotImplementedError
+    
+    def context(self, item, on_date):
+        return {}
+    
+    def priority(self, item, on_date):
+        return 'medium'
+    
+    def dedupe_key(self, item):
+        raise NotImplementedError
+    
+    def render(self, item, on_date):
+        """Title, message and priority for one matched row"""
+        values = dict(item, **self.context(item, on_date))
+        return (
+            self.title.format(**values)[:100],
+            self.message.format(**values),
+            self.priority(item, on_date),
+        )
+
+class LowStockRule(AlertRule):
+    notification_type = 'low_stock'
+    title = 'Low stock: {feed_name}'
+    message = '{feed_name} is down to {current_stock} (minimum {minimum_stock_level}).'
+    
+    def queryset(self, on_date):
+        from apps.feeds.models import FeedInventory
+        
+        return (
+            FeedInventory.objects
+            .filter(current_stock__lte=F('minimum_stock_level'), is_deleted=False)
+            .annotate(feed_name=F('feed_type__name'))
+            .values('id', 'farm_id', 'feed_name', 'current_stock',
+                    'minimum_stock_level', 'last_updated')
+        )
+    
+    def priority(self, item, on_date):
+        return 'high' if not item['current_stock'] else 'medium'
+    
+    def dedupe_key(self, item):
+        # A restock or a further drop moves last_updated, so the next shortfall alerts again
+        return f"low_stock:{item['id']}:{item['last_updated']:%Y-%m-%dT%H:%M}"
+
+class CalvingDueRule(AlertRule):
+    notification_type = 'calving_due'
+    title = 'Calving due: {cow_name}'
+    message = '{cow_name} {due}.'
+    
+    def queryset(self, on_date):
+        from apps.breeding.models import BreedingRecord
+        
+        return (
+            BreedingRecord.objects.active()
+            .due_between(on_date - timedelta(days=CALVING_LOOKBACK_DAYS),
+                         on_date + timedelta(days=CALVING_LEAD_DAYS))
+            .annotate(farm_id=F('cow__farm_id'), cow_name=F('cow__name'))
+            .values('id', 'farm_id', 'cow_id', 'cow_name', 'expected_calving_date')
+        )
+    
+    def context(self, item, on_date):
+        return {'due': when(item['expected_calving_date'], on_date, due='due to calve')}
+    
+    def priority(self, item, on_date):
+        return 'high' if item['expected_calving_date'] <= on_date else 'medium'
+    
+    def dedupe_key(self, item):
+        return f"calving_due:{item['id']}:{item['expected_calving_date']}"
+
+class HeatDetectedRule(AlertRule):
+    notification_type = 'heat_detected'
+    title = 'Heat detected: {cow_name}'
+    message = '{cow_name} showed {heat_intensity} heat on {heat_date} and has not been bred this cycle.'
+    
+    def queryset(self, on_date):
+        from apps.breeding.models import HeatDetection
+        
+        return (
+            HeatDetection.objects
+            .filter(
+                heat_date__range=[on_date - timedelta(days=HEAT_LOOKBACK_DAYS), on_date],
+                bred_this_cycle=False,
+                is_deleted=False,
+                cow__is_deleted=False
+            )
+            .annotate(farm_id=F('cow__farm_id'), cow_name=F('cow__name'))
+            .values('id', 'farm_id', 'cow_id', 'cow_name', 'heat_intensity', 'heat_date')
+        )
+    
+    def priority(self, item, on_date):
+        return 'high' if item['heat_intensity'] == 'strong' else 'medium'
+    
+    def dedupe_key(self, item):
+        return f"heat_detected:{item['id']}"
+
+class VaccinationDueRule(AlertRule):
+    notification_type = 'vaccination_due'
+    title = 'Vaccination due: {animal}'
+    message = '{vaccine_name} for {animal} {due}.'
+    
+    def queryset(self, on_date):
+        from apps.health.services import DueQueueService
+        return DueQueueService.due_vaccinations(on_date)
+    
+    def context(self, item, on_date):
+        return {'animal': item['animal_display_name'] or 'Unknown', 'due': when(item['due_date'], on_date)}
+    
+    def priority(self, item, on_date):
+        return 'high' if item['due_date'] < on_date else 'medium'
+    
+    def dedupe_key(self, item):
+        return f"vaccination_due:{item['id']}:{item['due_date']}"
+
+class TreatmentFollowUpRule(AlertRule):
+    notification_type = 'treatment_followup'
+    title = 'Treatment follow-up: {animal}'
+    message = '{animal} ({disease_name}) follow-up {due}.'
+    # Health records are admin-only, so follow-ups go to admins
+    notify_farmers = False
+    
+    def queryset(self, on_date):
+        from apps.health.services import DueQueueService
+        return DueQueueService.due_follow_ups(on_date)
+    
+    def context(self, item, on_date):
+        return {'animal': item['animal_display_name'] or 'Unknown', 'due': when(item['follow_up_date'], on_date)}
+    
+    def priority(self, item, on_date):
+        return 'high' if item['follow_up_date'] < on_date else 'medium'
+    
+    def dedupe_key(self, item):
+        return f"treatment_followup:{item['id']}:{item['follow_up_date']}"
+
+ALERT_RULES = [
+    LowStockRule(),
+    CalvingDueRule(),
+    HeatDetectedRule(),
+    TreatmentFollowUpRule(),
+    VaccinationDueRule(),
+]
@@ -0,0 +1,472 @@
+# apps/notifications/services.py
+import logging
+import threading
+from datetime import timedelta
+from collections import Counter, defaultdict
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Frames carry at most this many notifications; clients fetch the rest over REST
+PUSH_BATCH_LIMIT = 20
+
+# Counters expire so any drift from a lost update heals on its own
+UNREAD_COUNT_TIMEOUT = 60 * 60
+
+# Retention: read rows older than this are archived, in short transactions of a batch each
+RETENTION_DAYS = 90
+RETENTION_BATCH_SIZE = 1000
+RETENTION_MAX_BATCHES = 200
+COMPACT_BATCH_SIZE = 100
+COMPACTABLE_TYPES = ['system']
+
+# Alert rules insert their notifications this many rows at a time
+ALERT_RULE_BATCH_SIZE = 1000
+
+class NotificationPushService:
+    """Real-time delivery of new notifications to each recipient's WebSocket group.
+    
+    Pushes are queued when the creating transaction commits and held for
+    NOTIFICATION_PUSH_WINDOW seconds, so a burst for one user goes out as a
+    single frame. Delivery is best effort: the rows are already saved, so
+    anything lost with a stopping process shows up when the client next loads.
+    """
+    
+    _pending = defaultdict(list)
+    _pending_counts = {}
+    _lock = threading.Lock()
+    _timer = None
+    
+    @staticmethod
+    def group_name(user_id):
+        return f"notifications_{user_id}"
+    
+    @staticmethod
+    def farm_group_name(farm_id):
+        return f"notifications_farm_{farm_id}"
+    
+    @staticmethod
+    def role_group_name(role):
+        return f"notifications_role_{role}"
+    
+    @staticmethod
+    def payload(notification):
+        return {
+            'id': notification.pk,
+            'title': notification.title,
+            'message': notification.message,
+            'notification_type': notification.notification_type,
+            'priority': notification.priority,
+            'is_read': notification.is_read,
+            'occurrence_count': notification.occurrence_count,
+            'farm': notification.farm_id,
+            'cow': notification.cow_id,
+            'created_at': notification.created_at.isoformat() if notification.created_at else None,
+        }
+    
+    @staticmethod
+    def push(notifications):
+        """Queue saved notifications for delivery once the current transaction commits"""
+        payloads = [
+            (
+                NotificationPushService.group_name(notification.recipient_id),
+                NotificationPushService.payload(notification)
+            )
+            for notification in notifications
+        ]
+        if payloads:
+            transaction.on_commit(lambda: NotificationPushService._enqueue(payloads))
+    
+    @staticmethod
+    def push_to_groups(notifications_by_group):
+        """Queue one payload per farm/role group for notifications that share their content.
+        
+        The payload maps each recipient to their own notification id, and
+        consumers drop payloads that do not list their user.
+        """
+        payloads = []
+        for group, notifications in notifications_by_group.items():
+            if notifications:
+                payload = NotificationPushService.payload(notifications[0])
+                payload['id'] = None
+                payload['recipients'] = {
+                    str(notification.recipient_id): notification.pk for notification in notifications
+                }
+                payloads.append((group, payload))
+        if payloads:
+            transaction.on_commit(lambda: NotificationPushService._enqueue(payloads))
+    
+    @staticmethod
+    def push_unread_counts(counts):
+        """Queue {user_id: unread count}; only the latest count per user is sent"""
+        if counts:
+            NotificationPushService._enqueue([], counts)
+    
+    @staticmethod
+    def _enqueue(payloads, counts=None):
+        window = getattr(settings, 'NOTIFICATION_PUSH_WINDOW', 0)
+        with NotificationPushService._lock:
+            for group, payload in payloads:
+                NotificationPushService._pending[group].append(payload)
+            NotificationPushService._pending_counts.update(counts or {})
+            if window > 0 and NotificationPushService._timer is None:
+                timer = threading.Timer(window, NotificationPushService.flush)
+                timer.daemon = True
+                NotificationPushService._timer = timer
+                timer.start()
+        if window <= 0:
+            NotificationPushService.flush()
+    
+    @staticmethod
+    def frame(payloads):
+        """One channel-layer event for everything buffered for a group.
+        
+        Batches count payloads per recipient ('*' for payloads meant for the
+        whole group) and keep the newest PUSH_BATCH_LIMIT of each recipient,
+        so truncation never hides one user's alerts behind another's.
+        """
+        if len(payloads) == 1:
+            return {'type': 'notification.message', 'notification': payloads[0]}
+        counts, kept = Counter(), []
+        for payload in reversed(payloads):
+            recipients = list(payload.get('recipients', ['*']))
+            counts.update(recipients)
+            if any(counts[recipient] <= PUSH_BATCH_LIMIT for recipient in recipients):
+                kept.append(payload)
+        return {
+            'type': 'notification.batch',
+            'counts': dict(counts),
+            'notifications': kept[::-1],
+        }
+    
+    @staticmethod
+    def flush():
+        """Send one frame per group with pending notifications or counts; returns the number of frames"""
+        with NotificationPushService._lock:
+            pending = NotificationPushService._pending
+            counts = NotificationPushService._pending_counts
+            timer = NotificationPushService._timer
+            NotificationPushService._pending = defaultdict(list)
+            NotificationPushService._pending_counts = {}
+            NotificationPushService._timer = None
+        if timer is not None and timer is not threading.current_thread():
+            timer.cancel()
+        
+        frames = [(group, NotificationPushService.frame(payloads)) for group, payloads in pending.items()]
+        frames.extend(
+            (NotificationPushService.group_name(user_id), {'type': 'unread.count', 'count': count})
+            for user_id, count in counts.items()
+        )
+        channel_layer = get_channel_layer()
+        if not frames or channel_layer is None:
+            return 0
+        
+        async def send_all():
+            for group, frame in frames:
+                await channel_layer.group_send(group, frame)
+        try:
+            async_to_sync(send_all)()
+        except Exception:
+            logger.exception('Pushing %s notification frames failed', len(frames))
+            return 0
+        return len(frames)
+
+class UnreadCounterService:
+    """Per-user unread notification counts kept in the shared cache.
+    
+    Counts change by exact deltas once the writing transaction commits. A
+    missing counter is left alone and rebuilt from the partial unread index
+    on next read; rebuilding it mid-commit would count rows whose deltas
+    are still queued. Connected clients always hold a warm counter, since
+    connecting reads it.
+    """
+    
+    @staticmethod
+    def _key(user_id):
+        return f"notifications:unread:{user_id}"
+    
+    @staticmethod
+    def count_from_db(user_ids):
+        from .models import Notification
+        
+        counts = dict.fromkeys(user_ids, 0)
+        counts.update(
+            Notification.objects.active().unread().filter(recipient_id__in=user_ids)
+            .order_by().values('recipient_id').annotate(unread=Count('id'))
+            .values_list('recipient_id', 'unread')
+        )
+        return counts
+    
+    @staticmethod
+    def get(user_id):
+        key = UnreadCounterService._key(user_id)
+        count = cache.get(key)
+        if count is None:
+            count = UnreadCounterService.count_from_db([user_id])[user_id]
+            cache.add(key, count, UNREAD_COUNT_TIMEOUT)
+        return count
+    
+    @staticmethod
+    def recompute(user_ids):
+        """Reset counters from the database; returns {user_id: count}"""
+        counts = UnreadCounterService.count_from_db(user_ids)
+        cache.set_many(
+            {UnreadCounterService._key(user_id): count for user_id, count in counts.items()},
+            UNREAD_COUNT_TIMEOUT
+        )
+        return counts
+    
+    @staticmethod
+    def adjust(deltas):
+        """Apply {user_id: change} after commit and push the new counts"""
+        deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+        if deltas:
+            transaction.on_commit(lambda: UnreadCounterService._apply(deltas))
+    
+    @staticmethod
+    def _apply(deltas):
+        counts = {}
+        for user_id, delta in deltas.items():
+            key = UnreadCounterService._key(user_id)
+            try:
+                count = cache.incr(key, delta)
+            except ValueError:
+                continue
+            if count < 0:
+                cache.delete(key)
+            else:
+                counts[user_id] = count
+        NotificationPushService.push_unread_counts(counts)
+    
+    @staticmethod
+    def record_created(notifications):
+        UnreadCounterService.adjust(
+            Counter(notification.recipient_id for notification in notifications if not notification.is_read)
+        )
+
+class NotificationFanoutService:
+    """One alert delivered to every farmer on a farm and every user in the given roles"""
+    
+    @staticmethod
+    def fan_out(title, message, notification_type, farm=None, roles=('admin',),
+                priority='medium', cow=None, dedupe_key=None):
+        """Resolve recipients in one query, insert their rows together and push once per group.
+        
+        With a dedupe_key, recipients who already have that alert are skipped.
+        Returns the notifications inserted.
+        """
+        from apps.authentication.models import User
+        from .models import Notification
+        
+        farm_id = getattr(farm, 'pk', farm)
+        recipients = list(User.objects.get_audience(farm_id, roles).values_list('id', 'role'))
+        if not recipients:
+            return []
+        
+        # Users in a listed role hear it through the role group, farmers through the farm group
+        roles_by_user = dict(recipients)
+        
+        def group_for(notification):
+            role = roles_by_user[notification.recipient_id]
+            if role in roles:
+                return NotificationPushService.role_group_name(role)
+            return NotificationPushService.farm_group_name(farm_id)
+        
+        return Notification.objects.insert_deduped(
+            [
+                Notification(
+                    recipient_id=user_id,
+                    title=title[:100],
+                    message=message,
+                    notification_type=notification_type,
+                    priority=priority,
+                    farm_id=farm_id,
+                    cow_id=getattr(cow, 'pk', cow),
+                    dedupe_key=dedupe_key
+                )
+                for user_id, _ in recipients
+            ],
+            group_for=group_for
+        )
+
+class NotificationRetentionService:
+    """Keeps the live notifications table small.
+    
+    Each batch runs in its own short transaction and touches at most
+    RETENTION_BATCH_SIZE rows by primary key, so no run holds long locks.
+    A run stops after RETENTION_MAX_BATCHES and the next one carries on.
+    """
+    
+    @staticmethod
+    def compact(types=None, batch_size=COMPACT_BATCH_SIZE, max_batches=RETENTION_MAX_BATCHES):
+        """Fold repeated identical unread alerts into the newest copy with an occurrence count"""
+        from .models import Notification
+        
+        types = types or COMPACTABLE_TYPES
+        folded = 0
+        for _ in range(max_batches):
+            groups = list(
+                Notification.objects.active().unread().filter(notification_type__in=types)
+                .order_by().values('recipient_id', 'notification_type', 'title', 'message')
+                .annotate(keep_id=Max('id'), copies=Count('id'), occurrences=Sum('occurrence_count'))
+                .filter(copies__gt=1)[:batch_size]
+            )
+            if not groups:
+                break
+            deltas = Counter()
+            with transaction.atomic():
+                for group in groups:
+                    Notification.objects.filter(pk=group['keep_id']).update(
+                        occurrence_count=group['occurrences'], updated_at=timezone.now()
+                    )
+                    deleted, _ = Notification.objects.active().unread().filter(
+                        recipient_id=group['recipient_id'],
+                        notification_type=group['notification_type'],
+                        title=group['title'],
+                        message=group['message'],
+                        id__lt=group['keep_id']
+                    ).delete()
+                    deltas[group['recipient_id']] -= deleted
+                UnreadCounterService.adjust(deltas)
+            folded -= sum(deltas.values())
+        return folded
+    
+    @staticmethod
+    def _archive(rows):
+        from .models import NotificationArchive
+        
+        NotificationArchive.objects.bulk_create(
+            [
+                NotificationArchive(
+                    original_id=row.pk,
+                    recipient_id=row.recipient_id,
+                    title=row.title,
+                    message=row.message,
+                    notification_type=row.notification_type,
+                    priority=row.priority,
+                    farm_id=row.farm_id,
+                    cow_id=row.cow_id,
+                    dedupe_key=row.dedupe_key,
+                    occurrence_count=row.occurrence_count,
+                    created_at=row.created_at,
+                    read_at=row.read_at,
+                )
+                for row in rows if not row.is_deleted
+            ],
+            ignore_conflicts=True
+        )
+    
+    @staticmethod
+    def _delete_in_batches(expired, batch_size, max_batches, archive=False):
+        """Delete rows of an index-ordered queryset a batch per transaction"""
+        from .models import Notification
+        
+        deleted = 0
+        for _ in range(max_batches):
+            with transaction.atomic():
+                rows = list(expired[:batch_size])
+                if not rows:
+                    break
+                if archive:
+                    NotificationRetentionService._archive(rows)
+                Notification.objects.filter(pk__in=[row.pk for row in rows]).delete()
+            deleted += len(rows)
+        return deleted
+    
+    @staticmethod
+    def archive_read(days=RETENTION_DAYS, archive=True, batch_size=RETENTION_BATCH_SIZE,
+                     max_batches=RETENTION_MAX_BATCHES):
+        """Move read notifications older than days to the archive table, or delete them.
+        
+        Soft-deleted rows past the same age are purged without archiving. Each
+        pass walks its own partial index (read_at, then deleted_at) in order.
+        """
+        from .models import Notification
+        
+        cutoff = timezone.now() - timedelta(days=days)
+        read = Notification.objects.filter(is_read=True, read_at__lt=cutoff).order_by('read_at')
+        soft_deleted = (
+            Notification.objects.filter(is_deleted=True, deleted_at__lt=cutoff)
+            .order_by('deleted_at').only('pk')
+        )
+        moved = NotificationRetentionService._delete_in_batches(read, batch_size, max_batches, archive)
+        return moved + NotificationRetentionService._delete_in_batches(soft_deleted, batch_size, max_batches)
+    
+    @staticmethod
+    def run(days=RETENTION_DAYS, archive=True):
+        return {
+            'compacted': NotificationRetentionService.compact(),
+            'archived' if archive else 'deleted': NotificationRetentionService.archive_read(days, archive),
+        }
+
+class AlertRuleService:
+    """Scheduled pass over every alert rule, one query per rule across all farms"""
+    
+    @staticmethod
+    def _recipients():
+        """Admin ids plus active farmer ids per assigned farm, loaded once per run"""
+        from apps.authentication.models import User
+        
+        admin_ids, farmers_by_farm = [], {}
+        users = User.objects.filter(is_active=True, role__in=['admin', 'farmer']).values_list(
+            'id', 'role', 'assigned_farm_id'
+        )
+        for user_id, role, farm_id in users:
+            if role == 'admin':
+                admin_ids.append(user_id)
+            elif farm_id is not None:
+                farmers_by_farm.setdefault(farm_id, []).append(user_id)
+        return admin_ids, farmers_by_farm
+    
+    @staticmethod
+    def _flush(notifications, force=False):
+        """Insert a full batch; the dedupe constraint drops alerts already sent"""
+        from .models import Notification
+        
+        if notifications and (force or len(notifications) >= ALERT_RULE_BATCH_SIZE):
+            Notification.objects.insert_deduped(notifications, batch_size=ALERT_RULE_BATCH_SIZE)
+            notifications.clear()
+    
+    @staticmethod
+    def run(on_date=None, types=None):
+        """Evaluate the rules (or those of the given notification types); safe to rerun.
+        
+        Returns the number of matched rows per notification type.
+        """
+        from .models import Notification
+        from .rules import ALERT_RULES
+        
+        on_date = on_date or timezone.now().date()
+        rules = [rule for rule in ALERT_RULES if types is None or rule.notification_type in types]
+        admin_ids, farmers_by_farm = AlertRuleService._recipients()
+        pending, counts = [], {}
+        
+        for rule in rules:
+            counts[rule.notification_type] = 0
+            for item in rule.queryset(on_date).iterator(chunk_size=ALERT_RULE_BATCH_SIZE):
+                counts[rule.notification_type] += 1
+                title, message, priority = rule.render(item, on_date)
+                recipients = admin_ids
+                if rule.notify_farmers:
+                    recipients = recipients + farmers_by_farm.get(item['farm_id'], [])
+                for user_id in recipients:
+                    pending.append(Notification(
+                        recipient_id=user_id,
+                        title=title,
+                        message=message,
+                        notification_type=rule.notification_type,
+                        priority=priority,
+                        farm_id=item['farm_id'],
+                        cow_id=item.get('cow_id'),
+                        dedupe_key=rule.dedupe_key(item)
+                    ))
+                AlertRuleService._flush(pending)
+        
+        AlertRuleService._flush(pending, force=True)
+        return counts
@@ -0,0 +1,13 @@
+# apps/notifications/tasks.py
+from celery import shared_task
+from .services import AlertRuleService, NotificationRetentionService
+
+@shared_task
+def apply_notification_retention():
+    """Nightly compaction of repeated alerts and archival of old read notifications"""
+    return NotificationRetentionService.run()
+
+@shared_task
+def evaluate_alert_rules():
+    """Daily pass over every alert rule: stock, calving, heat, vaccination and follow-up alerts"""
+    return AlertRuleService.run()
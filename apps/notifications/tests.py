@@ -1,3 +1,400 @@
-from django.test import TestCase
+# apps/notifications/tests.py
+import asyncio
+import json
+from datetime import timedelta
+from io import StringIO
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from apps.authentication.models import User
+from apps.farms.models import Farm
+from .consumers import REPLAY_PAGE_SIZE, NotificationConsumer
+from .models import Notification, NotificationArchive
+from .rules import ALERT_RULES
+from .services import (
+    PUSH_BATCH_LIMIT, NotificationFanoutService, NotificationPushService,
+    AlertRuleService, NotificationRetentionService, UnreadCounterService
+)
 
-# Create your tests here.
+class NotificationPushTests(TestCase):
+    """New notifications reach the recipient's group once the transaction commits"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='farmer@example.com', username='farmer', password='pass',
+            first_name='Fay', last_name='Farmer'
+        )
+        # Warm the counter the way a connecting client would
+        UnreadCounterService.get(self.user.pk)
+        self.layer = get_channel_layer()
+        self.channel = async_to_sync(self.layer.new_channel)()
+        async_to_sync(self.layer.group_add)(NotificationPushService.group_name(self.user.pk), self.channel)
+    
+    def receive_all(self):
+        async def drain():
+            frames = []
+            while True:
+                try:
+                    frames.append(await asyncio.wait_for(self.layer.receive(self.channel), 0.05))
+                except asyncio.TimeoutError:
+                    return frames
+        return async_to_sync(drain)()
+    
+    def create(self, count):
+        for i in range(count):
+            Notification.objects.create(
+                recipient=self.user, title=f'Low stock {i}', message='Dairy meal is low.',
+                notification_type='low_stock'
+            )
+    
+    def test_single_notification_is_pushed_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create(1)
+            self.assertEqual(self.receive_all(), [])
+        frames = self.receive_all()
+        self.assertEqual([frame['type'] for frame in frames], ['notification.message', 'unread.count'])
+        self.assertEqual(frames[0]['notification']['title'], 'Low stock 0')
+        self.assertEqual(frames[1]['count'], 1)
+    
+    @override_settings(NOTIFICATION_PUSH_WINDOW=60)
+    def test_burst_is_coalesced_into_one_frame(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create(50)
+        self.assertEqual(NotificationPushService.flush(), 2)
+        frames = self.receive_all()
+        self.assertEqual([frame['type'] for frame in frames], ['notification.batch', 'unread.count'])
+        self.assertEqual(frames[0]['counts'], {'*': 50})
+        self.assertEqual(len(frames[0]['notifications']), PUSH_BATCH_LIMIT)
+        self.assertEqual(frames[1]['count'], 50)
+
+class UnreadCounterTests(TestCase):
+    """Cached unread counts follow creates, reads and soft deletes without recounting"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='farmer@example.com', username='farmer', password='pass',
+            first_name='Fay', last_name='Farmer'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def unread(self):
+        return self.client.get('/api/notifications/unread-count/').json()['unread']
+    
+    def create(self, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            return [
+                Notification.objects.create(
+                    recipient=self.user, title=f'Heat {i}', message='Heat detected.',
+                    notification_type='heat_detected'
+                )
+                for i in range(count)
+            ]
+    
+    def test_counter_tracks_changes_without_counting_queries(self):
+        self.assertEqual(self.unread(), 0)
+        notifications = self.create(4)
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.objects.filter(pk=notifications[0].pk).mark_read()
+            notifications[1].soft_delete()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.unread(), 2)
+        self.assertFalse(any('notifications' in query['sql'] for query in queries))
+    
+    def test_recompute_command_repairs_drift(self):
+        self.assertEqual(self.unread(), 0)
+        self.create(3)
+        cache.set(UnreadCounterService._key(self.user.pk), 40)
+        call_command('recompute_unread_counts', stdout=StringIO())
+        self.assertEqual(self.unread(), 3)
+
+class NotificationFanoutTests(TestCase):
+    """Farm and role alerts are inserted together and pushed once per group"""
+    
+    def setUp(self):
+        cache.clear()
+        self.farm = Farm.objects.create(name='Green Acres', location='Nakuru')
+        other_farm = Farm.objects.create(name='Hillside', location='Kisii')
+        self.farmers = [
+            User.objects.create_user(
+                email=f'farmer{i}@example.com', username=f'farmer{i}', password='pass',
+                first_name='Fay', last_name=str(i), assigned_farm=farm
+            )
+            for i, farm in enumerate([self.farm, self.farm, other_farm])
+        ]
+        self.admin = User.objects.create_user(
+            email='admin@example.com', username='admin', password='pass',
+            first_name='Ada', last_name='Admin', role='admin'
+        )
+        self.layer = get_channel_layer()
+    
+    def listen(self, group):
+        channel = async_to_sync(self.layer.new_channel)()
+        async_to_sync(self.layer.group_add)(group, channel)
+        return channel
+    
+    def receive(self, channel):
+        return async_to_sync(asyncio.wait_for)(self.layer.receive(channel), 1)
+    
+    def test_fan_out_reaches_farm_and_admins_in_two_queries(self):
+        farm_channel = self.listen(NotificationPushService.farm_group_name(self.farm.pk))
+        admin_channel = self.listen(NotificationPushService.role_group_name('admin'))
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                notifications = NotificationFanoutService.fan_out(
+                    'Calving due', 'Daisy is due today.', 'calving_due', farm=self.farm
+                )
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(
+            {notification.recipient_id for notification in notifications},
+            {self.farmers[0].pk, self.farmers[1].pk, self.admin.pk}
+        )
+        
+        farm_frame = self.receive(farm_channel)['notification']
+        self.assertEqual(set(farm_frame['recipients']), {str(self.farmers[0].pk), str(self.farmers[1].pk)})
+        admin_frame = self.receive(admin_channel)['notification']
+        self.assertEqual(set(admin_frame['recipients']), {str(self.admin.pk)})
+        
+        # Each consumer keeps only its own copy
+        consumer = NotificationConsumer()
+        consumer.user = self.farmers[1]
+        own = consumer.own_notification(farm_frame)
+        self.assertEqual(own['id'], Notification.objects.get(recipient=self.farmers[1]).pk)
+        self.assertNotIn('recipients', own)
+        consumer.user = self.farmers[2]
+        self.assertIsNone(consumer.own_notification(farm_frame))
+    
+    def test_group_batches_count_and_truncate_per_recipient(self):
+        first, second = (str(farmer.pk) for farmer in self.farmers[:2])
+        payloads = [{'title': 'First', 'recipients': {first: i}} for i in range(30)]
+        payloads += [{'title': 'Second', 'recipients': {second: 100 + i}} for i in range(25)]
+        frame = NotificationPushService.frame(payloads)
+        self.assertEqual(frame['counts'], {first: 30, second: 25})
+        self.assertEqual(len(frame['notifications']), 2 * PUSH_BATCH_LIMIT)
+        
+        consumer = NotificationConsumer()
+        sent = []
+        async def send(text_data):
+            sent.append(json.loads(text_data))
+        consumer.send = send
+        for farmer, count, first_id in [(self.farmers[0], 30, 10), (self.farmers[1], 25, 105)]:
+            consumer.user = farmer
+            async_to_sync(consumer.notification_batch)(frame)
+            self.assertEqual(sent[-1]['count'], count)
+            self.assertEqual([item['id'] for item in sent[-1]['notifications']][:1], [first_id])
+            self.assertEqual(len(sent[-1]['notifications']), PUSH_BATCH_LIMIT)
+        consumer.user = self.farmers[2]
+        async_to_sync(consumer.notification_batch)(frame)
+        self.assertEqual(len(sent), 2)
+    
+    def test_dedupe_key_skips_existing_recipients(self):
+        NotificationFanoutService.fan_out('Low stock', 'Dairy meal is low.', 'low_stock',
+                                          farm=self.farm, dedupe_key='low_stock:1')
+        again = NotificationFanoutService.fan_out('Low stock', 'Dairy meal is low.', 'low_stock',
+                                                  farm=self.farm, dedupe_key='low_stock:1')
+        self.assertEqual(again, [])
+        self.assertEqual(Notification.objects.filter(dedupe_key='low_stock:1').count(), 3)
+
+class NotificationRetentionTests(TestCase):
+    """Retention folds repeated alerts together and moves expired rows to the archive"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='farmer@example.com', username='farmer', password='pass',
+            first_name='Fay', last_name='Farmer'
+        )
+    
+    def create(self, title, notification_type='system'):
+        return Notification.objects.create(
+            recipient=self.user, title=title, message=f'{title}.', notification_type=notification_type
+        )
+    
+    def test_repeated_unread_alerts_are_compacted(self):
+        for _ in range(4):
+            self.create('Backup failed')
+        latest = self.create('Backup failed')
+        self.create('Backup failed', notification_type='low_stock')
+        UnreadCounterService.get(self.user.pk)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(NotificationRetentionService.compact(), 4)
+        self.assertEqual(
+            list(Notification.objects.filter(notification_type='system').values_list('id', 'occurrence_count')),
+            [(latest.pk, 5)]
+        )
+        self.assertEqual(Notification.objects.count(), 2)
+        self.assertEqual(UnreadCounterService.get(self.user.pk), 2)
+    
+    def test_expired_rows_are_archived_in_batches(self):
+        expired = timezone.now() - timedelta(days=120)
+        read = [self.create(f'Read {i}', notification_type='low_stock') for i in range(5)]
+        Notification.objects.filter(pk__in=[n.pk for n in read]).update(is_read=True, read_at=expired)
+        deleted = self.create('Deleted', notification_type='low_stock')
+        Notification.objects.filter(pk=deleted.pk).update(is_deleted=True, deleted_at=expired)
+        recent = self.create('Recent', notification_type='low_stock')
+        
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(NotificationRetentionService.archive_read(batch_size=2), 6)
+        self.assertEqual(list(Notification.objects.values_list('id', flat=True)), [recent.pk])
+        
+        # Each pass reads its own partial index, in index order (no sort step)
+        plans = set()
+        for sql in {query['sql'] for query in queries if query['sql'].startswith('SELECT')}:
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plans.update(row[-1] for row in cursor.fetchall())
+        self.assertEqual(plans, {
+            'SEARCH notifications USING INDEX notif_read_at_idx (read_at<?)',
+            'SEARCH notifications USING INDEX notif_deleted_at_idx (deleted_at<?)',
+        })
+        self.assertEqual(
+            sorted(NotificationArchive.objects.values_list('original_id', flat=True)),
+            [n.pk for n in read]
+        )
+
+class AlertRuleTests(TestCase):
+    """Alert rules scan every farm in one query each and never repeat an alert"""
+    
+    def setUp(self):
+        from apps.breeding.models import BreedingRecord, HeatDetection
+        from apps.feeds.models import FeedInventory, FeedType
+        from apps.livestock.models import Cow
+        
+        cache.clear()
+        self.today = timezone.now().date()
+        self.farms = [Farm.objects.create(name=name, location='Nakuru') for name in ('Green Acres', 'Hillside')]
+        self.admin = User.objects.create_user(
+            email='admin@example.com', username='admin', password='pass',
+            first_name='Ada', last_name='Admin', role='admin'
+        )
+        self.farmer = User.objects.create_user(
+            email='farmer@example.com', username='farmer', password='pass',
+            first_name='Fay', last_name='Farmer', role='farmer', assigned_farm=self.farms[0]
+        )
+        feed = FeedType.objects.create(name='Dairy meal', category='concentrate', unit_of_measurement='kg')
+        for farm in self.farms:
+            cow = Cow.objects.create(
+                farm=farm, name=f'{farm.name} cow', tag_number=f'T{farm.pk}', breed='jersey',
+                date_acquired=self.today, acquisition_cost=1
+            )
+            FeedInventory.objects.create(farm=farm, feed_type=feed, current_stock=5, minimum_stock_level=10)
+            BreedingRecord.objects.create(
+                cow=cow, breeding_date=self.today - timedelta(days=280),
+                heat_detected_date=self.today - timedelta(days=280),
+                expected_calving_date=self.today + timedelta(days=3), pregnancy_confirmed=True
+            )
+            HeatDetection.objects.create(cow=cow, heat_date=self.today, heat_intensity='strong')
+    
+    def test_rules_alert_every_farm_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                counts = AlertRuleService.run(self.today)
+        self.assertEqual(counts['low_stock'], 2)
+        self.assertEqual(counts['calving_due'], 2)
+        self.assertEqual(counts['heat_detected'], 2)
+        # Users once, a scan per rule, then the insert and reload of the single batch
+        self.assertEqual(len(queries), 1 + len(ALERT_RULES) + 2)
+        
+        self.assertEqual(Notification.objects.filter(recipient=self.admin).count(), 6)
+        self.assertEqual(
+            set(Notification.objects.filter(recipient=self.farmer).values_list('notification_type', 'farm_id')),
+            {(rule, self.farms[0].pk) for rule in ('low_stock', 'calving_due', 'heat_detected')}
+        )
+        self.assertEqual(UnreadCounterService.get(self.farmer.pk), 3)
+        
+        AlertRuleService.run(self.today)
+        self.assertEqual(Notification.objects.count(), 9)
+
+class NotificationSocketTests(TransactionTestCase):
+    """Batch acknowledgements are single UPDATEs and reconnects replay what was missed"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='farmer@example.com', username='farmer', password='pass',
+            first_name='Fay', last_name='Farmer'
+        )
+        self.token = Token.objects.create(user=self.user)
+        start = timezone.now() - timedelta(hours=2)
+        self.notifications = Notification.objects.bulk_create([
+            Notification(
+                recipient=self.user, title=f'Low stock {i}', message='Dairy meal is low.',
+                notification_type='low_stock'
+            )
+            for i in range(REPLAY_PAGE_SIZE + 10)
+        ])
+        # Spread them a minute apart so the replay order is well defined
+        for i, notification in enumerate(self.notifications):
+            Notification.objects.filter(pk=notification.pk).update(created_at=start + timedelta(minutes=i))
+    
+    async def exchange(self, messages, frame_count):
+        """Send messages over one connection and collect the frames sent back"""
+        from config.asgi import application
+        
+        communicator = ApplicationCommunicator(application, {
+            'type': 'websocket',
+            'path': '/ws/notifications/',
+            'query_string': f'token={self.token.key}'.encode(),
+            'headers': [],
+            'subprotocols': [],
+        })
+        await communicator.send_input({'type': 'websocket.connect'})
+        assert (await communicator.receive_output(timeout=5))['type'] == 'websocket.accept'
+        for message in messages:
+            await communicator.send_input({'type': 'websocket.receive', 'text': json.dumps(message)})
+        frames = [
+            json.loads((await communicator.receive_output(timeout=5))['text'])
+            for _ in range(frame_count)
+        ]
+        assert await communicator.receive_nothing()
+        await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await communicator.wait(timeout=5)
+        return frames
+    
+    def test_mark_read_many_and_all(self):
+        ids = [notification.pk for notification in self.notifications[:3]]
+        frames = async_to_sync(self.exchange)([
+            {'type': 'mark_read_many', 'notification_ids': ids},
+            {'type': 'mark_all_read'},
+            {'type': 'mark_read_many', 'notification_ids': 'all'},
+        ], 6)
+        replies = [frame for frame in frames if frame['type'] != 'unread_count']
+        self.assertEqual([frame.get('count') for frame in replies], [3, len(self.notifications) - 3, None])
+        self.assertEqual(replies[2]['type'], 'error')
+        self.assertFalse(Notification.objects.filter(is_read=False).exists())
+        
+        # Connecting reports the badge count, and each acknowledgement pushes the new one
+        counts = [frame['count'] for frame in frames if frame['type'] == 'unread_count']
+        self.assertEqual(counts, [len(self.notifications), len(self.notifications) - 3, 0])
+    
+    def test_resume_replays_missed_notifications_in_pages(self):
+        last_seen = self.notifications[4]
+        frames = async_to_sync(self.exchange)([{'type': 'resume', 'last_id': last_seen.pk}], 3)[1:]
+        self.assertEqual([frame['has_more'] for frame in frames], [True, False])
+        replayed = [item['id'] for frame in frames for item in frame['notifications']]
+        self.assertEqual(replayed, [notification.pk for notification in self.notifications[5:]])
+    
+    def test_resume_rejects_unknown_cursor(self):
+        frames = async_to_sync(self.exchange)([{'type': 'resume', 'since': 'yesterday'}], 2)
+        self.assertEqual(frames[1]['type'], 'error')
+    
+    def test_resume_rejects_impossible_timestamp(self):
+        frames = async_to_sync(self.exchange)([
+            {'type': 'resume', 'since': '2024-02-30T00:00:00'},
+            {'type': 'mark_read', 'notification_id': self.notifications[0].pk},
+        ], 4)
+        self.assertEqual(frames[1]['type'], 'error')
+        # The connection survives and keeps handling messages
+        self.assertEqual(frames[2], {'type': 'marked_read', 'count': 1})
@@ -1,7 +1,8 @@
 from django.urls import path
+from . import views
 
 app_name = 'notifications'
 
 urlpatterns = [
-    # URLs will be added later
+    path('unread-count/', views.UnreadCountView.as_view(), name='unread-count'),
 ]
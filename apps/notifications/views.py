@@ -1,3 +1,13 @@
-from django.shortcuts import render
+# apps/notifications/views.py
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .services import UnreadCounterService
 
-# Create your views here.
+class UnreadCountView(APIView):
+    """Unread notification count for the badge, served from the cached counter"""
+    
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        return Response({'unread': UnreadCounterService.get(request.user.pk)})
@@ -11,10 +11,10 @@ from .models import (
 class MilkProductionAdmin(admin.ModelAdmin):
     list_display = [
         'cow', 'date', 'session', 'quantity_liters', 
-        'quality_grade', 'recorded_by', 'created_at'
+        'quality_grade', 'is_withheld', 'recorded_by', 'created_at'
     ]
     list_filter = [
-        'date', 'session', 'quality_grade', 'cow__farm',
+        'date', 'session', 'quality_grade', 'is_withheld', 'cow__farm',
         'cow__current_stage', 'created_at'
     ]
     search_fields = ['cow__name', 'cow__tag_number', 'notes']
@@ -23,22 +23,37 @@ class MilkProductionAdmin(admin.ModelAdmin):
     
     fieldsets = (
         ('Production Details', {
-            'fields': ('cow', 'date', 'session', 'quantity_liters', 'quality_grade')
+            'fields': (
+                'cow', 'date', 'session', 'quantity_liters', 'quality_grade',
+                'is_withheld'
+            )
         }),
         ('Recording Information', {
             'fields': ('recorded_by', 'notes')
         }),
     )
     
+    readonly_fields = ['is_withheld']
+    actions = ['flag_withheld_milk']
+    
     def get_queryset(self, request):
         return super().get_queryset(request).select_related(
             'cow__farm', 'recorded_by'
         )
+    
+    def flag_withheld_milk(self, request, queryset):
+        from apps.health.services import WithdrawalService
+        flagged, cleared = WithdrawalService.flag_production(queryset)
+        self.message_user(
+            request,
+            f"Flagged {flagged} and cleared {cleared} records against withdrawal periods."
+        )
+    flag_withheld_milk.short_description = "Re-check selected records for milk withdrawal"
 
 @admin.register(DailyMilkSummary)
 class DailyMilkSummaryAdmin(admin.ModelAdmin):
     list_display = [
-        'farm', 'date', 'total_daily', 'cows_milked', 
+        'farm', 'date', 'total_daily', 'withheld_total', 'saleable_total', 'cows_milked',
         'average_per_cow', 'created_at'
     ]
     list_filter = ['farm', 'date']
@@ -46,7 +61,7 @@ class DailyMilkSummaryAdmin(admin.ModelAdmin):
     date_hierarchy = 'date'
     readonly_fields = [
         'total_morning', 'total_afternoon', 'total_evening',
-        'total_daily', 'cows_milked', 'average_per_cow'
+        'total_daily', 'withheld_total', 'saleable_total', 'cows_milked', 'average_per_cow'
     ]
     
     actions = ['recalculate_summaries']
@@ -0,0 +1,24 @@
+# apps/production/management/commands/flag_withheld_milk.py
+from django.core.management.base import BaseCommand, CommandError
+from apps.common.dates import parse_or_none
+from apps.health.services import WithdrawalService
+from apps.production.models import MilkProduction
+
+class Command(BaseCommand):
+    help = 'Re-check milk production records against milk withdrawal periods'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Only check records on or after this date (YYYY-MM-DD)')
+    
+    def handle(self, *args, **options):
+        queryset = MilkProduction.objects.filter(is_deleted=False)
+        if options['since']:
+            since = parse_or_none(options['since'])
+            if since is None:
+                raise CommandError('--since must use the YYYY-MM-DD format')
+            queryset = queryset.filter(date__gte=since)
+        
+        flagged, cleared = WithdrawalService.flag_production(queryset)
+        self.stdout.write(self.style.SUCCESS(
+            f'Flagged {flagged} and cleared {cleared} milk records.'
+        ))
@@ -0,0 +1,47 @@
+# apps/production/managers.py
+from decimal import Decimal
+from django.db import models
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from apps.common.scoping import FarmScopedQuerySetMixin
+
+class MilkProductionQuerySet(models.QuerySet):
+    """Queryset helpers for milk records"""
+    
+    def active(self):
+        return self.filter(is_deleted=False)
+    
+    def saleable_liters(self, farm_id, on_date):
+        """Litres recorded on a farm for a date outside any withdrawal window"""
+        return self.active().filter(
+            cow__farm_id=farm_id, date=on_date, is_withheld=False
+        ).aggregate(total=Sum('quantity_liters'))['total'] or Decimal('0')
+
+class DailyMilkSummaryQuerySet(FarmScopedQuerySetMixin, models.QuerySet):
+    """Queryset helpers for daily milk summaries"""
+    
+    def refresh_withheld(self, farm_dates):
+        """Recompute withheld_total for the summaries of (farm_id, date) pairs in one UPDATE"""
+        from .models import MilkProduction
+        
+        if not farm_dates:
+            return 0
+        farm_ids = {farm_id for farm_id, _ in farm_dates}
+        dates = [on_date for _, on_date in farm_dates]
+        withheld = (
+            MilkProduction.objects.active()
+            .filter(cow__farm_id=OuterRef('farm_id'), date=OuterRef('date'), is_withheld=True)
+            .order_by()
+            .values('date')
+            .annotate(total=Sum('quantity_liters'))
+            .values('total')
+        )
+        # The farm/date range may cover a few untouched summaries; recomputing them is harmless
+        return self.filter(
+            farm_id__in=farm_ids, date__range=[min(dates), max(dates)]
+        ).update(
+            withheld_total=Coalesce(
+                Subquery(withheld), Value(Decimal('0')),
+                output_field=DecimalField(max_digits=8, decimal_places=2)
+            )
+        )
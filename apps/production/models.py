@@ -1,8 +1,10 @@
 # apps/production/models.py
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 from apps.common.models import BaseModel
+from .managers import DailyMilkSummaryQuerySet, MilkProductionQuerySet
 
 class MilkProduction(BaseModel):
     """Daily milk production tracking for individual cows"""
@@ -36,8 +38,14 @@ class MilkProduction(BaseModel):
         null=True,
         related_name='milk_records'
     )
+    is_withheld = models.BooleanField(
+        default=False,
+        help_text="Milk falls inside a treatment withdrawal period and cannot be sold"
+    )
     notes = models.TextField(blank=True, null=True)
     
+    objects = MilkProductionQuerySet.as_manager()
+    
     class Meta:
         db_table = 'production_milk'
         verbose_name = 'Milk Production'
@@ -51,6 +59,22 @@ class MilkProduction(BaseModel):
     @property
     def farm(self):
         return self.cow.farm
+    
+    def save(self, *args, **kwargs):
+        # Flag milk from cows inside a withdrawal window at write time
+        from apps.health.services import WithdrawalService
+        self.is_withheld = WithdrawalService.is_withheld(self.cow_id, self.date)
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'is_withheld'}
+        super().save(*args, **kwargs)
+        
+        from apps.livestock.services import TagScanService
+        TagScanService.invalidate_sessions(self.cow_id, self.date)
+    
+    def delete(self, *args, **kwargs):
+        from apps.livestock.services import TagScanService
+        TagScanService.invalidate_sessions(self.cow_id, self.date)
+        return super().delete(*args, **kwargs)
 
 class DailyMilkSummary(BaseModel):
     """Daily milk production summary per farm"""
@@ -77,6 +101,11 @@ class DailyMilkSummary(BaseModel):
     average_per_cow = models.DecimalField(
         max_digits=6, decimal_places=2, default=0
     )
+    withheld_total = models.DecimalField(
+        max_digits=8, decimal_places=2, default=0
+    )
+    
+    objects = DailyMilkSummaryQuerySet.as_manager()
     
     class Meta:
         db_table = 'production_daily_milk_summary'
@@ -88,6 +117,10 @@ class DailyMilkSummary(BaseModel):
     def __str__(self):
         return f"{self.farm.name} - {self.date}: {self.total_daily}L"
     
+    @property
+    def saleable_total(self):
+        return self.total_daily - self.withheld_total
+    
     def calculate_summary(self):
         """Calculate and update summary from individual records"""
         from django.db.models import Sum, Count, Avg
@@ -111,6 +144,10 @@ class DailyMilkSummary(BaseModel):
             total=Sum('quantity_liters')
         )['total'] or 0
         
+        withheld_total = daily_records.filter(is_withheld=True).aggregate(
+            total=Sum('quantity_liters')
+        )['total'] or 0
+        
         # Calculate other metrics
         unique_cows = daily_records.values('cow').distinct().count()
         total_daily = morning_total + afternoon_total + evening_total
@@ -121,6 +158,7 @@ class DailyMilkSummary(BaseModel):
         self.total_afternoon = afternoon_total
         self.total_evening = evening_total
         self.total_daily = total_daily
+        self.withheld_total = withheld_total
         self.cows_milked = unique_cows
         self.average_per_cow = avg_per_cow
         self.save()
@@ -178,6 +216,25 @@ class MilkSale(BaseModel):
     def __str__(self):
         return f"{self.farm.name} - {self.date}: {self.quantity_liters}L @ {self.price_per_liter}/L"
     
+    def available_liters(self):
+        """Saleable litres for the farm and date not already taken by other sales"""
+        from django.db.models import Sum
+        
+        sold = MilkSale.objects.filter(
+            farm_id=self.farm_id, date=self.date, is_deleted=False
+        ).exclude(pk=self.pk).aggregate(total=Sum('quantity_liters'))['total'] or 0
+        return MilkProduction.objects.saleable_liters(self.farm_id, self.date) - sold
+    
+    def clean(self):
+        # Milk inside a withdrawal window is never saleable
+        super().clean()
+        if self.farm_id and self.date and self.quantity_liters is not None:
+            available = self.available_liters()
+            if self.quantity_liters > available:
+                raise ValidationError({
+                    'quantity_liters': f"Only {max(available, 0)}L of saleable milk is left for {self.date}."
+                })
+    
     def save(self, *args, **kwargs):
         # Auto-calculate total amount
         self.total_amount = self.quantity_liters * self.price_per_liter
@@ -0,0 +1,38 @@
+# apps/production/serializers.py
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework import serializers
+from .models import DailyMilkSummary, MilkSale
+
+class DailyMilkSummarySerializer(serializers.ModelSerializer):
+    farm_name = serializers.CharField(source='farm.name', read_only=True)
+    saleable_total = serializers.DecimalField(max_digits=8, decimal_places=2, read_only=True)
+    
+    class Meta:
+        model = DailyMilkSummary
+        fields = [
+            'id', 'farm', 'farm_name', 'date', 'total_morning', 'total_afternoon',
+            'total_evening', 'total_daily', 'withheld_total', 'saleable_total',
+            'cows_milked', 'average_per_cow'
+        ]
+
+class MilkSaleSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MilkSale
+        fields = [
+            'id', 'farm', 'date', 'quantity_liters', 'price_per_liter', 'total_amount',
+            'buyer_name', 'buyer_contact', 'payment_method', 'recorded_by', 'notes',
+            'created_at'
+        ]
+        read_only_fields = ['total_amount', 'recorded_by']
+    
+    def validate(self, attrs):
+        # Same saleable-litre check the admin form runs through MilkSale.clean()
+        sale = MilkSale(pk=getattr(self.instance, 'pk', None), **{
+            field: attrs.get(field, getattr(self.instance, field, None))
+            for field in ['farm', 'date', 'quantity_liters']
+        })
+        try:
+            sale.clean()
+        except DjangoValidationError as error:
+            raise serializers.ValidationError(error.message_dict)
+        return attrs
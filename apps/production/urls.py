@@ -1,7 +1,10 @@
 from django.urls import path
+from . import views
 
 app_name = 'production'
 
 urlpatterns = [
-    # URLs will be added later
+    path('withdrawals/', views.WithdrawalCheckView.as_view(), name='withdrawal-check'),
+    path('daily-summaries/', views.DailyMilkSummaryListView.as_view(), name='daily-summaries'),
+    path('milk-sales/', views.MilkSaleListCreateView.as_view(), name='milk-sales'),
 ]
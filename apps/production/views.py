@@ -1,3 +1,57 @@
-from django.shortcuts import render
+# apps/production/views.py
+from django.utils import timezone
+from rest_framework import generics
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from apps.authentication.permissions import IsAdminUser
+from apps.common.dates import get_date_param
+from apps.common.scoping import scope_to_user
+from apps.health.services import WithdrawalService
+from .models import DailyMilkSummary, MilkSale
+from .serializers import DailyMilkSummarySerializer, MilkSaleSerializer
 
-# Create your views here.
+class WithdrawalCheckView(APIView):
+    """Cows whose milk must be withheld on a date, for a whole milking session"""
+    
+    def get(self, request):
+        on_date = get_date_param(request.query_params, 'date', timezone.now().date())
+        periods = scope_to_user(
+            WithdrawalService.active_periods(on_date).select_related('cow'), request.user
+        )
+        if request.user.is_admin and request.query_params.get('farm'):
+            periods = periods.filter(farm_id=request.query_params['farm'])
+        
+        return Response({
+            'date': on_date,
+            'cows': [
+                {
+                    'cow': period.cow_id,
+                    'cow_name': period.cow.name,
+                    'tag_number': period.cow.tag_number,
+                    'farm': period.farm_id,
+                    'medicine': period.medicine,
+                    'withdrawal_ends': period.end_date,
+                }
+                for period in periods.order_by('cow__name')
+            ],
+        })
+
+class DailyMilkSummaryListView(generics.ListAPIView):
+    """Daily farm totals with withheld and saleable litres"""
+    
+    serializer_class = DailyMilkSummarySerializer
+    
+    def get_queryset(self):
+        return DailyMilkSummary.objects.filter(is_deleted=False).select_related('farm')
+
+class MilkSaleListCreateView(generics.ListCreateAPIView):
+    """Milk sales, capped at each day's saleable litres"""
+    
+    serializer_class = MilkSaleSerializer
+    permission_classes = [IsAdminUser]
+    
+    def get_queryset(self):
+        return MilkSale.objects.filter(is_deleted=False)
+    
+    def perform_create(self, serializer):
+        serializer.save(recorded_by=self.request.user)
@@ -1,6 +1,7 @@
 # config/settings/base.py
 import os
 from pathlib import Path
+from celery.schedules import crontab
 from decouple import config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -23,6 +24,7 @@ DJANGO_APPS = [
 
 THIRD_PARTY_APPS = [
     'rest_framework',
+    'rest_framework.authtoken',
     'corsheaders',
     'channels',
 ]
@@ -127,12 +129,15 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'apps.authentication.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_FILTER_BACKENDS': [
+        'apps.common.filters.FarmScopeFilterBackend',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_RENDERER_CLASSES': [
@@ -148,6 +153,18 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Cache configuration (local memory unless a Redis cache URL is provided)
+CACHE_URL = config('CACHE_URL', default='')
+CACHES = {
+    'default': {
+        'BACKEND': (
+            'django.core.cache.backends.redis.RedisCache' if CACHE_URL
+            else 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': CACHE_URL or 'dairy-farm-cache',
+    }
+}
+
 # Channels configuration
 CHANNEL_LAYERS = {
     'default': {
@@ -158,6 +175,9 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Seconds to hold real-time notification pushes so bursts go out as one frame
+NOTIFICATION_PUSH_WINDOW = config('NOTIFICATION_PUSH_WINDOW', default=0.5, cast=float)
+
 # Celery Configuration
 CELERY_BROKER_URL = config('REDIS_URL', default='redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = config('REDIS_URL', default='redis://localhost:6379/0')
@@ -165,6 +185,21 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    'detect-disease-outbreaks': {
+        'task': 'apps.health.tasks.detect_disease_outbreaks',
+        'schedule': crontab(minute=0),
+    },
+    # Covers the health due-queue reminders as well as the stock and breeding alerts
+    'evaluate-alert-rules': {
+        'task': 'apps.notifications.tasks.evaluate_alert_rules',
+        'schedule': crontab(hour=6, minute=0),
+    },
+    'apply-notification-retention': {
+        'task': 'apps.notifications.tasks.apply_notification_retention',
+        'schedule': crontab(hour=2, minute=30),
+    },
+}
 
 # Logging
 LOGGING = {
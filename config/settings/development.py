@@ -15,3 +15,6 @@ CORS_ALLOW_ALL_ORIGINS = True
 
 # Email backend for development
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+
+# Run Celery tasks inline unless a worker is available
+CELERY_TASK_ALWAYS_EAGER = config('CELERY_TASK_ALWAYS_EAGER', default=True, cast=bool)
@@ -19,3 +19,16 @@ class DisableMigrations:
         return None
 
 MIGRATION_MODULES = DisableMigrations()
+
+# Run Celery tasks inline during tests
+CELERY_TASK_ALWAYS_EAGER = True
+
+# Push notifications as soon as the transaction commits
+NOTIFICATION_PUSH_WINDOW = 0
+
+# WebSocket tests run without Redis
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels.layers.InMemoryChannelLayer',
+    },
+}